@@ -12,6 +12,28 @@ Notas operacionales:
 	la app. Asegúrate de que la variable de entorno `DJANGO_SETTINGS_MODULE`
 	esté configurada con las opciones de producción apropiadas.
 
+Perfil ASGI (días de inventario):
+- Las APIs de lecturas (`api/inventory/scans/`), consulta de códigos
+	(`api/codes/`) y autocompletado (`api/suggest/`) son vistas asíncronas
+	con el ORM asíncrono; bajo ASGI una petición que espera a la BD no ocupa
+	un hilo. El resto de las vistas son síncronas y Django las ejecuta en un
+	hilo aparte (`sync_to_async`), igual que antes.
+- Servidores compatibles (cualquiera sirve `application`):
+	`uvicorn BiblioUPN321.asgi:application --host 0.0.0.0 --port 8000 --workers 2`
+	`daphne -b 0.0.0.0 -p 8000 BiblioUPN321.asgi:application`
+	`gunicorn BiblioUPN321.asgi:application -k uvicorn.workers.UvicornWorker -w 2`
+- Un worker por núcleo. Con SQLite las escrituras se serializan igualmente:
+	más workers sólo ayudan a las lecturas.
+- Dejar `CONN_MAX_AGE = 0` (valor por defecto): bajo ASGI las conexiones
+	persistentes no se reutilizan entre peticiones y sólo se acumularían.
+- Las descargas en streaming (`export/` y el CSV de conciliación) usan
+	`catalog/streaming.py`: bajo ASGI se envían tramo a tramo desde el hilo
+	de la petición en lugar de que Django las arme en memoria con
+	`sync_to_async(list)`, así que su memoria sigue acotada.
+- Los archivos estáticos los sirve el proxy (nginx) tras `collectstatic`.
+- `manage.py bench_endpoints` compara el rendimiento concurrente de estas
+	vistas por el camino WSGI y por el ASGI.
+
 Referencias: https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
 
@@ -87,6 +87,8 @@ LOGOUT_REDIRECT_URL = 'catalog:record_list'
 
 # Callable WSGI para despliegues síncronos (Gunicorn/uWSGI)
 WSGI_APPLICATION = 'BiblioUPN321.wsgi.application'
+# Callable ASGI (uvicorn/daphne); ver el perfil de despliegue en asgi.py
+ASGI_APPLICATION = 'BiblioUPN321.asgi.application'
 
 
 # ---------------------------------------------------------
@@ -154,6 +156,41 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 # Tipo de campo por defecto para claves primarias en modelos.
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Búsqueda del catálogo (catalog/services/search.py): "auto" usa FTS5 en
+# SQLite y tsvector/GIN en PostgreSQL; "basic" fuerza filtros icontains.
+CATALOG_SEARCH_BACKEND = "auto"
+# Configuración de texto de PostgreSQL para to_tsvector/to_tsquery. El texto
+# ya se indexa sin tildes y en minúsculas, por eso "simple" basta.
+CATALOG_SEARCH_CONFIG = "simple"
+
+# Paginación de la lista del catálogo: "cursor" (keyset, costo constante en
+# páginas profundas) o "pages" (Paginator con OFFSET y COUNT por página).
+CATALOG_LIST_PAGINATION = "cursor"
+# Segundos que se reutiliza el total de resultados de una búsqueda.
+CATALOG_COUNT_CACHE_TIMEOUT = 300
+# Segundos que se cachean las facetas sin filtros (se invalidan al guardar).
+CATALOG_FACETS_CACHE_TIMEOUT = 3600
+
+# Generación de QR al guardar registros/ejemplares: "ondemand" no guarda
+# imagen (la vista `catalog:qr_code` la genera al pedirla); "queue" encola en
+# QRJob para `manage.py qr_worker`; "sync" genera el PNG dentro del save().
+CATALOG_QR_MODE = "ondemand"
+# QR bajo demanda: máximo de imágenes en memoria por proceso y segundos de
+# `Cache-Control: max-age` de las respuestas (las URLs de ejemplar sin `?v=`
+# vigente usan el plazo corto: su payload incluye el título).
+CATALOG_QR_CACHE_SIZE = 512
+CATALOG_QR_MAX_AGE = 60 * 60 * 24 * 30
+CATALOG_QR_UNVERSIONED_MAX_AGE = 300
+
+# Caché en memoria código leído -> registro/ejemplar (services/codes.py):
+# entradas por proceso y segundos de vida (cubre cambios hechos sin señales).
+CATALOG_CODE_CACHE_SIZE = 20000
+CATALOG_CODE_CACHE_TTL = 300
+
+# Conciliación incremental de inventario: segundos de eventos que cada pasada
+# vuelve a revisar (lotes confirmados fuera de orden por lectores concurrentes).
+CATALOG_RECONCILE_LAG = 300
+
 # Media (archivos subidos por usuarios, imágenes de portadas y QRs)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -1,15 +1,35 @@
+import tempfile
+
 from django.contrib import admin
+from django.http import FileResponse
 from django.utils.html import format_html
 from .models import (
     BibliographicRecord, RecordContributor, Person, Subject,
-    Publisher, Location, Item
+    Publisher, Location, Item, QRJob, InventorySession, InventoryEvent, qr_mode
 )
+from .services.labels import labels_for, write_sheets
 
 @admin.action(description="(Re)generar QR")
 def regen_qr(modeladmin, request, queryset):
-    for obj in queryset:
-        obj.generate_qr()
-        obj.save(update_fields=["qr_image"])
+    # Se limpia la imagen; en modo "ondemand" basta con eso (la sirve la
+    # vista `qr_code`), si no se encola para `manage.py qr_worker`.
+    target = QRJob.Target.ITEM if queryset.model is Item else QRJob.Target.RECORD
+    ids = list(queryset.values_list("pk", flat=True))
+    queryset.update(qr_image=None)
+    if qr_mode() == "ondemand":
+        modeladmin.message_user(request, f"{len(ids)} QR se generarán bajo demanda.")
+        return
+    QRJob.enqueue(target, ids)
+    modeladmin.message_user(request, f"{len(ids)} QR encolados para regenerar.")
+
+@admin.action(description="Imprimir hoja de etiquetas (PDF)")
+def print_labels(modeladmin, request, queryset):
+    # Las páginas se escriben una a una en un temporal que luego se sirve en
+    # streaming; para trabajos muy grandes usar `manage.py print_labels`.
+    tmp = tempfile.TemporaryFile(suffix=".pdf")
+    write_sheets(labels_for(queryset.order_by("pk")), tmp)
+    tmp.seek(0)
+    return FileResponse(tmp, as_attachment=True, filename="etiquetas.pdf", content_type="application/pdf")
 
 class RecordContributorInline(admin.TabularInline):
     model = RecordContributor
@@ -35,7 +55,7 @@ class BibliographicRecordAdmin(admin.ModelAdmin):
     search_fields = ("title", "subtitle", "lcc_code", "call_number")
     readonly_fields = ("lcc_code", "lcc_source", "call_number", "lcc_class", "lcc_number")
     inlines = [RecordContributorInline]
-    actions = [regen_qr]
+    actions = [regen_qr, print_labels]
 
 
     def save_model(self, request, obj, form, change):
@@ -80,3 +100,24 @@ class ItemAdmin(admin.ModelAdmin):
     list_display = ("barcode", "record", "location", "status")
     search_fields = ("barcode", "record__title")
     list_filter = ("status", "location")
+    actions = [regen_qr, print_labels]
+
+@admin.register(QRJob)
+class QRJobAdmin(admin.ModelAdmin):
+    """Cola de QR pendientes: el total del listado es la profundidad de la cola."""
+    list_display = ("target", "object_id", "attempts", "created_at", "last_error")
+    list_filter = ("target",)
+    readonly_fields = ("target", "object_id", "attempts", "created_at", "last_error")
+
+@admin.register(InventorySession)
+class InventorySessionAdmin(admin.ModelAdmin):
+    list_display = ("name", "location", "started_by", "started_at", "closed_at")
+    list_filter = ("location",)
+    search_fields = ("name",)
+
+@admin.register(InventoryEvent)
+class InventoryEventAdmin(admin.ModelAdmin):
+    list_display = ("session", "record", "item", "event", "device", "scanned_at")
+    list_filter = ("session", "event")
+    list_select_related = ("session", "record", "item")
+    raw_id_fields = ("record", "item")
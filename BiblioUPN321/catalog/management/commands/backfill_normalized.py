@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from catalog.models import BibliographicRecord, Person, Subject
+from catalog.services.lcc import identifier_key, normalize_text
+
+# modelo -> (campos fuente, columna normalizada, función)
+TARGETS = [
+    (BibliographicRecord, ("title",), "title_norm", normalize_text),
+    (BibliographicRecord, ("isbn", "issn"), "ident_key", identifier_key),
+    (Person, ("full_name",), "full_name_norm", normalize_text),
+    (Subject, ("term",), "term_norm", normalize_text),
+]
+
+
+class Command(BaseCommand):
+    """Rellena las columnas normalizadas (`*_norm`, `ident_key`) de búsqueda y deduplicación.
+
+    Recorre cada tabla por rangos de pk y sólo escribe las filas cuyo valor
+    cambió. Puede re-ejecutarse sin efectos secundarios.
+    """
+
+    help = "Calcula title_norm, ident_key, full_name_norm y term_norm de las filas existentes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **opts):
+        batch_size = opts["batch_size"]
+        for model, sources, target, func in TARGETS:
+            last_pk = 0
+            updated = 0
+            while True:
+                batch = list(
+                    model.objects.filter(pk__gt=last_pk).order_by("pk")
+                    .only("pk", *sources, target)[:batch_size]
+                )
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+                changed = []
+                for obj in batch:
+                    value = func(*(getattr(obj, name) for name in sources))
+                    if getattr(obj, target) != value:
+                        setattr(obj, target, value)
+                        changed.append(obj)
+                if changed:
+                    with transaction.atomic():
+                        model.objects.bulk_update(changed, [target])
+                    updated += len(changed)
+            self.stdout.write(f"{model.__name__}.{target}: {updated} filas actualizadas")
+
+        self.stdout.write(self.style.SUCCESS("Columnas normalizadas listas."))
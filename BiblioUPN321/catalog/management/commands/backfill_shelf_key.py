@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from catalog.models import BibliographicRecord
+
+
+class Command(BaseCommand):
+    """Rellena `shelf_key` en registros existentes, por lotes.
+
+    Recorre la tabla por rangos de pk (sin OFFSET) y sólo escribe las filas
+    cuya clave cambió, con un `bulk_update` por lote dentro de una
+    transacción. Puede re-ejecutarse sin efectos secundarios.
+    """
+
+    help = "Calcula y guarda la clave de estantería (shelf_key) de los registros existentes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **opts):
+        batch_size = opts["batch_size"]
+        fields = ("id", "lcc_class", "lcc_number", "cutter", "cutter2", "publish_year", "shelf_key")
+        last_pk = 0
+        scanned = updated = 0
+        while True:
+            batch = list(
+                BibliographicRecord.objects
+                .filter(pk__gt=last_pk)
+                .order_by("pk")
+                .only(*fields)[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            scanned += len(batch)
+
+            changed = []
+            for rec in batch:
+                key = rec.compute_shelf_key()
+                if rec.shelf_key != key:
+                    rec.shelf_key = key
+                    changed.append(rec)
+            if changed:
+                with transaction.atomic():
+                    BibliographicRecord.objects.bulk_update(changed, ["shelf_key"])
+                updated += len(changed)
+            self.stdout.write(f"{scanned} registros revisados, {updated} actualizados")
+
+        self.stdout.write(self.style.SUCCESS(f"shelf_key listo: {updated} de {scanned} registros actualizados."))
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import random
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from catalog.models import BibliographicRecord, InventorySession
+from catalog.services import codes
+
+ENDPOINTS = ("suggest", "lookup", "scans")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el rendimiento concurrente de las APIs asíncronas (autocompletado, consulta de "
+        "códigos, lecturas de inventario) por el manejador WSGI (hilos) y por el ASGI (asyncio). "
+        "Corre en el proceso, sin red ni servidor: mide Django + ORM, no uvicorn/gunicorn."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="Peticiones por endpoint y camino.")
+        parser.add_argument("--concurrency", type=int, default=32, help="Peticiones simultáneas.")
+        parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help=f"Subconjunto de {', '.join(ENDPOINTS)}.")
+        parser.add_argument(
+            "--user", help="Usuario con permiso catalog.add_inventoryevent (requerido para lookup y scans).",
+        )
+        parser.add_argument("--batch", type=int, default=20, help="Lecturas por lote en `scans`.")
+        parser.add_argument("--seed", type=int, default=321)
+
+    def handle(self, *args, **opts):
+        endpoints = [e.strip() for e in opts["endpoints"].split(",") if e.strip()]
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f"Endpoints desconocidos: {', '.join(sorted(unknown))}")
+        user = None
+        if opts["user"]:
+            user = get_user_model().objects.filter(username=opts["user"]).first()
+            if user is None or not user.has_perm("catalog.add_inventoryevent"):
+                raise CommandError(f"'{opts['user']}' no existe o no tiene permiso catalog.add_inventoryevent.")
+        elif set(endpoints) & {"lookup", "scans"}:
+            self.stderr.write("Sin --user: se omiten lookup y scans.")
+            endpoints = [e for e in endpoints if e == "suggest"]
+
+        rows = list(BibliographicRecord.objects.order_by("?").values_list("inventory_code", "title_norm")[:2000])
+        if not rows:
+            raise CommandError("No hay registros: importe o restaure una instantánea primero.")
+        self.rnd = random.Random(opts["seed"])
+        self.inv_codes = [inv for inv, _ in rows if inv]
+        self.prefixes = [title[:3] for _, title in rows if len(title) >= 3]
+        self.batch = opts["batch"]
+
+        session = None
+        if "scans" in endpoints:
+            session = InventorySession.objects.create(name=f"bench {uuid.uuid4().hex[:8]}", started_by=user)
+        self.session_id = session.pk if session else None
+        # Los clientes de prueba usan el host "testserver"
+        hosts = override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"])
+        try:
+            hosts.enable()
+            for endpoint in endpoints:
+                requests = [self.build(endpoint) for _ in range(opts["requests"])]
+                for path, runner in (("WSGI", self.run_wsgi), ("ASGI", self.run_asgi)):
+                    # Misma caché de códigos fría para ambos caminos
+                    codes.clear_cache()
+                    started = time.perf_counter()
+                    latencies, errors = runner(requests, opts["concurrency"], user)
+                    self.report(endpoint, path, time.perf_counter() - started, latencies, errors)
+        finally:
+            hosts.disable()
+            if session is not None:
+                session.delete()
+
+    # ---------- Peticiones ----------
+    def build(self, endpoint):
+        """(método, url, cuerpo JSON o None) de una petición de prueba."""
+        rnd = self.rnd
+        if endpoint == "suggest":
+            return "get", f"{reverse('catalog:suggest')}?field=title&q={rnd.choice(self.prefixes)}", None
+        if endpoint == "lookup":
+            query = "&".join(f"code={rnd.choice(self.inv_codes)}" for _ in range(5))
+            return "get", f"{reverse('catalog:code_lookup')}?{query}", None
+        scans = [
+            {"code": rnd.choice(self.inv_codes), "at": int(time.time() * 1000), "key": uuid.uuid4().hex}
+            for _ in range(self.batch)
+        ]
+        body = json.dumps({"session": self.session_id, "device": "bench", "scans": scans})
+        return "post", reverse("catalog:inventory_scan_batch"), body
+
+    def run_wsgi(self, requests, concurrency, user):
+        local = threading.local()
+
+        def one(req):
+            client = getattr(local, "client", None)
+            if client is None:
+                client = local.client = Client()
+                if user is not None:
+                    client.force_login(user)
+            method, url, body = req
+            t0 = time.perf_counter()
+            if body is None:
+                response = client.get(url)
+            else:
+                response = client.post(url, body, content_type="application/json")
+            return time.perf_counter() - t0, response.status_code
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, requests))
+        return [lat for lat, _ in results], sum(1 for _, status in results if status != 200)
+
+    def run_asgi(self, requests, concurrency, user):
+        async def main():
+            client = AsyncClient()
+            if user is not None:
+                await client.aforce_login(user)
+            gate = asyncio.Semaphore(concurrency)
+
+            async def one(req):
+                method, url, body = req
+                async with gate:
+                    t0 = time.perf_counter()
+                    if body is None:
+                        response = await client.get(url)
+                    else:
+                        response = await client.post(url, body, content_type="application/json")
+                    return time.perf_counter() - t0, response.status_code
+
+            return await asyncio.gather(*(one(req) for req in requests))
+
+        results = asyncio.run(main())
+        return [lat for lat, _ in results], sum(1 for _, status in results if status != 200)
+
+    def report(self, endpoint, path, elapsed, latencies, errors):
+        latencies = sorted(latencies)
+        p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+        line = (
+            f"{endpoint:8} {path}: {len(latencies)} peticiones en {elapsed:.2f}s "
+            f"({len(latencies) / elapsed:,.0f}/s) · p50 {statistics.median(latencies) * 1000:.1f} ms "
+            f"· p95 {p95 * 1000:.1f} ms"
+        )
+        if errors:
+            self.stdout.write(self.style.ERROR(f"{line} · {errors} errores"))
+        else:
+            self.stdout.write(line)
@@ -0,0 +1,75 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from catalog.services.lcc import (
+    KEYWORDS_TO_CLASS, NORMALIZED_KEYWORDS, _STOPWORDS,
+    _class_letters_from_subjects, normalize_text,
+)
+
+
+def _legacy_class_letters(text):
+    """Implementación previa (recorrido lineal del mapa) usada como referencia."""
+    text_norm = normalize_text(text or "")
+    for kw_norm, clazz in NORMALIZED_KEYWORDS.items():
+        if kw_norm and kw_norm in text_norm:
+            return clazz
+    text_tokens = set(w for w in text_norm.split() if w and w not in _STOPWORDS)
+    if text_tokens:
+        for kw_norm, clazz in NORMALIZED_KEYWORDS.items():
+            kw_tokens = set(w for w in kw_norm.split() if w and w not in _STOPWORDS)
+            if not kw_tokens:
+                continue
+            inter = kw_tokens.intersection(text_tokens)
+            needed = max(1, len(kw_tokens) - 1)
+            if len(inter) >= needed:
+                return clazz
+    return "Z"
+
+
+# Palabras de relleno (con tildes/mayúsculas) para simular materias reales
+_FILLER = [
+    "Introducción", "México", "siglo XX", "Zacatecas", "estudio de caso",
+    "Manual", "Práctica", "Tesis", "América", "formación", "docente",
+    "investigación", "enseñanza", "análisis", "teoría", "niños", "aula",
+]
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark de la inferencia de clase LCC por keywords (matcher compilado vs. lineal)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--n", type=int, default=1_000_000, help="Cantidad de materias a clasificar.")
+        parser.add_argument("--seed", type=int, default=321)
+        parser.add_argument(
+            "--legacy-sample", type=int, default=100_000,
+            help="Cuántas materias medir/verificar con la implementación lineal (0 = todas).",
+        )
+
+    def handle(self, *args, **opts):
+        rnd = random.Random(opts["seed"])
+        keywords = list(KEYWORDS_TO_CLASS)
+        subjects = []
+        for _ in range(opts["n"]):
+            words = rnd.sample(_FILLER, rnd.randint(1, 4))
+            if rnd.random() < 0.8:
+                words.insert(rnd.randint(0, len(words)), rnd.choice(keywords).title())
+            subjects.append("; ".join(words) if rnd.random() < 0.5 else " -- ".join(words))
+
+        t0 = time.perf_counter()
+        compiled = [_class_letters_from_subjects(s) for s in subjects]
+        t_new = time.perf_counter() - t0
+
+        sample = subjects[:opts["legacy_sample"]] if opts["legacy_sample"] else subjects
+        t0 = time.perf_counter()
+        legacy = [_legacy_class_letters(s) for s in sample]
+        t_old = time.perf_counter() - t0
+
+        mismatches = sum(1 for a, b in zip(compiled, legacy) if a != b)
+        self.stdout.write(f"Compilado: {len(subjects)} materias en {t_new:.2f}s ({len(subjects) / t_new:,.0f}/s)")
+        self.stdout.write(f"Lineal:    {len(sample)} materias en {t_old:.2f}s ({len(sample) / t_old:,.0f}/s)")
+        if mismatches:
+            self.stderr.write(self.style.ERROR(f"{mismatches} diferencias contra la implementación lineal"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Resultados idénticos en {len(sample)} materias verificadas."))
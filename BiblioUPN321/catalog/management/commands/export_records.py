@@ -0,0 +1,68 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.models import BibliographicRecord
+from catalog.services.export import FORMATS, export_stream
+
+
+class Command(BaseCommand):
+    """Exporta el catálogo (registros con autores, materias y ejemplares).
+
+    La lectura y la escritura son en streaming (ver `services/export.py`),
+    así que la memoria se mantiene constante sin importar el tamaño del
+    catálogo; a diferencia de `dumpdata`, no carga todo antes de escribir.
+
+    Ejemplos:
+      manage.py export_records --output catalogo.csv
+      manage.py export_records --format jsonl --output catalogo.jsonl.gz
+      manage.py export_records --format marcxml --ids 1-5000 > parte.xml
+    """
+
+    help = "Exporta registros bibliográficos en CSV, JSON Lines o MARCXML."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(FORMATS), default=None,
+                            help="Por defecto se deduce de la extensión de --output (o csv).")
+        parser.add_argument("--output", default="-", help="Archivo de salida ('-' = salida estándar).")
+        parser.add_argument("--gzip", action="store_true",
+                            help="Comprime con gzip (implícito si --output termina en .gz).")
+        parser.add_argument("--ids", default="", help="Rango de pk 'desde-hasta' (ambos opcionales).")
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **opts):
+        output = opts["output"]
+        compress = opts["gzip"] or output.endswith(".gz")
+        fmt = opts["format"] or self.guess_format(output[:-3] if output.endswith(".gz") else output)
+
+        qs = BibliographicRecord.objects.all()
+        if opts["ids"]:
+            lo, _, hi = opts["ids"].partition("-")
+            try:
+                if lo:
+                    qs = qs.filter(pk__gte=int(lo))
+                if hi:
+                    qs = qs.filter(pk__lte=int(hi))
+            except ValueError:
+                raise CommandError("--ids debe tener la forma 'desde-hasta'.")
+
+        chunks = export_stream(qs, fmt, compress=compress, chunk_size=opts["chunk_size"])
+        if output == "-":
+            out = sys.stdout.buffer
+            for data in chunks:
+                out.write(data)
+            out.flush()
+            return
+        written = 0
+        with open(output, "wb") as fh:
+            for data in chunks:
+                fh.write(data)
+                written += len(data)
+        self.stdout.write(self.style.SUCCESS(f"Exportación {fmt} escrita en {output} ({written} bytes)."))
+
+    @staticmethod
+    def guess_format(path: str) -> str:
+        for fmt, (_, ext) in FORMATS.items():
+            if path.lower().endswith("." + ext):
+                return fmt
+        return "csv"
@@ -1,18 +1,103 @@
-from django.core.management.base import BaseCommand
-from catalog.models import Item
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from catalog.models import BibliographicRecord, Item, QRJob
+from catalog.services.qr import render_many
+
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
 
 
 class Command(BaseCommand):
-    help = "Genera códigos QR para los ejemplares que no tengan uno asignado."
+    """Genera y guarda los PNG de QR faltantes (registros y/o ejemplares).
 
-    def handle(self, *args, **options):
-        qs = Item.objects.filter(qr_image__isnull=True)
-        total = qs.count()
-        self.stdout.write(f"Encontrados {total} ejemplares sin QR.\n")
-        for idx, it in enumerate(qs, start=1):
-            payload = f"barcode:{it.barcode}|record:{it.record.pk}|title:{it.record.title}"
-            it.generate_qr(payload)
-            it.save()
-            self.stdout.write(f"[{idx}/{total}] Generado QR para {it.barcode}\n")
+    - Lee con `iterator(chunk_size=...)` y `select_related("record")`, sin
+      una consulta por ejemplar.
+    - El renderizado (CPU) se reparte por lotes en un `ProcessPoolExecutor`;
+      el proceso principal sólo escribe los archivos y hace un `bulk_update`
+      de `qr_image` por lote.
+    - Considera faltante tanto `qr_image` NULL como cadena vacía.
+    """
+
+    help = "Genera códigos QR para los registros/ejemplares que no tengan uno asignado."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="Procesos de renderizado (1 = en el proceso actual).")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--records", action="store_true", help="Sólo registros bibliográficos.")
+        parser.add_argument("--items", action="store_true", help="Sólo ejemplares.")
+
+    def handle(self, *args, **opts):
+        if opts["batch_size"] < 1 or opts["workers"] < 1:
+            raise CommandError("--batch-size y --workers deben ser positivos.")
+        both = not opts["records"] and not opts["items"]
+        targets = []
+        if opts["records"] or both:
+            targets.append((QRJob.Target.RECORD, BibliographicRecord.objects.all(), "rec_{obj.pk}.png"))
+        if opts["items"] or both:
+            targets.append((QRJob.Target.ITEM, Item.objects.select_related("record"), "{obj.barcode}_qr.png"))
+
+        executor = ProcessPoolExecutor(max_workers=opts["workers"]) if opts["workers"] > 1 else None
+        try:
+            for target, qs, filename in targets:
+                self.generate(target, qs, filename, opts["batch_size"], executor, opts["workers"])
+        finally:
+            if executor is not None:
+                executor.shutdown()
 
         self.stdout.write(self.style.SUCCESS("Generación de QR completada."))
+
+    def generate(self, target, qs, filename, batch_size, executor, workers):
+        model = qs.model
+        qs = qs.filter(Q(qr_image__isnull=True) | Q(qr_image="")).order_by("pk")
+        total = qs.count()
+        label = model._meta.verbose_name_plural
+        self.stdout.write(f"Encontrados {total} {label} sin QR.")
+        if not total:
+            return
+
+        field = model._meta.get_field("qr_image")
+        storage = field.storage
+        done = 0
+
+        def store(objects, rendered):
+            nonlocal done
+            for pk, data in rendered:
+                obj = objects[pk]
+                name = field.generate_filename(obj, filename.format(obj=obj))
+                obj.qr_image.name = storage.save(name, ContentFile(data))
+            model.objects.bulk_update(objects.values(), ["qr_image"], batch_size=batch_size)
+            QRJob.objects.filter(target=target, object_id__in=list(objects)).delete()
+            done += len(objects)
+            self.stdout.write(f"[{done}/{total}] {label}")
+
+        # Cada lote se subdivide entre los procesos; se mantienen a lo sumo
+        # dos lotes en vuelo (uno se renderiza mientras otro se guarda) para
+        # acotar la memoria.
+        pending = []
+        sub_size = max(1, batch_size // workers)
+        for chunk in _chunks(qs.iterator(chunk_size=batch_size), batch_size):
+            objects = {obj.pk: obj for obj in chunk}
+            jobs = [(obj.pk, obj.get_qr_payload()) for obj in chunk]
+            if executor is None:
+                store(objects, render_many(jobs))
+                continue
+            futures = [executor.submit(render_many, part) for part in _chunks(jobs, sub_size)]
+            pending.append((objects, futures))
+            while len(pending) >= 2:
+                objects, futures = pending.pop(0)
+                store(objects, [row for f in futures for row in f.result()])
+        for objects, futures in pending:
+            store(objects, [row for f in futures for row in f.result()])
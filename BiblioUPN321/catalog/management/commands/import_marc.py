@@ -0,0 +1,120 @@
+import csv
+import gzip
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.services.importer import BulkImporter, RowError, prepare_row
+from catalog.services.marc import MarcError, detect_format, iter_marc21, iter_marcxml, marc_to_row
+
+
+class Command(BaseCommand):
+    """Importa registros desde MARC21 binario (ISO 2709) o MARCXML.
+
+    Los archivos se leen en streaming (un registro a la vez; MARCXML con
+    `iterparse`), así que la memoria es constante aunque pesen varios GB.
+    Admite archivos `.gz`. El formato se deduce del contenido salvo que se
+    indique con `--format`.
+
+    Campos: 020 (ISBN), 022 (ISSN), 050 (signatura LC, usada tal cual),
+    100 (autor), 245 $a/$b (título/subtítulo), 264 o 260 (lugar, editorial,
+    año) y 650 (materias). La escritura usa el mismo `BulkImporter` que
+    `import_records`, con la misma detección de duplicados.
+    """
+
+    help = "Importa registros bibliográficos desde MARC21 o MARCXML"
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="Archivos .mrc/.xml (opcionalmente .gz).")
+        parser.add_argument("--format", choices=["auto", "marc21", "marcxml"], default="auto")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--rejects", default="",
+                            help="CSV de registros rechazados (por defecto <archivo>.rejects.csv).")
+
+    def handle(self, *args, **opts):
+        if opts["batch_size"] < 1:
+            raise CommandError("--batch-size debe ser positivo.")
+        self.importer = BulkImporter(batch_size=opts["batch_size"], on_reject=self.on_reject)
+        self.rejected = 0
+        started = time.monotonic()
+        total = 0
+        for path in opts["paths"]:
+            total += self.import_file(path, opts)
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        stats = self.importer.stats
+        self.stdout.write(self.style.SUCCESS(
+            f"Importación completada: {stats['created']} creados, {stats['duplicates']} duplicados, "
+            f"{self.rejected} inválidos, {stats['errors']} con error ({total / elapsed:.0f} registros/s)."
+        ))
+
+    def open(self, path: str):
+        fh = open(path, "rb")
+        if fh.read(2) == b"\x1f\x8b":
+            fh.close()
+            return gzip.open(path, "rb")
+        fh.seek(0)
+        return fh
+
+    def import_file(self, path: str, opts) -> int:
+        self.rejects_path = opts["rejects"] or f"{path}.rejects.csv"
+        self.rejects_file = self.rejects_writer = None
+        read = 0
+        try:
+            with self.open(path) as fh:
+                fmt = opts["format"]
+                if fmt == "auto":
+                    fmt = detect_format(fh.peek(64)[:64] if hasattr(fh, "peek") else b"")
+                records = iter_marcxml(fh) if fmt == "marcxml" else iter_marc21(fh)
+                self.stdout.write(f"{path}: formato {fmt}")
+
+                lines = enumerate(records, start=1)
+                while True:
+                    chunk = list(islice(lines, opts["batch_size"]))
+                    if not chunk:
+                        break
+                    rows = []
+                    for line, rec in chunk:
+                        row = self.to_row(line, rec)
+                        if row is not None:
+                            rows.append(prepare_row(row))
+                    if rows:
+                        self.importer.write_batch(rows)
+                    read += len(chunk)
+                    self.stdout.write(f"{read} registros leídos, {self.importer.stats['created']} creados")
+        except (MarcError, SyntaxError) as exc:
+            # Archivo truncado o XML mal formado: lo ya confirmado se conserva
+            raise CommandError(f"{path}: archivo ilegible tras {read} registros ({exc}).")
+        finally:
+            if self.rejects_file is not None:
+                self.rejects_file.close()
+        return read
+
+    def to_row(self, line: int, rec):
+        """`ImportRow` del registro, o None si se rechaza."""
+        try:
+            if isinstance(rec, MarcError):
+                raise RowError(f"registro MARC inválido: {rec}")
+            row = marc_to_row(rec)
+        except RowError as exc:
+            self.rejected += 1
+            self.write_reject(line, str(exc), {} if isinstance(rec, MarcError) else self.source(rec))
+            return None
+        row.line, row.source = line, self.source(rec)
+        return row
+
+    @staticmethod
+    def source(rec):
+        return {"001": rec.control.get("001", ""), "245": rec.first("245", "a")}
+
+    # ---------- Rechazos ----------
+    def write_reject(self, line: int, reason: str, source):
+        if self.rejects_writer is None:
+            self.rejects_file = open(self.rejects_path, "w", newline="", encoding="utf-8")
+            self.rejects_writer = csv.writer(self.rejects_file)
+            self.rejects_writer.writerow(["registro", "motivo", "001", "245"])
+        self.rejects_writer.writerow([line, reason, source.get("001", ""), source.get("245", "")])
+
+    def on_reject(self, row, reason: str):
+        self.write_reject(row.line, reason, row.source or {})
@@ -0,0 +1,193 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from catalog.services.importer import BulkImporter, init_worker, prepare_chunk
+
+
+class Command(BaseCommand):
+    """Comando de gestión para importar registros bibliográficos desde CSV.
+
+    El CSV debe contener columnas (al menos): `title`. Opcionales: `subtitle`,
+    `resource_type`, `edition`, `language`, `publish_year`, `publisher`,
+    `publish_place`, `isbn`, `issn`, `call_number`, `physical_desc`, `series`,
+    `notes`, `authors` (separados por ';'), `subjects` (separados por ';').
+
+    Las filas se procesan por lotes (`--batch-size`) con `BulkImporter`
+    (ver `catalog/services/importer.py`): cachés de editoriales, personas y
+    materias, `bulk_create` por lote y campos derivados calculados en Python.
+    Los duplicados se detectan por ISBN/ISSN normalizado (`ident_key`).
+
+    Con `--workers N` (N > 1) el parseo y el cálculo de LCC/signatura se
+    reparten en N procesos; este proceso lee el CSV, mantiene como máximo
+    `--queue-size` lotes en vuelo (contrapresión) y es el único que escribe
+    en la BD, en el mismo orden del archivo.
+
+    Tras cada lote confirmado se guarda `<csv>.checkpoint.json` (posición en
+    el archivo y número de lote); `--resume` continúa desde ahí. Las filas
+    rechazadas (inválidas, duplicadas o con error de BD) se escriben con su
+    motivo en `<csv>.rejects.csv`.
+    """
+
+    help = "Importa registros bibliográficos desde CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path", type=str)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--delimiter", default=",")
+        parser.add_argument("--encoding", default="utf-8")
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Procesos de parseo/normalización (1 = todo en este proceso).")
+        parser.add_argument("--queue-size", type=int, default=0,
+                            help="Lotes en vuelo como máximo (por defecto 2 × workers).")
+        parser.add_argument("--resume", action="store_true",
+                            help="Continúa desde el último checkpoint, si existe.")
+        parser.add_argument("--rejects", default="",
+                            help="CSV de filas rechazadas (por defecto <csv>.rejects.csv).")
+
+    def handle(self, *args, **opts):
+        if opts["batch_size"] < 1 or opts["workers"] < 1:
+            raise CommandError("--batch-size y --workers deben ser positivos.")
+        path = opts["csv_path"]
+        self.checkpoint_path = f"{path}.checkpoint.json"
+        self.rejects_path = opts["rejects"] or f"{path}.rejects.csv"
+        self.rejects_file = self.rejects_writer = None
+        self.importer = BulkImporter(batch_size=opts["batch_size"], on_reject=self.on_reject)
+        stat = os.stat(path)
+        self.source_id = {"size": stat.st_size, "mtime": int(stat.st_mtime)}
+
+        checkpoint = self.load_checkpoint() if opts["resume"] else None
+        if opts["resume"] and checkpoint is None:
+            self.stdout.write("Sin checkpoint: se importa desde el inicio.")
+        elif checkpoint is None and os.path.exists(self.checkpoint_path):
+            self.stdout.write(self.style.WARNING("Existe un checkpoint previo; se ignora (use --resume)."))
+
+        self.batch = checkpoint["batch"] if checkpoint else 0
+        self.read = self.start_read = checkpoint["rows"] if checkpoint else 0
+        self.rejected = 0
+        started = time.monotonic()
+
+        with open(path, newline="", encoding=opts["encoding"]) as f:
+            # readline() (y no la iteración del archivo) para que f.tell() sea válido
+            lines = iter(f.readline, "")
+            if checkpoint:
+                f.seek(checkpoint["offset"])
+                reader = csv.DictReader(lines, fieldnames=checkpoint["fieldnames"], delimiter=opts["delimiter"])
+                self.stdout.write(f"Reanudando tras el lote {self.batch} (fila {self.read}).")
+            else:
+                reader = csv.DictReader(lines, delimiter=opts["delimiter"])
+            self.fieldnames = reader.fieldnames or []
+            if not checkpoint:
+                self.reset_rejects()
+
+            chunks = self.read_chunks(reader, f, opts["batch_size"])
+            try:
+                if opts["workers"] == 1:
+                    for offset, first_line, chunk in chunks:
+                        self.write(offset, len(chunk), prepare_chunk(chunk, first_line))
+                else:
+                    self.run_pipeline(chunks, opts["workers"], opts["queue_size"] or 2 * opts["workers"])
+            finally:
+                if self.rejects_file is not None:
+                    self.rejects_file.close()
+
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        elapsed = max(time.monotonic() - started, 1e-6)
+        stats = self.importer.stats
+        self.stdout.write(self.style.SUCCESS(
+            f"Importación completada: {stats['created']} creados, {stats['duplicates']} duplicados, "
+            f"{self.rejected} inválidos, {stats['errors']} con error "
+            f"({(self.read - self.start_read) / elapsed:.0f} filas/s)."
+        ))
+        if self.rejected or stats["duplicates"] or stats["errors"]:
+            self.stdout.write(f"Rechazos en {self.rejects_path}")
+
+    def read_chunks(self, reader, f, size: int):
+        """Genera (posición tras el lote, nº de la primera fila, filas)."""
+        line = self.read + 1
+        while True:
+            chunk = []
+            for row in reader:
+                chunk.append(row)
+                if len(chunk) >= size:
+                    break
+            if not chunk:
+                return
+            yield f.tell(), line, chunk
+            line += len(chunk)
+
+    def run_pipeline(self, chunks, workers: int, queue_size: int):
+        # Los hijos no deben heredar conexiones abiertas (con `fork`)
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+            pending = []
+            for offset, first_line, chunk in chunks:
+                pending.append((offset, len(chunk), executor.submit(prepare_chunk, chunk, first_line)))
+                if len(pending) >= queue_size:
+                    offset, size, future = pending.pop(0)
+                    self.write(offset, size, future.result())
+            for offset, size, future in pending:
+                self.write(offset, size, future.result())
+
+    def write(self, offset: int, size: int, prepared):
+        rows, rejects = prepared
+        for line, reason, raw in rejects:
+            self.write_reject(line, reason, raw)
+        self.rejected += len(rejects)
+        if rows:
+            self.importer.write_batch(rows)
+        self.read += size
+        self.batch += 1
+        self.save_checkpoint(offset)
+        self.stdout.write(f"Lote {self.batch}: {self.read} filas leídas, {self.importer.stats['created']} creadas")
+
+    # ---------- Checkpoint ----------
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as fh:
+                checkpoint = json.load(fh)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            raise CommandError(f"Checkpoint ilegible: {self.checkpoint_path}")
+        if checkpoint.get("source") != self.source_id:
+            raise CommandError("El CSV cambió desde el checkpoint; borre el archivo o importe sin --resume.")
+        return checkpoint
+
+    def save_checkpoint(self, offset: int):
+        if self.rejects_file is not None:
+            self.rejects_file.flush()
+        data = {
+            "offset": offset,
+            "batch": self.batch,
+            "rows": self.read,
+            "fieldnames": self.fieldnames,
+            "source": self.source_id,
+        }
+        tmp = f"{self.checkpoint_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(data, fh)
+        os.replace(tmp, self.checkpoint_path)  # atómico: nunca queda a medias
+
+    # ---------- Rechazos ----------
+    def reset_rejects(self):
+        if os.path.exists(self.rejects_path):
+            os.remove(self.rejects_path)
+
+    def write_reject(self, line: int, reason: str, raw):
+        if self.rejects_writer is None:
+            is_new = not os.path.exists(self.rejects_path)
+            self.rejects_file = open(self.rejects_path, "a", newline="", encoding="utf-8")
+            self.rejects_writer = csv.writer(self.rejects_file)
+            if is_new:
+                self.rejects_writer.writerow(["fila", "motivo", *self.fieldnames])
+        self.rejects_writer.writerow([line, reason, *[(raw or {}).get(k, "") for k in self.fieldnames]])
+
+    def on_reject(self, row, reason: str):
+        self.write_reject(row.line, reason, row.source)
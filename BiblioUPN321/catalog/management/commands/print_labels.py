@@ -0,0 +1,64 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.models import BibliographicRecord, Item
+from catalog.services.labels import PAGE_SIZES, SheetLayout, labels_for, write_sheets
+
+
+class Command(BaseCommand):
+    """Imprime hojas de etiquetas (QR + código + signatura) en PDF o PNG.
+
+    Ejemplos:
+      manage.py print_labels --output etiquetas.pdf
+      manage.py print_labels --records --ids 10-500 --page letter --output rec.pdf
+      manage.py print_labels --location A1 --format png --output /tmp/hoja
+    """
+
+    help = "Genera hojas de etiquetas con QR para ejemplares o registros."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", required=True,
+                            help="Archivo PDF o prefijo de los PNG por página.")
+        parser.add_argument("--format", choices=["pdf", "png"], default=None,
+                            help="Por defecto se deduce de la extensión de --output.")
+        parser.add_argument("--records", action="store_true",
+                            help="Etiquetas de registros en lugar de ejemplares.")
+        parser.add_argument("--ids", default="", help="Rango de pk 'desde-hasta' (ambos opcionales).")
+        parser.add_argument("--location", default="", help="Sólo ejemplares de esta ubicación (código).")
+        parser.add_argument("--page", choices=sorted(PAGE_SIZES), default="a4")
+        parser.add_argument("--cols", type=int, default=3)
+        parser.add_argument("--rows", type=int, default=8)
+        parser.add_argument("--dpi", type=int, default=300)
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+
+    def handle(self, *args, **opts):
+        output = opts["output"]
+        fmt = opts["format"] or ("pdf" if output.lower().endswith(".pdf") else "png")
+        if fmt == "png" and output.lower().endswith(".png"):
+            output = output[:-4]
+
+        if opts["records"]:
+            qs = BibliographicRecord.objects.all()
+        else:
+            qs = Item.objects.all()
+            if opts["location"]:
+                qs = qs.filter(location__code=opts["location"])
+        if opts["ids"]:
+            lo, _, hi = opts["ids"].partition("-")
+            try:
+                if lo:
+                    qs = qs.filter(pk__gte=int(lo))
+                if hi:
+                    qs = qs.filter(pk__lte=int(hi))
+            except ValueError:
+                raise CommandError("--ids debe tener la forma 'desde-hasta'.")
+        # Orden de estante para que las etiquetas salgan como se colocan
+        qs = qs.order_by("record__shelf_key", "pk") if not opts["records"] else qs.order_by("shelf_key", "pk")
+
+        layout = SheetLayout(page=opts["page"], cols=opts["cols"], rows=opts["rows"], dpi=opts["dpi"])
+        pages = write_sheets(labels_for(qs), output, fmt=fmt, layout=layout, workers=opts["workers"])
+        if not pages:
+            self.stdout.write(self.style.WARNING("No hay etiquetas que imprimir."))
+            return
+        self.stdout.write(self.style.SUCCESS(f"{pages} páginas ({layout.per_page} etiquetas c/u) en {output}"))
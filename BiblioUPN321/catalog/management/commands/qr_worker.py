@@ -0,0 +1,96 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from catalog.models import BibliographicRecord, Item, QRJob
+
+
+class Command(BaseCommand):
+    """Procesa la cola `QRJob`: genera los PNG pendientes por lotes.
+
+    Cada lote se toma con `select_for_update(skip_locked=True)` (en motores
+    que lo soportan), de modo que pueden correr varios workers a la vez. Los
+    objetos se cargan con una consulta por tipo y `qr_image` se escribe con un
+    único `bulk_update`. Los trabajos que fallan quedan en la cola con su
+    error hasta agotar `--max-attempts`.
+    """
+
+    help = "Genera en segundo plano los códigos QR encolados por los save()."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--sleep", type=float, default=5.0, help="Espera (s) cuando la cola está vacía.")
+        parser.add_argument("--once", action="store_true", help="Vacía la cola y termina.")
+        parser.add_argument("--max-attempts", type=int, default=5)
+        parser.add_argument("--status", action="store_true", help="Muestra la profundidad de la cola y termina.")
+
+    def handle(self, *args, **opts):
+        if opts["status"]:
+            pending = QRJob.objects.filter(attempts__lt=opts["max_attempts"])
+            for target, label in QRJob.Target.choices:
+                self.stdout.write(f"{label}: {pending.filter(target=target).count()} pendientes")
+            failed = QRJob.objects.filter(attempts__gte=opts["max_attempts"]).count()
+            self.stdout.write(f"Fallidos (sin reintentos): {failed}")
+            return
+
+        done = 0
+        while True:
+            processed = self.process_batch(opts["batch_size"], opts["max_attempts"])
+            done += processed
+            if processed:
+                self.stdout.write(f"{done} trabajos procesados")
+                continue
+            if opts["once"]:
+                break
+            time.sleep(opts["sleep"])
+
+        self.stdout.write(self.style.SUCCESS(f"Cola vacía: {done} trabajos procesados."))
+
+    def process_batch(self, batch_size: int, max_attempts: int) -> int:
+        with transaction.atomic():
+            jobs = list(
+                QRJob.objects.select_for_update(skip_locked=True)
+                .filter(attempts__lt=max_attempts)
+                .order_by("id")[:batch_size]
+            )
+            if not jobs:
+                return 0
+
+            by_target = {
+                QRJob.Target.RECORD: BibliographicRecord.objects.all(),
+                QRJob.Target.ITEM: Item.objects.select_related("record"),
+            }
+            finished, failed = [], []
+            for target, qs in by_target.items():
+                target_jobs = [j for j in jobs if j.target == target]
+                if not target_jobs:
+                    continue
+                objects = qs.in_bulk([j.object_id for j in target_jobs])
+                rendered = []
+                for job in target_jobs:
+                    obj = objects.get(job.object_id)
+                    # Borrado o ya con QR: no hay nada que hacer
+                    if obj is None or obj.qr_image:
+                        finished.append(job.pk)
+                        continue
+                    try:
+                        obj.attach_qr()
+                        if not obj.qr_image:
+                            raise RuntimeError("no se pudo generar la imagen QR")
+                    except Exception as exc:
+                        job.attempts += 1
+                        job.last_error = str(exc)
+                        failed.append(job)
+                        continue
+                    rendered.append(obj)
+                    finished.append(job.pk)
+                if rendered:
+                    qs.model.objects.bulk_update(rendered, ["qr_image"])
+
+            QRJob.objects.filter(pk__in=finished).delete()
+            if failed:
+                QRJob.objects.bulk_update(failed, ["attempts", "last_error"])
+                for job in failed:
+                    self.stderr.write(f"Error en {job}: {job.last_error}")
+        return len(jobs)
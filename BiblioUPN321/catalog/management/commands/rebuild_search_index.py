@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from catalog.models import BibliographicRecord
+from catalog.services.search import get_search_backend
+
+
+class Command(BaseCommand):
+    """Reconstruye el índice de búsqueda del backend activo.
+
+    Necesario tras cargas masivas que no disparan señales (`bulk_create`,
+    `loaddata`, SQL directo) o al cambiar `CATALOG_SEARCH_BACKEND`.
+    """
+
+    help = "Reconstruye el índice de búsqueda de texto completo del catálogo."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **opts):
+        backend = get_search_backend()
+        self.stdout.write(f"Backend de búsqueda: {backend.name}")
+        backend.clear()
+
+        batch_size = opts["batch_size"]
+        last_pk = 0
+        total = 0
+        while True:
+            ids = list(
+                BibliographicRecord.objects.filter(pk__gt=last_pk)
+                .order_by("pk").values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                backend.index_records(ids)
+            last_pk = ids[-1]
+            total += len(ids)
+            self.stdout.write(f"{total} registros indexados")
+
+        self.stdout.write(self.style.SUCCESS(f"Índice reconstruido: {total} registros."))
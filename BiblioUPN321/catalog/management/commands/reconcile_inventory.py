@@ -0,0 +1,53 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.models import InventorySession
+from catalog.services.reconcile import ReconcileError, iter_report, reconcile
+
+
+class Command(BaseCommand):
+    """Concilia una sesión de inventario contra los ejemplares de su ubicación.
+
+    Por defecto es incremental: sólo procesa los eventos llegados desde la
+    pasada anterior (ver `services/reconcile.py`). Con `--full` recalcula
+    todo, necesario si cambiaron los ejemplares de la ubicación.
+
+    Ejemplos:
+      manage.py reconcile_inventory 3
+      manage.py reconcile_inventory 3 --full --output faltantes.csv
+    """
+
+    help = "Calcula faltantes y ejemplares fuera de lugar de una sesión de inventario."
+
+    def add_arguments(self, parser):
+        parser.add_argument("session", type=int)
+        parser.add_argument("--full", action="store_true", help="Recalcula desde cero.")
+        parser.add_argument("--output", default="", help="CSV con el detalle ('-' = salida estándar).")
+
+    def handle(self, *args, **opts):
+        session = InventorySession.objects.filter(pk=opts["session"]).select_related("location").first()
+        if session is None:
+            raise CommandError(f"No existe la sesión {opts['session']}.")
+        started = time.monotonic()
+        try:
+            counts = reconcile(session, full=opts["full"])
+        except ReconcileError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.monotonic() - started
+
+        if opts["output"]:
+            out = sys.stdout if opts["output"] == "-" else open(opts["output"], "w", newline="", encoding="utf-8")
+            try:
+                for chunk in iter_report(session):
+                    out.write(chunk)
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+        if opts["output"] != "-":
+            self.stdout.write(self.style.SUCCESS(
+                f"{session} ({session.location.code}): {counts['expected']} esperados, "
+                f"{counts['missing']} faltantes, {counts['misplaced']} fuera de lugar "
+                f"({counts['events']} eventos procesados en {elapsed:.2f} s)."
+            ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from catalog.services.snapshot import dump
+
+
+class Command(BaseCommand):
+    """Vuelca el catálogo completo a un directorio de instantánea.
+
+    Un archivo `.jsonl.gz` por modelo (en orden de FK) más `manifest.json`;
+    ver `services/snapshot.py`. Se restaura con `snapshot_restore`.
+    """
+
+    help = "Vuelca el catálogo a una instantánea compacta (JSONL.gz por modelo)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory")
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **opts):
+        manifest = dump(opts["directory"], chunk_size=opts["chunk_size"], progress=self.progress)
+        total = sum(entry["rows"] for entry in manifest["models"])
+        self.stdout.write(self.style.SUCCESS(f"Instantánea escrita en {opts['directory']} ({total} filas)."))
+
+    def progress(self, label, count):
+        self.stdout.write(f"{label}: {count}")
@@ -0,0 +1,51 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.services import codes
+from catalog.services.facets import invalidate_facets
+from catalog.services.snapshot import SnapshotError, restore, snapshot_models
+
+
+class Command(BaseCommand):
+    """Restaura una instantánea de `snapshot_dump` con `bulk_create`.
+
+    No pasa por `save()` ni por señales (LCC, QR, `Book` pre_save): los
+    campos derivados ya están en la instantánea. Al terminar reconstruye el
+    índice de búsqueda, salvo con `--no-index`.
+    """
+
+    help = "Restaura el catálogo desde una instantánea de snapshot_dump."
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory")
+        parser.add_argument("--flush", action="store_true",
+                            help="Vacía las tablas del catálogo antes de restaurar.")
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--no-index", action="store_true",
+                            help="No reconstruye el índice de búsqueda al terminar "
+                                 "(con --flush queda vacío hasta correr rebuild_search_index).")
+
+    def handle(self, *args, **opts):
+        if not opts["flush"]:
+            busy = [m._meta.label for m in snapshot_models() if m._base_manager.exists()]
+            if busy:
+                raise CommandError(f"Hay datos en {', '.join(busy)}; use --flush para reemplazarlos.")
+        started = time.monotonic()
+        try:
+            manifest = restore(opts["directory"], batch_size=opts["batch_size"], replace=opts["flush"],
+                               progress=self.progress)
+        except SnapshotError as exc:
+            raise CommandError(str(exc))
+        invalidate_facets()
+        codes.clear_cache()
+        total = sum(entry["rows"] for entry in manifest["models"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Restauradas {total} filas en {time.monotonic() - started:.1f} s (instantánea del {manifest['created']})."
+        ))
+        if not opts["no_index"]:
+            call_command("rebuild_search_index", stdout=self.stdout)
+
+    def progress(self, label, count):
+        self.stdout.write(f"{label}: {count}")
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='bibliographicrecord',
+            options={'ordering': ['shelf_key', 'id']},
+        ),
+        migrations.AddField(
+            model_name='bibliographicrecord',
+            name='shelf_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='bibliographicrecord',
+            index=models.Index(fields=['shelf_key', 'id'], name='catalog_rec_shelf_idx'),
+        ),
+    ]
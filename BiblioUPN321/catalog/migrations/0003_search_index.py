@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from catalog.services.search import backend_for_vendor
+
+
+def install_search_index(apps, schema_editor):
+    # Crea la estructura del backend automático del motor (FTS5 / tsvector)
+    backend_for_vendor(schema_editor.connection.vendor, "auto").install(schema_editor)
+
+
+def uninstall_search_index(apps, schema_editor):
+    backend_for_vendor(schema_editor.connection.vendor, "auto").uninstall(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_shelf_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bibliographicrecord',
+            name='title_norm',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=512),
+        ),
+        migrations.AddField(
+            model_name='person',
+            name='full_name_norm',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='subject',
+            name='term_norm',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_normalized_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QRJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target', models.CharField(choices=[('record', 'Registro'), ('item', 'Ejemplar')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'unique_together': {('target', 'object_id')},
+            },
+        ),
+    ]
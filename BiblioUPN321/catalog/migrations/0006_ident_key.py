@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_qr_job_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bibliographicrecord',
+            name='ident_key',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=40),
+        ),
+    ]
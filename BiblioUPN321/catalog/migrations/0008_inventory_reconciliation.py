@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0007_inventory_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryFinding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('missing', 'Faltante'), ('misplaced', 'Fuera de lugar')], max_length=10)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='inventorysession',
+            name='reconciled_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='inventorysession',
+            name='reconciled_through',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='inventoryevent',
+            index=models.Index(fields=['session', 'item'], name='invevent_session_item'),
+        ),
+        migrations.AddField(
+            model_name='inventoryfinding',
+            name='item',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='catalog.item'),
+        ),
+        migrations.AddField(
+            model_name='inventoryfinding',
+            name='record',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='catalog.bibliographicrecord'),
+        ),
+        migrations.AddField(
+            model_name='inventoryfinding',
+            name='session',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='findings', to='catalog.inventorysession'),
+        ),
+        migrations.AddIndex(
+            model_name='inventoryfinding',
+            index=models.Index(fields=['session', 'kind', 'item'], name='invfinding_session_kind'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_inventory_reconciliation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventoryevent',
+            name='client_key',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_inventory_event_client_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventoryevent',
+            index=models.Index(fields=['session', 'received_at'], name='invevent_session_recv'),
+        ),
+    ]
@@ -1,11 +1,18 @@
 import uuid
+from typing import Optional
+from django.conf import settings
 from django.db import models
+from django.urls import reverse
 from django.core.validators import RegexValidator 
 from django.utils.translation import gettext_lazy as _
 import io, qrcode
 from django.core.files.base import ContentFile
 
-from .services.lcc import generate_lcc, normalize_lcc, split_lcc, build_call_number, build_sort_key
+from .services.qr import qr_version
+
+from .services.lcc import (
+    generate_lcc, identifier_key, normalize_lcc, normalize_text, split_lcc, build_call_number, build_sort_key,
+)
 
 LCC_REGEX = r"^[A-Z]{1,3}\s?\d{1,4}(\.\d+)?(\s?[A-Z]\d+)?(\s?\.\w+)?(\s?\d{4})?$"
 # Modelo base abstracto para proveer marcas de tiempo comunes a todos
@@ -38,9 +45,15 @@ class Subject(TimeStampedModel):
     Ejemplo: 'Programación', 'Historia del Perú', 'Matemáticas'
     """
     term = models.CharField(max_length=255, unique=True)
+    # Versión normalizada (sin tildes, minúsculas) para búsquedas por prefijo indexadas
+    term_norm = models.CharField(max_length=255, blank=True, default="", editable=False, db_index=True)
     
     def __str__(self):
         return self.term
+
+    def save(self, *args, **kwargs):
+        self.term_norm = normalize_text(self.term)
+        super().save(*args, **kwargs)
     
 
 class Location(TimeStampedModel):
@@ -68,13 +81,33 @@ class Person(TimeStampedModel):
     given = models.CharField(_("Nombres"), max_length=255, blank=True)
     family = models.CharField(_("Apellidos"), max_length=255, blank=True)
     full_name = models.CharField(max_length=255, unique=True)
+    full_name_norm = models.CharField(max_length=255, blank=True, default="", editable=False, db_index=True)
     VIAF = models.CharField(max_length=50, blank=True)
     ORCID = models.CharField(max_length=50, blank=True)
     
     def __str__(self):
         return self.full_name or f"{self.family}, {self.given}".strip(", ")
+
+    def save(self, *args, **kwargs):
+        self.full_name_norm = normalize_text(self.full_name)
+        super().save(*args, **kwargs)
     
 
+class BibliographicRecordQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Proyección para listados: editorial en el mismo SELECT y
+        contribuidores (con su persona) en una sola consulta extra por página,
+        disponibles en `listing_contributors`.
+        """
+        return self.select_related("publisher").prefetch_related(
+            models.Prefetch(
+                "contributors",
+                queryset=RecordContributor.objects.select_related("person").order_by("id"),
+                to_attr="listing_contributors",
+            )
+        )
+
+
 class BibliographicRecord(TimeStampedModel):
     """Registro bibliográfico principal que representa una obra.
 
@@ -92,6 +125,8 @@ class BibliographicRecord(TimeStampedModel):
         OTHER = "other", _("Otro")
     
     title = models.CharField(max_length=512)
+    # Título normalizado (ver `normalize_text`) para búsquedas por prefijo indexadas
+    title_norm = models.CharField(max_length=512, blank=True, default="", editable=False, db_index=True)
     subtitle = models.CharField(max_length=512, blank=True)
     resource_type = models.CharField(max_length=20, choices=ResourceType.choices, default=ResourceType.BOOK)
     edition = models.CharField(max_length=128, blank=True)
@@ -121,6 +156,8 @@ class BibliographicRecord(TimeStampedModel):
     isbn = models.CharField(max_length=32, blank=True, null=True)
     issn = models.CharField(max_length=32, blank=True, null=True)
     iccn = models.CharField(max_length=32, blank=True, null=True)
+    # ISBN-13 o ISSN normalizado ("isbn:978…"/"issn:…") para detectar duplicados
+    ident_key = models.CharField(max_length=40, blank=True, default="", editable=False, db_index=True)
 
     # Signatura LCC completa: usada para localización y clasificación.
     call_number = models.CharField(
@@ -134,6 +171,10 @@ class BibliographicRecord(TimeStampedModel):
     lcc_number = models.CharField(max_length=16, blank=True)     # ej: '76.73'
     cutter = models.CharField(max_length=32, blank=True)         # ej: 'P98'
     cutter2 = models.CharField(max_length=32, blank=True)        # ej: 'D45'
+
+    # Clave de ordenamiento por estantería (ver `build_sort_key`): número LCC
+    # rellenado con ceros para que "76.73" quede antes de "100".
+    shelf_key = models.CharField(max_length=64, blank=True, default="", editable=False)
     
     physical_description = models.CharField(max_length=255, blank=True)
     series = models.CharField(max_length=255, blank=True)
@@ -144,11 +185,15 @@ class BibliographicRecord(TimeStampedModel):
     cover = models.ImageField(upload_to='covers/', null=True, blank=True)
     inventory_code = models.CharField(max_length=64, unique=True, blank=True)
     qr_image = models.ImageField(upload_to="qr/", blank=True, null=True)
+
+    objects = BibliographicRecordQuerySet.as_manager()
     
     class Meta:
-        ordering = ["lcc_class", "lcc_number", "cutter", "title"]
+        ordering = ["shelf_key", "id"]
         indexes = [
         models.Index(fields=["lcc_class", "lcc_number", "cutter"]),
+        # Orden de estantería: un solo recorrido de índice (shelf_key, id)
+        models.Index(fields=["shelf_key", "id"], name="catalog_rec_shelf_idx"),
         ]
 
     def __str__(self):
@@ -157,6 +202,12 @@ class BibliographicRecord(TimeStampedModel):
     def get_absolute_url(self):
         return reverse("catalog:record_detail", args=[self.pk])
 
+    def compute_shelf_key(self) -> str:
+        """Calcula `shelf_key` a partir de los campos LCC desglosados."""
+        year = str(self.publish_year) if self.publish_year else None
+        sort_key, _ = build_sort_key(self.lcc_class, self.lcc_number, self.cutter, self.cutter2, year)
+        return sort_key
+
     # ---------- Lógica QR ----------
     def get_qr_payload(self) -> str:
         # Incluye pk + inventory_code => único y estable
@@ -170,25 +221,39 @@ class BibliographicRecord(TimeStampedModel):
         img.save(buf, format="PNG")
         return ContentFile(buf.getvalue())
 
-    # ---------- Override save ----------
-    def save(self, *args, **kwargs):
+    def attach_qr(self) -> None:
+        """Genera el PNG y lo asigna a `qr_image` sin guardar el modelo."""
+        self.qr_image.save(f"rec_{self.pk}.png", self._generate_qr_contentfile(), save=False)
+
+    def get_qr_url(self, fmt: str = "png") -> str:
+        """URL del QR: el PNG guardado si existe, el generado bajo demanda o "" sin código."""
+        if self.qr_image and fmt == "png":
+            return self.qr_image.url
+        if not self.inventory_code:
+            return ""
+        return reverse("catalog:qr_code", kwargs={"kind": "record", "code": self.inventory_code, "fmt": fmt})
+
+    # ---------- Campos derivados ----------
+    def fill_derived_fields(self, subjects_text: Optional[str] = None, generated=None) -> None:
+        """Completa en memoria los campos calculados (pasos 0–4 de `save()`).
+
+        `generated` permite pasar una tupla (lcc, origen) ya calculada; la usa
+        el importador masivo (`services/importer.py`), que resuelve autores y
+        editorial sin consultar la BD y luego inserta con `bulk_create`.
+        """
         # 0) Inventory code único si falta
         if not self.inventory_code:
             self.inventory_code = f"UPN-{uuid.uuid4().hex[:8].upper()}"
-
-        # 1) Preparar texto de materias sólo si ya existe pk (M2M requiere pk)
-        subjects_text = getattr(self, "_subjects_text", None)
-        if subjects_text is None and self.pk:
-            try:
-                subjects_text = " ".join(self.subjects.values_list("term", flat=True))
-            except Exception:
-                subjects_text = ""
+        self.title_norm = normalize_text(self.title)
+        self.ident_key = identifier_key(self.isbn, self.issn)
 
         # 2) Generar/normalizar LCC si hace falta
         if not self.lcc_code:
-            generated, source = generate_lcc(self, subjects_text=subjects_text)
-            if generated:
-                self.lcc_code = normalize_lcc(generated)
+            if generated is None:
+                generated = generate_lcc(self, subjects_text=subjects_text)
+            code, source = generated
+            if code:
+                self.lcc_code = normalize_lcc(code)
                 self.lcc_source = source or "heurística"
         else:
             self.lcc_code = normalize_lcc(self.lcc_code)
@@ -217,15 +282,35 @@ class BibliographicRecord(TimeStampedModel):
                 "year": (str(self.publish_year) if self.publish_year else parts.get("year")),
             })
 
-        # 4) Primer guardado: asegura pk antes de generar QR
-        new_record = self.pk is None
+        # 4) Clave de estantería persistida (ordenamiento por defecto)
+        self.shelf_key = self.compute_shelf_key()
+
+    # ---------- Override save ----------
+    def save(self, *args, **kwargs):
+        # 1) Preparar texto de materias sólo si ya existe pk (M2M requiere pk)
+        subjects_text = getattr(self, "_subjects_text", None)
+        if subjects_text is None and self.pk:
+            try:
+                subjects_text = " ".join(self.subjects.values_list("term", flat=True))
+            except Exception:
+                subjects_text = ""
+
+        # 0, 2–4) Inventario, LCC, signatura y clave de estantería
+        self.fill_derived_fields(subjects_text)
+
+        # 5) Primer guardado: asegura pk antes de generar QR
         super().save(*args, **kwargs)
 
-        # 5) Generar QR si no existe
-        if not self.qr_image:
-            png = self._generate_qr_contentfile()
-            self.qr_image.save(f"rec_{self.pk}.png", png, save=False)
-            super().save(update_fields=["qr_image"])
+        # 6) QR si no existe: en modo "ondemand" no se guarda imagen (la sirve
+        # la vista `qr_code`); en "queue" se encola para `manage.py qr_worker`
+        # y en "sync" (pruebas) se genera aquí mismo como antes.
+        mode = qr_mode()
+        if not self.qr_image and mode != "ondemand":
+            if mode == "sync":
+                self.attach_qr()
+                super().save(update_fields=["qr_image"])
+            else:
+                QRJob.enqueue(QRJob.Target.RECORD, [self.pk])
     
 
 class RecordContributor(models.Model):
@@ -252,6 +337,37 @@ class RecordContributor(models.Model):
         return f"{self.person} ({self.get_role_display()})"
     
 
+class ItemQuerySet(models.QuerySet):
+    def status_summary(self) -> dict:
+        """Totales por estado en un solo aggregate condicional.
+
+        Devuelve {'total', 'available', 'loaned', 'repair', 'lost'}.
+        """
+        return self.aggregate(
+            total=models.Count("id"),
+            **{
+                key: models.Count("id", filter=models.Q(status=status))
+                for key, status in Item.STATUS_SUMMARY_KEYS.items()
+            },
+        )
+
+    def availability_by_record(self, record_ids) -> dict:
+        """{record_id: status_summary} para varios registros en una consulta agrupada."""
+        rows = (
+            self.filter(record_id__in=list(record_ids))
+            .order_by()
+            .values("record_id")
+            .annotate(
+                total=models.Count("id"),
+                **{
+                    key: models.Count("id", filter=models.Q(status=status))
+                    for key, status in Item.STATUS_SUMMARY_KEYS.items()
+                },
+            )
+        )
+        return {row.pop("record_id"): row for row in rows}
+
+
 class Item(TimeStampedModel):
     """Copia física o ejemplar de un `BibliographicRecord`.
 
@@ -266,6 +382,14 @@ class Item(TimeStampedModel):
         REPAIR = "repair", _("En reparacion")
         LOST = "lost", _("Perdido")
 
+    # Claves de `ItemQuerySet.status_summary()` por estado
+    STATUS_SUMMARY_KEYS = {
+        "available": Status.AVAILABLE,
+        "loaned": Status.LOANED,
+        "repair": Status.REPAIR,
+        "lost": Status.LOST,
+    }
+
     record = models.ForeignKey(BibliographicRecord, on_delete=models.CASCADE, related_name="items")
     barcode = models.CharField(max_length=64, unique=True)
     location = models.ForeignKey(Location, on_delete=models.PROTECT)
@@ -274,10 +398,29 @@ class Item(TimeStampedModel):
     price = models.DecimalField(max_digits=9, decimal_places=2, null=True, blank=True)
     # Código QR del ejemplar (usado para etiquetado físico)
     qr_image = models.ImageField(upload_to="qrcodes/", null=True, blank=True)
+
+    objects = ItemQuerySet.as_manager()
     
     def __str__(self):
         return f"{self.barcode} - {self.record.title}"
 
+    def get_qr_payload(self) -> str:
+        return f"barcode:{self.barcode}|record:{self.record.pk}|title:{self.record.title}"
+
+    def attach_qr(self) -> None:
+        """Genera el PNG con el payload del ejemplar, sin guardar el modelo."""
+        self.generate_qr(self.get_qr_payload())
+
+    def get_qr_url(self, fmt: str = "png") -> str:
+        """URL del QR: el PNG guardado si existe, el generado bajo demanda o "" sin código."""
+        if self.qr_image and fmt == "png":
+            return self.qr_image.url
+        if not self.barcode:
+            return ""
+        # El payload incluye el título: la versión cambia la URL al editarlo
+        url = reverse("catalog:qr_code", kwargs={"kind": "item", "code": self.barcode, "fmt": fmt})
+        return f"{url}?v={qr_version(self.get_qr_payload(), fmt)}"
+
     def generate_qr(self, data: str) -> None:
         """Genera un PNG de código QR a partir de `data` y lo guarda en `qr_image`.
 
@@ -309,15 +452,21 @@ class Item(TimeStampedModel):
         """Override para generar QR automáticamente tras el primer guardado.
 
         Se guarda la instancia primero para asegurar que tiene PK y luego,
-        si no existe `qr_image`, se genera y se guarda sólo ese campo.
+        si no existe `qr_image`, se encola (o en modo "sync" se genera y se
+        guarda sólo ese campo). En modo "ondemand" no se guarda imagen.
         """
         # Guardar primero la instancia normal
         super().save(*args, **kwargs)
 
+        mode = qr_mode()
+        if mode == "ondemand":
+            return
         # Si no existe imagen QR y hay barcode y record, generarla
-        if not self.qr_image and self.barcode and self.record:
-            payload = f"barcode:{self.barcode}|record:{self.record.pk}|title:{self.record.title}"
-            self.generate_qr(payload)
+        if not self.qr_image and self.barcode and self.record_id:
+            if mode != "sync":
+                QRJob.enqueue(QRJob.Target.ITEM, [self.pk])
+                return
+            self.attach_qr()
             # Guardar sólo el campo qr_image para evitar tocar otros campos
             try:
                 super().save(update_fields=["qr_image"])
@@ -329,6 +478,128 @@ class Item(TimeStampedModel):
                     pass
 
 
+def qr_mode() -> str:
+    """Modo de generación de QR: "ondemand" (por defecto), "queue" o "sync"."""
+    return getattr(settings, "CATALOG_QR_MODE", "ondemand")
+
+
+class QRJob(models.Model):
+    """Trabajo pendiente de generación de QR (cola en base de datos).
+
+    Los `save()` de registros y ejemplares sólo insertan aquí; el comando
+    `manage.py qr_worker` genera los PNG por lotes y borra los trabajos
+    completados. La cantidad de filas es la profundidad de la cola.
+    """
+    class Target(models.TextChoices):
+        RECORD = "record", _("Registro")
+        ITEM = "item", _("Ejemplar")
+
+    target = models.CharField(max_length=10, choices=Target.choices)
+    object_id = models.PositiveBigIntegerField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+        unique_together = ("target", "object_id")
+
+    def __str__(self):
+        return f"{self.target}:{self.object_id}"
+
+    @classmethod
+    def enqueue(cls, target: str, object_ids) -> None:
+        """Encola sin duplicar (un INSERT que ignora los ya pendientes)."""
+        cls.objects.bulk_create(
+            [cls(target=target, object_id=pk) for pk in object_ids],
+            ignore_conflicts=True,
+        )
+
+
+class InventorySession(models.Model):
+    """Jornada de lectura de estantes (inventario) en la que participan varios lectores."""
+    name = models.CharField(max_length=255)
+    location = models.ForeignKey(Location, null=True, blank=True, on_delete=models.SET_NULL)
+    started_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
+    started_at = models.DateTimeField(auto_now_add=True)
+    closed_at = models.DateTimeField(null=True, blank=True)
+    # Marca de agua de la conciliación: último `InventoryEvent.id` procesado
+    reconciled_through = models.PositiveBigIntegerField(default=0, editable=False)
+    reconciled_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        ordering = ["-started_at"]
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def is_open(self) -> bool:
+        return self.closed_at is None
+
+
+class InventoryEvent(models.Model):
+    """Lectura de un código durante una sesión de inventario.
+
+    Se insertan por lotes desde el endpoint de escaneo (`bulk_create`, sin
+    señales). `scanned_at` es la hora del dispositivo, no la de llegada: los
+    lectores acumulan y envían en bloques, y pueden reenviar un bloque ya
+    recibido (se descarta por `client_key`).
+    """
+    class Event(models.TextChoices):
+        SEEN = "seen", _("Visto")
+
+    session = models.ForeignKey(InventorySession, on_delete=models.CASCADE, related_name="events")
+    record = models.ForeignKey(BibliographicRecord, on_delete=models.CASCADE, related_name="inventory_events")
+    item = models.ForeignKey(Item, null=True, blank=True, on_delete=models.SET_NULL, related_name="inventory_events")
+    event = models.CharField(max_length=10, choices=Event.choices, default=Event.SEEN)
+    code = models.CharField(max_length=255, blank=True)
+    device = models.CharField(max_length=64, blank=True)
+    # Clave de idempotencia generada por el lector: un reenvío no duplica el evento
+    client_key = models.CharField(max_length=64, null=True, blank=True, unique=True)
+    scanned_at = models.DateTimeField()
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["scanned_at", "id"]
+        indexes = [
+            models.Index(fields=["session", "record", "scanned_at"], name="invevent_session_rec_ts"),
+            # Anti-joins de la conciliación por ejemplar (services/reconcile.py)
+            models.Index(fields=["session", "item"], name="invevent_session_item"),
+            # Relectura de eventos recientes en la conciliación incremental
+            models.Index(fields=["session", "received_at"], name="invevent_session_recv"),
+        ]
+
+    def __str__(self):
+        return f"{self.session_id}:{self.record_id} {self.event}"
+
+
+class InventoryFinding(models.Model):
+    """Resultado materializado de la conciliación de una sesión.
+
+    - missing: ejemplar esperado en la ubicación de la sesión que no se leyó.
+    - misplaced: ejemplar (o registro, si se leyó el QR del registro) leído
+      en la sesión que pertenece a otra ubicación.
+
+    Las filas se escriben con INSERT ... SELECT desde `services/reconcile.py`
+    (sin pasar por Python), por eso no hay campos con valores por defecto.
+    """
+    class Kind(models.TextChoices):
+        MISSING = "missing", _("Faltante")
+        MISPLACED = "misplaced", _("Fuera de lugar")
+
+    session = models.ForeignKey(InventorySession, on_delete=models.CASCADE, related_name="findings")
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    record = models.ForeignKey(BibliographicRecord, on_delete=models.CASCADE, related_name="+")
+    item = models.ForeignKey(Item, null=True, blank=True, on_delete=models.CASCADE, related_name="+")
+
+    class Meta:
+        indexes = [models.Index(fields=["session", "kind", "item"], name="invfinding_session_kind")]
+
+    def __str__(self):
+        return f"{self.session_id}:{self.kind}:{self.item_id or self.record_id}"
+
+
 class Book(models.Model):
     title = models.CharField(max_length=512)
     authors = models.CharField(
@@ -0,0 +1,161 @@
+"""
+Paginación por keyset (seek) para listados del catálogo.
+
+En lugar de OFFSET, cada página se pide "a partir de" los valores de orden
+de la última fila vista, p. ej. (shelf_key, id). Con un índice sobre esas
+columnas la consulta es un rango del índice y cuesta lo mismo en la página 1
+que en la 5 000.
+
+Los cursores son opacos para el cliente: JSON en base64 url-safe.
+"""
+import base64
+import binascii
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+
+def encode_cursor(values: Sequence) -> str:
+    """Serializa los valores de orden de una fila como token opaco."""
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _matches(value, expected: type) -> bool:
+    if isinstance(value, bool):
+        return False
+    if expected is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, expected)
+
+
+def decode_cursor(token: Optional[str], types: Sequence[type]) -> Optional[list]:
+    """Devuelve la lista de valores o None si el token falta o es inválido.
+
+    `types` es el tipo esperado de cada valor (p. ej. `(str, int)` para
+    `(shelf_key, id)`): un token manipulado nunca llega a la consulta con
+    valores de otro tipo.
+    """
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw.decode("utf-8"))
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+    if not isinstance(values, list) or len(values) != len(types):
+        return None
+    if not all(_matches(v, t) for v, t in zip(values, types)):
+        return None
+    return values
+
+
+def seek_filter(keys: Sequence[str], values: Sequence, op: str) -> Q:
+    """Comparación de tuplas (k1, k2, ...) `op` (v1, v2, ...) como Q.
+
+    `op` es "gt", "gte", "lt" o "lte". Se añade `k1 >= v1` (o `<=`) como
+    condición redundante para que el motor pueda usar un rango del índice
+    en vez de evaluar el OR fila por fila.
+    """
+    base = "gt" if op in ("gt", "gte") else "lt"
+
+    cond = Q(**{f"{keys[-1]}__{op}": values[-1]})
+    for key, value in zip(reversed(keys[:-1]), reversed(values[:-1])):
+        cond = Q(**{f"{key}__{base}": value}) | (Q(**{key: value}) & cond)
+    if len(keys) > 1:
+        cond &= Q(**{f"{keys[0]}__{base}e": values[0]})
+    return cond
+
+
+@dataclass
+class KeysetPage:
+    """Página de resultados con cursores hacia adelante y hacia atrás."""
+    object_list: List = field(default_factory=list)
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def row_cursor(obj, keys: Sequence[str]) -> str:
+    """Cursor que apunta a la fila `obj`."""
+    return encode_cursor([getattr(obj, k) for k in keys])
+
+
+def keyset_page(qs, keys: Sequence[str], per_page: int, after: Optional[str] = None,
+                before: Optional[str] = None, types: Optional[Sequence[type]] = None) -> KeysetPage:
+    """Página de `qs` ordenada ascendentemente por `keys` (la última debe ser única).
+
+    `types` son los tipos de las claves para validar los cursores; por
+    defecto texto y un id entero al final.
+
+    - Sin cursores: primera página.
+    - `after`: filas estrictamente posteriores a la del cursor.
+    - `before`: filas estrictamente anteriores (se devuelven en orden ascendente).
+
+    Se pide una fila extra para saber si hay más en esa dirección, sin COUNT.
+    """
+    keys = list(keys)
+    if types is None:
+        types = (str,) * (len(keys) - 1) + (int,)
+    after_vals = decode_cursor(after, types)
+    before_vals = decode_cursor(before, types)
+
+    if before_vals is not None:
+        rows = list(
+            qs.filter(seek_filter(keys, before_vals, "lt"))
+            .order_by(*[f"-{k}" for k in keys])[:per_page + 1]
+        )
+        more = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        return KeysetPage(
+            rows,
+            next_cursor=row_cursor(rows[-1], keys) if rows else None,
+            prev_cursor=row_cursor(rows[0], keys) if more else None,
+        )
+
+    if after_vals is not None:
+        qs = qs.filter(seek_filter(keys, after_vals, "gt"))
+    rows = list(qs.order_by(*keys)[:per_page + 1])
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    return KeysetPage(
+        rows,
+        next_cursor=row_cursor(rows[-1], keys) if more else None,
+        prev_cursor=row_cursor(rows[0], keys) if (rows and after_vals is not None) else None,
+    )
+
+
+def cached_count(qs, key_parts, timeout: Optional[int] = None) -> int:
+    """Total de `qs` cacheado por combinación de filtros (`key_parts`).
+
+    El total es aproximado: puede tener hasta `CATALOG_COUNT_CACHE_TIMEOUT`
+    segundos de antigüedad, a cambio de no repetir el COUNT en cada página.
+    """
+    if timeout is None:
+        timeout = getattr(settings, "CATALOG_COUNT_CACHE_TIMEOUT", 300)
+    digest = hashlib.sha1(json.dumps(key_parts, sort_keys=True).encode("utf-8")).hexdigest()
+    key = f"catalog:count:{digest}"
+    total = cache.get(key)
+    if total is None:
+        total = qs.order_by().count()
+        cache.set(key, total, timeout)
+    return total
+
@@ -0,0 +1,193 @@
+"""
+Resolución de códigos leídos (QR o código de barras) a registro/ejemplar.
+
+Entiende los formatos de `get_qr_payload()`:
+
+- QR de registro: `/catalog/record/<pk>/?inv=<inventory_code>` (o URL completa)
+- QR de ejemplar: `barcode:<barcode>|record:<pk>|title:...`
+- Texto plano: `inventory_code` o `barcode` (lector de código de barras)
+
+Los resultados `(record_pk, item_pk, título)` se guardan en un LRU en
+memoria del proceso con caducidad (`CATALOG_CODE_CACHE_SIZE`,
+`CATALOG_CODE_CACHE_TTL`), así que las lecturas repetidas durante un
+inventario no tocan la BD. Las señales de `save()`/`delete()` de registros y
+ejemplares invalidan sus entradas; los cambios masivos sin señales
+(`bulk_create`, `update()`, otros procesos) quedan cubiertos por el TTL.
+Los códigos desconocidos no se guardan.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from django.conf import settings
+from django.db.models import F, IntegerField, Value
+
+from .importer import IN_CHUNK
+
+# Tipos de código: registro, ejemplar o cualquiera de los dos
+RECORD, ITEM, ANY = "record", "item", "any"
+
+Resolved = Tuple[int, Optional[int], str]  # (record_pk, item_pk, título)
+CacheKey = Tuple[str, str]                 # (RECORD|ITEM, valor)
+
+_lock = threading.Lock()
+_cache: "OrderedDict[CacheKey, Tuple[float, Resolved]]" = OrderedDict()
+# Índices inversos para invalidar por pk (el código pudo cambiar)
+_by_record: Dict[int, Set[CacheKey]] = {}
+_by_item: Dict[int, Set[CacheKey]] = {}
+
+
+def parse_code(code: str) -> Tuple[str, str]:
+    """(tipo, valor) de un código leído."""
+    code = (code or "").strip()
+    if code.startswith("barcode:"):
+        return ITEM, code[len("barcode:"):].split("|", 1)[0].strip()
+    if "inv=" in code:
+        inv = parse_qs(urlsplit(code).query).get("inv", [""])[0]
+        return RECORD, inv.strip()
+    return ANY, code
+
+
+# ---------- Caché ----------
+def _drop(key: CacheKey) -> None:
+    entry = _cache.pop(key, None)
+    if entry is None:
+        return
+    record_pk, item_pk, _ = entry[1]
+    _by_record.get(record_pk, set()).discard(key)
+    if item_pk is not None:
+        _by_item.get(item_pk, set()).discard(key)
+
+
+def _get(key: CacheKey) -> Optional[Resolved]:
+    with _lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            _drop(key)
+            return None
+        _cache.move_to_end(key)
+        return entry[1]
+
+
+def _put(key: CacheKey, value: Resolved) -> None:
+    ttl = getattr(settings, "CATALOG_CODE_CACHE_TTL", 300)
+    size = getattr(settings, "CATALOG_CODE_CACHE_SIZE", 20000)
+    with _lock:
+        _drop(key)
+        _cache[key] = (time.monotonic() + ttl, value)
+        _by_record.setdefault(value[0], set()).add(key)
+        if value[1] is not None:
+            _by_item.setdefault(value[1], set()).add(key)
+        while len(_cache) > size:
+            _drop(next(iter(_cache)))
+
+
+def invalidate_record(pk: int) -> None:
+    """Olvida el registro y sus ejemplares (el título va en cada entrada)."""
+    with _lock:
+        for key in list(_by_record.pop(pk, ())):
+            _drop(key)
+
+
+def invalidate_item(pk: int) -> None:
+    with _lock:
+        for key in list(_by_item.pop(pk, ())):
+            _drop(key)
+
+
+def clear_cache() -> None:
+    with _lock:
+        _cache.clear()
+        _by_record.clear()
+        _by_item.clear()
+
+
+# ---------- Resolución ----------
+def _in_chunks(values: Iterable[str]) -> Iterable[List[str]]:
+    values = sorted(values)
+    for i in range(0, len(values), IN_CHUNK):
+        yield values[i:i + IN_CHUNK]
+
+
+def _rows(kind: str, chunk: List[str]):
+    """Consulta `(valor, record_pk, item_pk, título)` de un tramo de valores."""
+    from ..models import BibliographicRecord, Item
+
+    if kind == RECORD:
+        return BibliographicRecord.objects.filter(inventory_code__in=chunk).values_list(
+            "inventory_code", "pk", Value(None, output_field=IntegerField()), "title")
+    return Item.objects.filter(barcode__in=chunk).values_list("barcode", "record_id", "pk", F("record__title"))
+
+
+def _store(kind: str, rows) -> Dict[str, Resolved]:
+    found = {value: (record_pk, item_pk, title) for value, record_pk, item_pk, title in rows}
+    for value, resolved in found.items():
+        _put((kind, value), resolved)
+    return found
+
+
+def _from_cache(parsed: Dict[str, Tuple[str, str]]) -> Tuple[Dict[str, Resolved], Dict[str, Set[str]]]:
+    """Aciertos de la caché y, por tipo, los valores que hay que consultar."""
+    resolved: Dict[str, Resolved] = {}
+    missing: Dict[str, Set[str]] = {RECORD: set(), ITEM: set()}
+    for code, (kind, value) in parsed.items():
+        if not value:
+            continue
+        kinds = (RECORD, ITEM) if kind == ANY else (kind,)
+        hit = next((h for h in (_get((k, value)) for k in kinds) if h is not None), None)
+        if hit is not None:
+            resolved[code] = hit
+        else:
+            for k in kinds:
+                missing[k].add(value)
+    return resolved, missing
+
+
+def _merge(parsed, resolved: Dict[str, Resolved], loaded: Dict[str, Dict[str, Resolved]]) -> Dict[str, Resolved]:
+    for code, (kind, value) in parsed.items():
+        if code in resolved:
+            continue
+        for k in ((RECORD, ITEM) if kind == ANY else (kind,)):
+            if value in loaded[k]:
+                resolved[code] = loaded[k][value]
+                break
+    return resolved
+
+
+def resolve_many(codes: Iterable[str]) -> Dict[str, Resolved]:
+    """code -> (record_pk, item_pk, título) para los códigos que existen.
+
+    Primero la caché; los que falten se buscan con una consulta `IN` por
+    tipo (de a `IN_CHUNK` valores). Si un texto plano coincide con un
+    `inventory_code` y con un `barcode`, gana el registro (salvo que sólo el
+    ejemplar esté en caché).
+    """
+    parsed = {code: parse_code(code) for code in codes}
+    resolved, missing = _from_cache(parsed)
+    loaded = {
+        kind: _store(kind, [row for chunk in _in_chunks(values) for row in _rows(kind, chunk)])
+        for kind, values in missing.items()
+    }
+    return _merge(parsed, resolved, loaded)
+
+
+async def aresolve_many(codes: Iterable[str]) -> Dict[str, Resolved]:
+    """Versión asíncrona de `resolve_many` para las vistas ASGI."""
+    parsed = {code: parse_code(code) for code in codes}
+    resolved, missing = _from_cache(parsed)
+    loaded = {}
+    for kind, values in missing.items():
+        rows = []
+        for chunk in _in_chunks(values):
+            rows.extend([row async for row in _rows(kind, chunk)])
+        loaded[kind] = _store(kind, rows)
+    return _merge(parsed, resolved, loaded)
+
+
+def resolve(code: str) -> Optional[Resolved]:
+    """Resolución de un solo código (ver `resolve_many`)."""
+    return resolve_many([code]).get(code)
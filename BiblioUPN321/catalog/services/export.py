@@ -0,0 +1,180 @@
+"""
+Exportación del catálogo en streaming: CSV, JSON Lines y MARCXML.
+
+Los registros se leen con `iterator(chunk_size=...)`; desde Django 4.1 el
+`prefetch_related` se aplica por bloque, así que autores, materias y
+ejemplares se traen con una consulta por relación y por bloque, y en
+memoria sólo está el bloque actual. Cada formato es un generador de texto
+que `export_stream()` codifica (y opcionalmente comprime con gzip) en
+trozos de ~64 KB, aptos para `StreamingHttpResponse` o para un archivo.
+
+Las columnas del CSV son las que acepta `import_records`, más
+`inventory_code` e `items`, de modo que una exportación se puede volver a
+importar.
+"""
+import csv
+import io
+import json
+import zlib
+from typing import Dict, Iterable, Iterator, List
+from xml.sax.saxutils import escape, quoteattr
+
+from .importer import TEXT_FIELDS
+
+# formato -> (content type, extensión)
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "jsonl": ("application/x-ndjson; charset=utf-8", "jsonl"),
+    "marcxml": ("application/marcxml+xml; charset=utf-8", "xml"),
+}
+
+CSV_COLUMNS = (
+    "inventory_code", "title", "resource_type", "publish_year", "publisher", "lcc_code", "call_number",
+    "physical_desc", *TEXT_FIELDS, "authors", "subjects", "items",
+)
+
+# Tamaño aproximado de cada trozo de bytes entregado
+FLUSH_SIZE = 64 * 1024
+
+
+def export_queryset(qs, chunk_size: int = 500):
+    """Registros de `qs` con sus relaciones, en orden de pk y en streaming."""
+    return (
+        qs.select_related("publisher")
+        .prefetch_related("contributors__person", "subjects", "items__location")
+        .order_by("pk")
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def record_dict(rec) -> Dict[str, object]:
+    """Representación plana de un registro (la que se escribe en JSONL)."""
+    data = {
+        "id": rec.pk,
+        "inventory_code": rec.inventory_code,
+        "title": rec.title,
+        "resource_type": rec.resource_type,
+        "publish_year": rec.publish_year,
+        "publisher": rec.publisher.name if rec.publisher else "",
+        "lcc_code": rec.lcc_code or "",
+        "call_number": rec.call_number or "",
+        "physical_desc": rec.physical_description,
+    }
+    data.update({name: getattr(rec, name) or "" for name in TEXT_FIELDS})
+    data["contributors"] = [{"name": c.person.full_name, "role": c.role} for c in rec.contributors.all()]
+    data["subjects"] = [s.term for s in rec.subjects.all()]
+    data["items"] = [
+        {
+            "barcode": it.barcode,
+            "location": it.location.code,
+            "status": it.status,
+            "acquisition_date": it.acquisition_date.isoformat() if it.acquisition_date else None,
+            "price": str(it.price) if it.price is not None else None,
+        }
+        for it in rec.items.all()
+    ]
+    return data
+
+
+# ---------- Formatos ----------
+def iter_jsonl(records: Iterable) -> Iterator[str]:
+    for rec in records:
+        yield json.dumps(record_dict(rec), ensure_ascii=False) + "\n"
+
+
+def iter_csv(records: Iterable) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    def flush() -> str:
+        text = buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        return text
+
+    writer.writerow(CSV_COLUMNS)
+    yield flush()
+    for rec in records:
+        data = record_dict(rec)
+        data["authors"] = "; ".join(c["name"] for c in data["contributors"] if c["role"] == "author")
+        data["subjects"] = "; ".join(data["subjects"])
+        data["items"] = "; ".join(f"{it['barcode']}@{it['location']}:{it['status']}" for it in data["items"])
+        writer.writerow(["" if data[col] is None else data[col] for col in CSV_COLUMNS])
+        yield flush()
+
+
+def _datafield(tag: str, subfields: List, ind: str = "  ") -> str:
+    subs = "".join(
+        f'<subfield code="{code}">{escape(str(value))}</subfield>' for code, value in subfields if value
+    )
+    if not subs:
+        return ""
+    return f"<datafield tag={quoteattr(tag)} ind1={quoteattr(ind[0])} ind2={quoteattr(ind[1])}>{subs}</datafield>"
+
+
+def marcxml_record(rec) -> str:
+    """Un `<record>` MARCXML con los campos que lee `import_marc`."""
+    parts = ["<record><leader>00000nam a2200000   4500</leader>",
+             f'<controlfield tag="001">{escape(rec.inventory_code)}</controlfield>']
+    parts.append(_datafield("020", [("a", rec.isbn)]))
+    parts.append(_datafield("022", [("a", rec.issn)]))
+    if rec.call_number:
+        head, _, rest = rec.call_number.partition(" ")
+        parts.append(_datafield("050", [("a", head), ("b", rest)], " 4"))
+    contributors = list(rec.contributors.all())
+    main = next((c for c in contributors if c.role == "author"), None)
+    if main is not None:
+        parts.append(_datafield("100", [("a", main.person.full_name)], "1 "))
+    parts.append(_datafield("245", [("a", rec.title), ("b", rec.subtitle)], ("1" if main else "0") + "0"))
+    parts.append(_datafield("250", [("a", rec.edition)]))
+    parts.append(_datafield("264", [
+        ("a", rec.publish_place),
+        ("b", rec.publisher.name if rec.publisher else ""),
+        ("c", rec.publish_year),
+    ], " 1"))
+    parts.append(_datafield("300", [("a", rec.physical_description)]))
+    parts.append(_datafield("490", [("a", rec.series)], "0 "))
+    parts.append(_datafield("500", [("a", rec.notes)]))
+    for subject in rec.subjects.all():
+        parts.append(_datafield("650", [("a", subject.term)], " 4"))
+    for c in contributors:
+        if c is not main:
+            parts.append(_datafield("700", [("a", c.person.full_name), ("e", c.get_role_display())], "1 "))
+    for it in rec.items.all():
+        parts.append(_datafield("852", [("b", it.location.code), ("p", it.barcode)]))
+    parts.append("</record>\n")
+    return "".join(parts)
+
+
+def iter_marcxml(records: Iterable) -> Iterator[str]:
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n<collection xmlns="http://www.loc.gov/MARC21/slim">\n'
+    for rec in records:
+        yield marcxml_record(rec)
+    yield "</collection>\n"
+
+
+WRITERS = {"csv": iter_csv, "jsonl": iter_jsonl, "marcxml": iter_marcxml}
+
+
+def export_stream(qs, fmt: str, compress: bool = False, chunk_size: int = 500) -> Iterator[bytes]:
+    """Bytes del catálogo exportado, agrupados en trozos de ~`FLUSH_SIZE`."""
+    if fmt not in WRITERS:
+        raise ValueError(f"Formato de exportación desconocido: {fmt}")
+    # wbits=31: contenedor gzip (cabecera y CRC) en lugar de zlib
+    gz = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    pending: List[bytes] = []
+    size = 0
+    for text in WRITERS[fmt](export_queryset(qs, chunk_size)):
+        data = text.encode("utf-8")
+        if gz is not None:
+            data = gz.compress(data)
+        if data:
+            pending.append(data)
+            size += len(data)
+        if size >= FLUSH_SIZE:
+            yield b"".join(pending)
+            pending, size = [], 0
+    if gz is not None:
+        pending.append(gz.flush())
+    if pending:
+        yield b"".join(pending)
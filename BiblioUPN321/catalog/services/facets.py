@@ -0,0 +1,80 @@
+"""
+Facetas (conteos por valor) para refinar los resultados de `record_list`.
+
+Cada faceta es un único `GROUP BY` sobre el queryset ya filtrado. Sin
+filtros activos el resultado es el mismo para todos los usuarios, así que se
+cachea y se invalida cuando cambia un registro (ver `catalog/signals.py`).
+"""
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F
+
+# Clave de caché de las facetas sin filtros
+UNFILTERED_CACHE_KEY = "catalog:facets:all:v2"
+
+# parámetro GET -> (campo/expresión agrupada, máximo de valores a mostrar).
+# La faceta de clase usa `lcc_class` (igualdad, como el conteo) y no `lcc`,
+# que filtra por prefijo ("Q" incluye QA, QB...).
+FACETS: Dict[str, Tuple[str, int]] = {
+    "lcc_class": ("lcc_class", 30),
+    "type": ("resource_type", 10),
+    "decade": ("decade", 15),
+    "lang": ("language", 10),
+    "publisher": ("publisher_id", 10),
+}
+
+Facet = List[Tuple[str, str, int]]  # (valor del parámetro, etiqueta, conteo)
+
+
+def _facet_rows(qs, param: str) -> Facet:
+    from ..models import BibliographicRecord
+
+    field, limit = FACETS[param]
+    if qs.query.annotations:
+        # Se descartan anotaciones del listado (p. ej. ranking) para que el
+        # GROUP BY sólo incluya la columna de la faceta.
+        qs = BibliographicRecord.objects.filter(pk__in=qs.order_by().values("pk"))
+    label_field = None
+    if field == "decade":
+        qs = qs.filter(publish_year__isnull=False).annotate(decade=F("publish_year") / 10 * 10)
+    elif field == "publisher_id":
+        qs = qs.filter(publisher__isnull=False)
+        label_field = "publisher__name"
+    else:
+        qs = qs.exclude(**{f"{field}__isnull": True}).exclude(**{field: ""})
+
+    group = [field, label_field] if label_field else [field]
+    rows = list(qs.order_by().values(*group).annotate(n=Count("id")).order_by("-n", field)[:limit])
+
+    facet = []
+    choices = dict(BibliographicRecord.ResourceType.choices)
+    for row in rows:
+        value = row[field]
+        if label_field:
+            label = row[label_field]
+        elif field == "decade":
+            label = f"{value}–{value + 9}"
+        elif field == "resource_type":
+            label = choices.get(value, value)
+        else:
+            label = value
+        facet.append((str(value), str(label), row["n"]))
+    return facet
+
+
+def compute_facets(qs, filtered: bool = True) -> Dict[str, Facet]:
+    """Facetas del queryset `qs`; si `filtered` es False se usa la caché."""
+    if not filtered:
+        facets: Optional[Dict[str, Facet]] = cache.get(UNFILTERED_CACHE_KEY)
+        if facets is not None:
+            return facets
+    facets = {param: _facet_rows(qs, param) for param in FACETS}
+    if not filtered:
+        cache.set(UNFILTERED_CACHE_KEY, facets, getattr(settings, "CATALOG_FACETS_CACHE_TIMEOUT", 3600))
+    return facets
+
+
+def invalidate_facets() -> None:
+    cache.delete(UNFILTERED_CACHE_KEY)
@@ -0,0 +1,366 @@
+"""
+Escritura masiva de registros bibliográficos (importación CSV y similares).
+
+`BulkImporter.write_batch()` recibe un lote de `ImportRow` ya parseadas y:
+
+1. Resuelve editoriales, personas y materias contra diccionarios en memoria;
+   sólo consulta (con `IN`) los nombres que aún no conoce y crea los que
+   faltan con `bulk_create`.
+2. Descarta registros que ya existen o se repiten en la importación: mismo
+   `ident_key` (ISBN-13/ISSN normalizado, indexado) o, sin identificador,
+   mismo título normalizado, edición y año.
+3. Calcula en Python inventario, LCC, signatura, clave de estantería y
+   columnas normalizadas (`BibliographicRecord.fill_derived_fields`) e
+   inserta el lote con `bulk_create`, junto con autores y materias.
+
+Todo el lote va en una transacción. Como `bulk_create` no dispara señales,
+al final se programa la reindexación de búsqueda y se invalidan las facetas.
+
+El paso 3 (parseo y campos derivados) no toca la BD: `prepare_chunk()` lo
+ejecuta en procesos trabajadores y el proceso principal queda como único
+escritor (ver `manage.py import_records --workers`).
+"""
+import uuid
+from collections import ChainMap, Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db import DatabaseError, transaction
+
+from .facets import invalidate_facets
+from .lcc import generate_lcc_preloaded, normalize_isbn, normalize_text
+from .search import queue_reindex
+
+# Máximo de parámetros por cláusula IN (SQLite antiguos limitan a 999)
+IN_CHUNK = 900
+
+# Columnas del CSV que se copian tal cual al registro
+TEXT_FIELDS = (
+    "subtitle", "edition", "language", "publish_place", "isbn", "issn",
+    "series", "notes",
+)
+
+
+class RowError(ValueError):
+    """Fila inválida; el mensaje es el motivo que se reporta en el CSV de rechazos."""
+
+
+@dataclass
+class ImportRow:
+    """Fila de entrada ya normalizada, independiente del formato de origen."""
+    title: str
+    fields: Dict[str, object] = field(default_factory=dict)
+    authors: List[str] = field(default_factory=list)
+    subjects: List[str] = field(default_factory=list)
+    publisher: str = ""
+    # True cuando `fields` ya incluye los campos derivados (`prepare_row`)
+    prepared: bool = False
+    # Número de fila en el archivo de origen y fila original (para rechazos)
+    line: int = 0
+    source: Optional[Dict[str, str]] = None
+
+
+# Campos que calcula `BibliographicRecord.fill_derived_fields`
+DERIVED_FIELDS = (
+    "inventory_code", "title_norm", "ident_key", "lcc_code", "lcc_source", "lcc_class", "lcc_number",
+    "cutter", "cutter2", "publish_year", "call_number", "shelf_key",
+)
+
+
+def _split(value: Optional[str]) -> List[str]:
+    seen, out = set(), []
+    for part in (value or "").split(";"):
+        part = part.strip()
+        if part and part not in seen:
+            seen.add(part)
+            out.append(part)
+    return out
+
+
+def parse_csv_row(row: Dict[str, str]) -> ImportRow:
+    """Convierte una fila de `csv.DictReader` en `ImportRow` o lanza `RowError`.
+
+    Columnas: `title` (obligatoria), `subtitle`, `resource_type`, `edition`,
+    `language`, `publish_year`, `publisher`, `publish_place`, `isbn`, `issn`,
+    `call_number` o `lcc_code` (signatura LCC completa), `physical_desc`,
+    `series`, `notes`, `authors` y `subjects` (separados por ';').
+    """
+    from ..models import BibliographicRecord
+
+    title = (row.get("title") or "").strip()
+    if not title:
+        raise RowError("sin título")
+    fields: Dict[str, object] = {k: (row.get(k) or "").strip() for k in TEXT_FIELDS}
+    for key in ("isbn", "issn"):
+        fields[key] = fields[key] or None
+    if fields["isbn"] and not normalize_isbn(fields["isbn"]):
+        raise RowError(f"ISBN inválido: {fields['isbn']}")
+    resource_type = (row.get("resource_type") or "").strip()
+    fields["resource_type"] = resource_type if resource_type in BibliographicRecord.ResourceType.values else "book"
+    year = (row.get("publish_year") or "").strip()
+    if year and not (year.isdigit() and len(year) == 4):
+        raise RowError(f"año inválido: {year}")
+    fields["publish_year"] = int(year) if year else None
+    fields["lcc_code"] = (row.get("lcc_code") or row.get("call_number") or "").strip() or None
+    fields["physical_description"] = (row.get("physical_desc") or row.get("physical_description") or "").strip()
+    return ImportRow(
+        title=title,
+        fields=fields,
+        authors=_split(row.get("authors")),
+        subjects=_split(row.get("subjects")),
+        publisher=(row.get("publisher") or "").strip(),
+    )
+
+
+def prepare_row(row: ImportRow) -> ImportRow:
+    """Calcula en memoria inventario, LCC, signatura y columnas normalizadas."""
+    from ..models import BibliographicRecord
+
+    if row.prepared:
+        return row
+    rec = BibliographicRecord(title=row.title, **row.fields)
+    subjects_text = " ".join(row.subjects)
+    generated = None
+    if not rec.lcc_code:
+        first_author = row.authors[0] if row.authors else None
+        generated = generate_lcc_preloaded(rec, subjects_text, first_author, row.publisher)
+    rec.fill_derived_fields(subjects_text, generated=generated)
+    row.fields.update({name: getattr(rec, name) for name in DERIVED_FIELDS})
+    row.prepared = True
+    return row
+
+
+Reject = Tuple[int, str, Dict[str, str]]  # (fila, motivo, fila original)
+
+
+def prepare_chunk(raw_rows: List[Dict[str, str]], first_line: int = 1) -> Tuple[List[ImportRow], List[Reject]]:
+    """Parsea y prepara filas CSV; devuelve (filas listas, rechazos).
+
+    `first_line` es el número de la primera fila de datos del lote. Sólo usa
+    CPU: es seguro ejecutarla en un `ProcessPoolExecutor`.
+    """
+    rows, rejects = [], []
+    for line, raw in enumerate(raw_rows, start=first_line):
+        try:
+            row = parse_csv_row(raw)
+        except RowError as exc:
+            rejects.append((line, str(exc), raw))
+            continue
+        row.line, row.source = line, raw
+        rows.append(prepare_row(row))
+    return rows, rejects
+
+
+def init_worker() -> None:
+    """Inicializador de procesos trabajadores (necesario con `spawn`)."""
+    import django
+
+    django.setup()
+
+
+def _chunked(seq: List, size: int = IN_CHUNK):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+def dedup_key(ident_key: str, title_norm: str, edition: str, year) -> Tuple:
+    """Clave de duplicado: `ident_key` si existe; si no (título, edición, año).
+
+    Incluir edición y año evita fusionar ediciones distintas del mismo título.
+    """
+    if ident_key:
+        return ("ident", ident_key)
+    return ("title", title_norm, edition or "", year)
+
+
+class BulkImporter:
+    """Inserta lotes de `ImportRow` con cachés de entidades entre lotes."""
+
+    def __init__(self, batch_size: int = 1000, on_reject=None):
+        self.batch_size = batch_size
+        # Llamado como on_reject(row, motivo) por cada fila descartada
+        self.on_reject = on_reject
+        self.publishers: Dict[str, int] = {}
+        self.persons: Dict[str, int] = {}
+        self.subjects: Dict[str, int] = {}
+        self.seen: Set[Tuple] = set()
+        self.stats: Counter = Counter()
+
+    # ---------- Entidades ----------
+    def _resolve(self, model, lookup: str, names: Iterable[str], cache: Dict[str, int], build,
+                 created: Counter) -> Dict[str, int]:
+        """Ids (nombre -> id) de los `names` que no están en `cache`, creando los que falten.
+
+        No modifica `cache`: los ids creados dentro de la transacción del lote
+        sólo se incorporan tras el commit (ver `_insert`).
+        """
+        missing = sorted({n for n in names if n and n not in cache})
+        found: Dict[str, int] = {}
+        if not missing:
+            return found
+        for chunk in _chunked(missing):
+            for name, pk in model.objects.filter(**{f"{lookup}__in": chunk}).order_by("-id").values_list(lookup, "id"):
+                found[name] = pk  # con nombres repetidos queda el id más bajo
+        to_create = [n for n in missing if n not in found]
+        if not to_create:
+            return found
+        model.objects.bulk_create([build(n) for n in to_create], batch_size=self.batch_size, ignore_conflicts=True)
+        created[f"{model._meta.model_name}_created"] += len(to_create)
+        for chunk in _chunked(to_create):
+            for name, pk in model.objects.filter(**{f"{lookup}__in": chunk}).order_by("-id").values_list(lookup, "id"):
+                found[name] = pk
+        return found
+
+    def resolve_entities(self, rows: List[ImportRow], created: Counter) -> Dict[str, ChainMap]:
+        """nombre -> id de editoriales, personas y materias de `rows`.
+
+        Cada valor es un `ChainMap(nuevos, caché)`: los ids resueltos en este
+        lote quedan en `maps[0]` hasta que el lote se confirma.
+        """
+        from ..models import Person, Publisher, Subject
+
+        return {
+            "publishers": ChainMap(self._resolve(
+                Publisher, "name", (r.publisher for r in rows), self.publishers,
+                lambda n: Publisher(name=n), created), self.publishers),
+            "persons": ChainMap(self._resolve(
+                Person, "full_name", (a for r in rows for a in r.authors), self.persons,
+                lambda n: Person(full_name=n, full_name_norm=normalize_text(n)), created), self.persons),
+            "subjects": ChainMap(self._resolve(
+                Subject, "term", (s for r in rows for s in r.subjects), self.subjects,
+                lambda n: Subject(term=n, term_norm=normalize_text(n)), created), self.subjects),
+        }
+
+    # ---------- Duplicados ----------
+    def _existing_keys(self, rows: List[ImportRow]) -> Set[Tuple]:
+        """Claves de `rows` que ya existen en la BD (consultas por índice)."""
+        from ..models import BibliographicRecord
+
+        keys: Set[Tuple] = set()
+        idents = sorted({r.fields["ident_key"] for r in rows if r.fields["ident_key"]})
+        titles = sorted({r.fields["title_norm"] for r in rows if not r.fields["ident_key"]})
+        for chunk in _chunked(idents):
+            for ident in BibliographicRecord.objects.filter(ident_key__in=chunk).values_list("ident_key", flat=True):
+                keys.add(dedup_key(ident, "", "", None))
+        for chunk in _chunked(titles):
+            qs = (BibliographicRecord.objects.filter(title_norm__in=chunk, ident_key="")
+                  .values_list("title_norm", "edition", "publish_year"))
+            for title_norm, edition, year in qs:
+                keys.add(dedup_key("", title_norm, edition, year))
+        return keys
+
+    def reject(self, row: ImportRow, reason: str) -> None:
+        if self.on_reject is not None:
+            self.on_reject(row, reason)
+
+    # ---------- Escritura ----------
+    def build_record(self, row: ImportRow, publishers: Optional[Dict[str, int]] = None):
+        """Instancia sin guardar con todos los campos derivados ya calculados."""
+        from ..models import BibliographicRecord
+
+        prepare_row(row)
+        publishers = self.publishers if publishers is None else publishers
+        return BibliographicRecord(title=row.title, publisher_id=publishers.get(row.publisher), **row.fields)
+
+    def _unique_inventory_codes(self, records) -> None:
+        """Regenera los `inventory_code` aleatorios que choquen entre sí o con la BD.
+
+        Con 8 dígitos hex la probabilidad de choque deja de ser despreciable a
+        partir de decenas de miles de registros, y en `bulk_create` un solo
+        choque abortaría el lote completo.
+        """
+        from ..models import BibliographicRecord
+
+        pending = list(records)
+        while pending:
+            codes = [r.inventory_code for r in pending]
+            taken: Set[str] = set()
+            for chunk in _chunked(codes):
+                taken.update(BibliographicRecord.objects.filter(inventory_code__in=chunk)
+                             .values_list("inventory_code", flat=True))
+            seen: Set[str] = set()
+            retry = []
+            for rec in pending:
+                if rec.inventory_code in taken or rec.inventory_code in seen:
+                    rec.inventory_code = f"UPN-{uuid.uuid4().hex[:8].upper()}"
+                    retry.append(rec)
+                else:
+                    seen.add(rec.inventory_code)
+            pending = retry
+
+    def write_batch(self, rows: List[ImportRow]) -> List[int]:
+        """Inserta un lote en una transacción y devuelve los ids creados.
+
+        Si el lote falla en la BD se reintenta fila por fila; las filas que
+        vuelven a fallar se rechazan con el error en lugar de abortar.
+        """
+        rows = [prepare_row(r) for r in rows]
+        try:
+            ids = self._insert(rows)
+        except DatabaseError:
+            ids = []
+            for row in rows:
+                try:
+                    ids += self._insert([row])
+                except DatabaseError as exc:
+                    self.stats["errors"] += 1
+                    self.reject(row, f"error de base de datos: {exc}")
+        if ids:
+            invalidate_facets()
+        self.stats["created"] += len(ids)
+        return ids
+
+    def _insert(self, rows: List[ImportRow]) -> List[int]:
+        from ..models import BibliographicRecord, QRJob, RecordContributor, qr_mode
+
+        new_keys: Set[Tuple] = set()
+        duplicates: List[Tuple[ImportRow, Tuple]] = []
+        entities: Dict[str, ChainMap] = {}
+        created: Counter = Counter()
+        with transaction.atomic():
+            existing = self._existing_keys(rows)
+            fresh: List[ImportRow] = []
+            for row in rows:
+                f = row.fields
+                key = dedup_key(f["ident_key"], f["title_norm"], f.get("edition"), f.get("publish_year"))
+                if key in existing or key in self.seen or key in new_keys:
+                    duplicates.append((row, key))
+                    continue
+                new_keys.add(key)
+                fresh.append(row)
+
+            ids: List[int] = []
+            if fresh:
+                entities = self.resolve_entities(fresh, created)
+                persons, subjects = entities["persons"], entities["subjects"]
+                records = [self.build_record(r, entities["publishers"]) for r in fresh]
+                self._unique_inventory_codes(records)
+                BibliographicRecord.objects.bulk_create(records, batch_size=self.batch_size)
+
+                Through = BibliographicRecord.subjects.through
+                contributors, links = [], []
+                for rec, row in zip(records, fresh):
+                    for name in row.authors:
+                        contributors.append(RecordContributor(
+                            record_id=rec.pk, person_id=persons[name], role=RecordContributor.Role.AUTHOR,
+                        ))
+                    for term in row.subjects:
+                        links.append(Through(bibliographicrecord_id=rec.pk, subject_id=subjects[term]))
+                RecordContributor.objects.bulk_create(contributors, batch_size=self.batch_size, ignore_conflicts=True)
+                Through.objects.bulk_create(links, batch_size=self.batch_size, ignore_conflicts=True)
+
+                ids = [rec.pk for rec in records]
+                queue_reindex(ids)
+                if qr_mode() != "ondemand":
+                    QRJob.enqueue(QRJob.Target.RECORD, ids)
+
+        # Sólo tras el commit: si el lote se revierte no debe quedar rastro
+        # (ni claves vistas ni ids de entidades que ya no existen)
+        self.seen |= new_keys
+        for name, resolved in entities.items():
+            getattr(self, name).update(resolved.maps[0])
+        self.stats.update(created)
+        for row, key in duplicates:
+            self.stats["duplicates"] += 1
+            self.reject(row, "duplicado (" + (key[1] if key[0] == "ident" else "título/edición/año") + ")")
+        return ids
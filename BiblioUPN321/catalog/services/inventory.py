@@ -0,0 +1,147 @@
+"""
+Ingesta de lecturas de inventario (lectura de estantes con QR).
+
+Los lectores (`templates/catalog/scan.html`) acumulan códigos y los envían
+en lotes. `record_scans()` resuelve el lote completo con `codes.resolve_many()`
+(caché en memoria y, para lo que falte, consultas `IN`) e inserta los eventos
+con `bulk_create`; `arecord_scans()` hace lo mismo con el ORM asíncrono para
+la vista ASGI. Los formatos de código aceptados están en `services/codes.py`.
+
+Cada lectura puede traer una clave de idempotencia (`key`) generada en el
+dispositivo: el lector trabaja sin conexión (cola en IndexedDB) y reenvía
+lotes completos al reconectarse, así que el servidor descarta las claves ya
+registradas en lugar de duplicar eventos.
+"""
+import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.utils import timezone
+
+from .codes import aresolve_many, resolve_many
+from .importer import IN_CHUNK
+
+# Máximo de lecturas por petición: una cola offline de ~2000 lecturas se
+# sincroniza en una o dos peticiones
+MAX_BATCH = 2000
+
+
+def parse_timestamp(value) -> datetime.datetime:
+    """Hora de lectura enviada por el cliente (epoch en ms o ISO 8601); ahora si falta o no es válida."""
+    now = timezone.now()
+    try:
+        if isinstance(value, (int, float)):
+            ts = datetime.datetime.fromtimestamp(value / 1000, tz=datetime.timezone.utc)
+        elif isinstance(value, str) and value:
+            ts = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+            if timezone.is_naive(ts):
+                ts = timezone.make_aware(ts)
+        else:
+            return now
+    except (ValueError, OverflowError, OSError):
+        return now
+    # Relojes desajustados: nunca en el futuro
+    return min(ts, now)
+
+
+def _in_chunks(values: Iterable[str]) -> Iterable[List[str]]:
+    values = sorted(values)
+    for i in range(0, len(values), IN_CHUNK):
+        yield values[i:i + IN_CHUNK]
+
+
+def _key_queries(keys: Iterable[str]):
+    from ..models import InventoryEvent
+
+    for chunk in _in_chunks(keys):
+        yield InventoryEvent.objects.filter(client_key__in=chunk).values_list("client_key", flat=True)
+
+
+def _pending(scans, known: Set[str]) -> Tuple[List[Tuple[str, object, Optional[str]]], int]:
+    """Lecturas a registrar `(código, hora, clave)` y cuántas eran reenvíos.
+
+    Cada lectura con clave es un evento: su clave es lo único que permite
+    reconocer un reenvío, así que no se puede fusionar con otra. Las lecturas
+    sin clave se fusionan por código (queda la primera).
+    """
+    pending: Dict[object, Tuple[str, object, Optional[str]]] = {}
+    duplicates = 0
+    for code, at, key in scans:
+        if key and key in known:
+            duplicates += 1
+            continue
+        code = (code or "").strip()[:255]
+        if not code:
+            continue
+        ident = ("key", key) if key else ("code", code)
+        if ident in pending:
+            duplicates += bool(key)
+            continue
+        pending[ident] = (code, at, key)
+    return list(pending.values()), duplicates
+
+
+def _events(session, pending, resolved, device: str) -> list:
+    from ..models import InventoryEvent
+
+    return [
+        InventoryEvent(
+            session=session,
+            record_id=resolved[code][0],
+            item_id=resolved[code][1],
+            code=code,
+            device=device[:64],
+            client_key=key,
+            scanned_at=parse_timestamp(at),
+        )
+        for code, at, key in pending
+        if code in resolved
+    ]
+
+
+def _result(codes: List[str], resolved, accepted: int, duplicates: int) -> Dict[str, object]:
+    return {
+        "accepted": accepted,
+        "duplicates": duplicates,
+        "found": {code: resolved[code][2] for code in codes if code in resolved},
+        "unknown": [code for code in codes if code not in resolved],
+    }
+
+
+def record_scans(session, scans: List[Tuple[str, object, Optional[str]]], device: str = "") -> Dict[str, object]:
+    """Registra un lote de lecturas `(código, hora, clave)` en `session`.
+
+    - Las claves ya registradas (reenvíos) se descartan, así que reenviar
+      un lote completo nunca agrega eventos.
+    - Cada lectura con clave genera su evento; las lecturas sin clave de un
+      mismo código (la cámara lo lee en varios cuadros) generan uno solo.
+
+    Devuelve `{"accepted": n, "duplicates": n, "found": {código: título},
+    "unknown": [códigos]}`.
+    """
+    from ..models import InventoryEvent
+
+    keys = {key for _, _, key in scans if key}
+    known = {k for qs in _key_queries(keys) for k in qs}
+    pending, duplicates = _pending(scans, known)
+    codes = list(dict.fromkeys(code for code, _, _ in pending))
+    resolved = resolve_many(codes)
+    events = _events(session, pending, resolved, device)
+    # ignore_conflicts cubre el reenvío concurrente de la misma clave (dos pestañas)
+    InventoryEvent.objects.bulk_create(events, batch_size=500, ignore_conflicts=bool(keys))
+    return _result(codes, resolved, len(events), duplicates)
+
+
+async def arecord_scans(session, scans: List[Tuple[str, object, Optional[str]]], device: str = "") -> Dict[str, object]:
+    """Versión asíncrona de `record_scans` (ORM asíncrono: `abulk_create`)."""
+    from ..models import InventoryEvent
+
+    keys = {key for _, _, key in scans if key}
+    known: Set[str] = set()
+    for qs in _key_queries(keys):
+        known.update([k async for k in qs])
+    pending, duplicates = _pending(scans, known)
+    codes = list(dict.fromkeys(code for code, _, _ in pending))
+    resolved = await aresolve_many(codes)
+    events = _events(session, pending, resolved, device)
+    await InventoryEvent.objects.abulk_create(events, batch_size=500, ignore_conflicts=bool(keys))
+    return _result(codes, resolved, len(events), duplicates)
@@ -0,0 +1,251 @@
+"""
+Hojas de etiquetas para inventario: QR + código + signatura, en mosaico.
+
+Las etiquetas se leen del queryset con `iterator()` y se agrupan por página;
+cada página se dibuja completa (opcionalmente en otro proceso) y se escribe
+de inmediato, así que en memoria sólo hay unas pocas páginas a la vez sin
+importar cuántas etiquetas tenga el trabajo.
+
+- PDF: `PdfSheetWriter` escribe cada página (imagen de 1 bit comprimida
+  con Flate) en cuanto llega; el árbol de páginas y la tabla xref se
+  escriben al cerrar. El `append=True` de Pillow reescribe todo el árbol en
+  cada página y se vuelve cuadrático en trabajos de cientos de hojas.
+- PNG: un archivo por página (`<prefijo>-0001.png`, ...).
+"""
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .lcc import build_call_number
+
+# Tamaños de hoja en milímetros (ancho, alto)
+PAGE_SIZES = {
+    "a4": (210.0, 297.0),
+    "letter": (215.9, 279.4),
+}
+
+# (payload del QR, código visible, signatura, título)
+Label = Tuple[str, str, str, str]
+
+
+@dataclass(frozen=True)
+class SheetLayout:
+    """Geometría de la hoja; se envía tal cual a los procesos de dibujo."""
+    page: str = "a4"
+    cols: int = 3
+    rows: int = 8
+    margin_mm: float = 8.0
+    dpi: int = 300
+
+    @property
+    def per_page(self) -> int:
+        return self.cols * self.rows
+
+    def px(self, mm: float) -> int:
+        return int(round(mm / 25.4 * self.dpi))
+
+    @property
+    def page_px(self) -> Tuple[int, int]:
+        w, h = PAGE_SIZES[self.page]
+        return self.px(w), self.px(h)
+
+
+def record_call_number(record) -> str:
+    """Signatura del registro armada con `build_call_number`."""
+    if record.lcc_class or record.lcc_number:
+        return build_call_number({
+            "lcc_class": record.lcc_class,
+            "lcc_number": record.lcc_number,
+            "cutter": record.cutter,
+            "cutter2": record.cutter2,
+            "year": record.publish_year,
+        })
+    return record.call_number or ""
+
+
+def labels_for(qs, chunk_size: int = 1000) -> Iterator[Label]:
+    """Etiquetas de un queryset de `Item` o `BibliographicRecord`, en streaming."""
+    from ..models import Item
+
+    if qs.model is Item:
+        for item in qs.select_related("record").iterator(chunk_size=chunk_size):
+            rec = item.record
+            yield item.get_qr_payload(), item.barcode, record_call_number(rec), rec.title
+    else:
+        for rec in qs.iterator(chunk_size=chunk_size):
+            yield rec.get_qr_payload(), rec.inventory_code, record_call_number(rec), rec.title
+
+
+def _font(size: int):
+    from PIL import ImageFont
+
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow sin FreeType: fuente bitmap de tamaño fijo
+        return ImageFont.load_default()
+
+
+def _fit(draw, text: str, font, width: int) -> str:
+    """Recorta `text` con "…" para que quepa en `width` píxeles."""
+    if draw.textlength(text, font=font) <= width:
+        return text
+    while text and draw.textlength(text + "…", font=font) > width:
+        text = text[:-1]
+    return text + "…"
+
+
+def render_page(labels: Sequence[Label], layout: SheetLayout):
+    """Dibuja una página (imagen PIL en blanco y negro) con hasta `per_page` etiquetas.
+
+    Es una función de módulo sin acceso a la BD para poder ejecutarse en un
+    `ProcessPoolExecutor`.
+    """
+    import qrcode
+    from PIL import Image, ImageDraw
+
+    page_w, page_h = layout.page_px
+    margin = layout.px(layout.margin_mm)
+    cell_w = (page_w - 2 * margin) // layout.cols
+    cell_h = (page_h - 2 * margin) // layout.rows
+    pad = max(4, cell_h // 12)
+    qr_side = cell_h - 2 * pad
+    text_x = qr_side + 2 * pad
+    text_w = cell_w - text_x - pad
+
+    big, small = _font(max(10, cell_h // 6)), _font(max(8, cell_h // 9))
+    page = Image.new("1", (page_w, page_h), 1)
+    draw = ImageDraw.Draw(page)
+
+    for idx, (payload, code, call_number, title) in enumerate(labels):
+        row, col = divmod(idx, layout.cols)
+        x = margin + col * cell_w
+        y = margin + row * cell_h
+
+        qr = qrcode.QRCode(border=1)
+        qr.add_data(payload)
+        qr.make(fit=True)
+        img = qr.make_image().get_image().convert("1")
+        page.paste(img.resize((qr_side, qr_side), Image.NEAREST), (x + pad, y + pad))
+
+        ty = y + pad
+        for text, font in ((code, big), (call_number, big), (title, small)):
+            if not text:
+                continue
+            draw.text((x + text_x, ty), _fit(draw, text, font, text_w), font=font, fill=0)
+            ty += int(font.size * 1.3) if hasattr(font, "size") else 14
+    return page
+
+
+def _pages(labels: Iterable[Label], per_page: int) -> Iterator[List[Label]]:
+    it = iter(labels)
+    while True:
+        chunk = list(islice(it, per_page))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_pages(labels: Iterable[Label], layout: SheetLayout, workers: int = 1) -> Iterator:
+    """Genera las páginas en orden; con `workers > 1` se dibujan en paralelo.
+
+    Como máximo hay `2 * workers` páginas en vuelo, de modo que la memoria
+    no crece con el tamaño del trabajo.
+    """
+    if workers <= 1:
+        for chunk in _pages(labels, layout.per_page):
+            yield render_page(chunk, layout)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = []
+        for chunk in _pages(labels, layout.per_page):
+            pending.append(executor.submit(render_page, chunk, layout))
+            if len(pending) >= 2 * workers:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+class PdfSheetWriter:
+    """PDF mínimo de páginas-imagen que se escribe en streaming sobre `fp`.
+
+    Los objetos 1 (Catalog) y 2 (Pages) se reservan y se escriben en
+    `close()`, cuando ya se conocen todas las páginas.
+    """
+
+    def __init__(self, fp, dpi: int):
+        self.fp = fp
+        self.dpi = dpi
+        self.offsets: List[int] = [0, 0]
+        self.pages: List[int] = []
+        fp.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write_obj(self, num: int, body: bytes, stream: Optional[bytes] = None) -> None:
+        self.offsets[num - 1] = self.fp.tell()
+        self.fp.write(b"%d 0 obj\n" % num + body)
+        if stream is not None:
+            self.fp.write(b"\nstream\n" + stream + b"\nendstream")
+        self.fp.write(b"\nendobj\n")
+
+    def _new_obj(self, body: bytes, stream: Optional[bytes] = None) -> int:
+        self.offsets.append(0)
+        num = len(self.offsets)
+        self._write_obj(num, body, stream)
+        return num
+
+    def add_page(self, page) -> None:
+        """Agrega una imagen PIL en modo "1" como página completa."""
+        w, h = page.size
+        data = zlib.compress(page.tobytes())
+        image = self._new_obj(
+            b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray"
+            b" /BitsPerComponent 1 /Filter /FlateDecode /Length %d >>" % (w, h, len(data)),
+            data,
+        )
+        pw, ph = w * 72.0 / self.dpi, h * 72.0 / self.dpi
+        content = b"q %.2f 0 0 %.2f 0 0 cm /Im0 Do Q" % (pw, ph)
+        contents = self._new_obj(b"<< /Length %d >>" % len(content), content)
+        self.pages.append(self._new_obj(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f]"
+            b" /Resources << /XObject << /Im0 %d 0 R >> >> /Contents %d 0 R >>" % (pw, ph, image, contents)
+        ))
+
+    def close(self) -> None:
+        self._write_obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        kids = b" ".join(b"%d 0 R" % num for num in self.pages)
+        self._write_obj(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.pages)))
+        xref = self.fp.tell()
+        self.fp.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(self.offsets) + 1))
+        for offset in self.offsets:
+            self.fp.write(b"%010d 00000 n \n" % offset)
+        self.fp.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                      % (len(self.offsets) + 1, xref))
+
+
+def write_sheets(labels: Iterable[Label], output, fmt: str = "pdf",
+                 layout: Optional[SheetLayout] = None, workers: int = 1) -> int:
+    """Escribe las hojas en `output` y devuelve el número de páginas.
+
+    Para "pdf" `output` es una ruta o un archivo binario abierto; para "png"
+    es el prefijo de los archivos por página.
+    """
+    layout = layout or SheetLayout()
+    pages = iter_pages(labels, layout, workers)
+    count = 0
+    if fmt != "pdf":
+        for count, page in enumerate(pages, start=1):
+            page.save(f"{output}-{count:04d}.png", "PNG", dpi=(layout.dpi, layout.dpi))
+        return count
+
+    fp = open(output, "wb") if isinstance(output, str) else output
+    try:
+        writer = PdfSheetWriter(fp, layout.dpi)
+        for count, page in enumerate(pages, start=1):
+            writer.add_page(page)
+        writer.close()
+    finally:
+        if fp is not output:
+            fp.close()
+    return count
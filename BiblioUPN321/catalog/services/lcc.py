@@ -1,5 +1,6 @@
 import re
 import unicodedata
+import zlib
 from typing import Optional, Literal, Dict, List, Set, Tuple
 
 # ------------------ Configuración / Heurísticas ------------------
@@ -193,10 +194,21 @@ LCC_REGEX = re.compile(
 )
 
 # ------------------ Normalización ------------------
+class _CombiningTable(dict):
+    """Tabla para `str.translate` que borra marcas combinantes (se llena al vuelo)."""
+
+    def __missing__(self, codepoint: int):
+        value = None if unicodedata.combining(chr(codepoint)) else codepoint
+        self[codepoint] = value
+        return value
+
+_COMBINING_TABLE = _CombiningTable()
+
 def _strip_diacritics(txt: str) -> str:
     """Remueve tildes/diacríticos conservando ASCII base."""
-    norm = unicodedata.normalize("NFKD", txt)
-    return "".join(ch for ch in norm if not unicodedata.combining(ch))
+    if txt.isascii():
+        return txt
+    return unicodedata.normalize("NFKD", txt).translate(_COMBINING_TABLE)
 
 def normalize(value: Optional[str], mode: Literal["text", "lcc"] = "text") -> Optional[str]:
     """
@@ -235,6 +247,33 @@ def normalize_text(text: Optional[str]) -> str:
     return normalize(text or "", mode="text") or ""
 
 
+ISBN_CHARS_RE = re.compile(r"[^0-9X]")
+
+def normalize_isbn(isbn: Optional[str]) -> str:
+    """ISBN sólo con dígitos (y X), convertido a ISBN-13; "" si no es válido.
+
+    La X sólo se admite como dígito de control de un ISBN-10.
+    """
+    digits = ISBN_CHARS_RE.sub("", (isbn or "").upper())
+    if len(digits) == 10 and digits[:9].isdigit():
+        core = "978" + digits[:9]
+        total = sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(core))
+        return core + str((10 - total % 10) % 10)
+    if len(digits) == 13 and "X" not in digits:
+        return digits
+    return ""
+
+def identifier_key(isbn: Optional[str], issn: Optional[str]) -> str:
+    """Clave de deduplicación: "isbn:<13 dígitos>" o "issn:<8>"; "" si no hay ninguno válido."""
+    norm = normalize_isbn(isbn)
+    if norm:
+        return f"isbn:{norm}"
+    issn_digits = ISBN_CHARS_RE.sub("", (issn or "").upper())
+    if len(issn_digits) == 8:
+        return f"issn:{issn_digits}"
+    return ""
+
+
 # Stopwords pequeñas para mejorar matching por tokens (evitar que 'de','la' rompan emparejamientos)
 _STOPWORDS: Set[str] = {"de", "la", "el", "los", "las", "y", "en", "del", "para", "con", "por", "a"}
 
@@ -243,35 +282,117 @@ _STOPWORDS: Set[str] = {"de", "la", "el", "los", "las", "y", "en", "del", "para"
 # Construimos esto aquí, tras definir normalize_text
 NORMALIZED_KEYWORDS: Dict[str, str] = {normalize_text(k): v for k, v in KEYWORDS_TO_CLASS.items()}
 
+# ------------------ Matcher compilado de keywords ------------------
+# Las keywords se comparan en el mismo orden de NORMALIZED_KEYWORDS: gana la
+# primera (por orden de inserción) que aparezca en el texto. En lugar de
+# recorrer el mapa completo con `in` en cada llamada, compilamos una sola vez:
+# - un autómata Aho-Corasick (DFA completo) para la pasada por frase, y
+# - un índice invertido token -> keywords para la pasada tolerante por tokens.
+_KEYWORD_CLASSES: List[str] = list(NORMALIZED_KEYWORDS.values())
+
+
+def _build_phrase_automaton(keywords: List[str]) -> Tuple[List[Dict[str, int]], List[int]]:
+    """Construye el DFA Aho-Corasick de las keywords.
+
+    Devuelve (delta, best):
+    - delta[estado]: transiciones explícitas; un carácter ausente vuelve a 0.
+    - best[estado]: índice mínimo de keyword reconocida al llegar al estado
+      (incluye las salidas heredadas por enlaces de fallo) o len(keywords).
+    """
+    none = len(keywords)
+    goto: List[Dict[str, int]] = [{}]
+    best: List[int] = [none]
+    for idx, kw in enumerate(keywords):
+        if not kw:
+            continue
+        state = 0
+        for ch in kw:
+            nxt = goto[state].get(ch)
+            if nxt is None:
+                nxt = len(goto)
+                goto[state][ch] = nxt
+                goto.append({})
+                best.append(none)
+            state = nxt
+        best[state] = min(best[state], idx)
+
+    # BFS: enlaces de fallo y cierre de transiciones para obtener un DFA.
+    delta: List[Dict[str, int]] = [dict(g) for g in goto]
+    fail = [0] * len(goto)
+    queue = list(goto[0].values())
+    head = 0
+    while head < len(queue):
+        state = queue[head]
+        head += 1
+        best[state] = min(best[state], best[fail[state]])
+        for ch, nxt in goto[state].items():
+            queue.append(nxt)
+            f = fail[state]
+            fail[nxt] = delta[f].get(ch, 0) if state else 0
+        # Heredamos las transiciones del estado de fallo que no existen aquí
+        for ch, nxt in delta[fail[state]].items():
+            delta[state].setdefault(ch, nxt)
+    return delta, best
+
+
+def _build_token_index(keywords: List[str]) -> Tuple[Dict[str, List[int]], List[int]]:
+    """Índice invertido token -> [keywords] y tokens requeridos por keyword."""
+    index: Dict[str, List[int]] = {}
+    needed: List[int] = []
+    for idx, kw in enumerate(keywords):
+        kw_tokens = set(w for w in kw.split() if w and w not in _STOPWORDS)
+        # si la keyword tiene 1 token, basta uno; si tiene >1, se tolera que falte 1
+        needed.append(max(1, len(kw_tokens) - 1) if kw_tokens else 0)
+        for tok in kw_tokens:
+            index.setdefault(tok, []).append(idx)
+    return index, needed
+
+
+_PHRASE_DELTA, _PHRASE_BEST = _build_phrase_automaton(list(NORMALIZED_KEYWORDS))
+_TOKEN_INDEX, _TOKEN_NEEDED = _build_token_index(list(NORMALIZED_KEYWORDS))
+
+
+def _match_keyword_class(text_norm: str) -> Optional[str]:
+    """Clase de la primera keyword que coincide con `text_norm` (ya normalizado).
+
+    Equivale a recorrer NORMALIZED_KEYWORDS en orden, primero por subcadena y
+    luego por cobertura de tokens, pero en una sola pasada por el texto.
+    """
+    none = len(_KEYWORD_CLASSES)
+
+    # 1) Coincidencia directa (subcadena) con el autómata
+    delta = _PHRASE_DELTA
+    best_of = _PHRASE_BEST
+    state = 0
+    found = none
+    for ch in text_norm:
+        state = delta[state].get(ch, 0)
+        if best_of[state] < found:
+            found = best_of[state]
+    if found < none:
+        return _KEYWORD_CLASSES[found]
+
+    # 2) Fallback por tokens: contamos cuántos tokens de cada keyword aparecen
+    # en el texto y nos quedamos con la primera que alcanza el mínimo requerido.
+    hits: Dict[int, int] = {}
+    for tok in set(text_norm.split()):
+        if tok in _STOPWORDS:
+            continue
+        for idx in _TOKEN_INDEX.get(tok, ()):
+            hits[idx] = hits.get(idx, 0) + 1
+    for idx in sorted(hits):
+        if hits[idx] >= _TOKEN_NEEDED[idx]:
+            return _KEYWORD_CLASSES[idx]
+    return None
+
+
 # ------------------ Helpers de clasificación ------------------
 def _class_letters_from_subjects(text: Optional[str]) -> str:
     """Devuelve la clase (letras) a partir de keywords; fallback Z si no hay match."""
-    # Normalizamos texto (quita tildes, lower, colapsa espacios) para matching robusto
-    text_norm = normalize_text(text or "")
-
-    # 1) Intento de coincidencia directa sobre las claves normalizadas
-    for kw_norm, clazz in NORMALIZED_KEYWORDS.items():
-        if kw_norm and kw_norm in text_norm:
-            return clazz
-
-    # 2) Fallback por tokens: las palabras principales del keyword deben estar
-    # contenidas en el texto (ignorando stopwords). Esto permite que
-    # "metodologia de la investigacion" coincida con
-    # "metodologia de la investigacion educativa" si falta el sufijo.
-    text_tokens = set(w for w in text_norm.split() if w and w not in _STOPWORDS)
-    if text_tokens:
-        for kw_norm, clazz in NORMALIZED_KEYWORDS.items():
-            kw_tokens = set(w for w in kw_norm.split() if w and w not in _STOPWORDS)
-            if not kw_tokens:
-                continue
-            # Requiere que la intersección cubra la mayor parte de tokens de la keyword.
-            inter = kw_tokens.intersection(text_tokens)
-            # si la keyword tiene 1 token, basta uno; si tiene >1, permitimos faltar 1 token como tolerancia
-            needed = max(1, len(kw_tokens) - 1)
-            if len(inter) >= needed:
-                return clazz
-
-    return "Z"  # Fallback: al menos algo válido
+    # Normalizamos texto (quita tildes, lower, colapsa espacios) para matching robusto.
+    # Frase directa y luego tokens (p.ej. "metodologia de la investigacion"
+    # coincide con "metodologia de la investigacion educativa" si falta el sufijo).
+    return _match_keyword_class(normalize_text(text or "")) or "Z"  # Fallback: al menos algo válido
 
 def _class_number_from_title(title: Optional[str]) -> str:
     """
@@ -284,6 +405,11 @@ def _class_number_from_title(title: Optional[str]) -> str:
     val = sum(ord(c) for c in s[:12])
     return str(100 + (val % 900))  # 100–999
 
+def _stable_hash(text: str) -> int:
+    """Hash estable entre procesos y ejecuciones (`hash()` de str se aleatoriza
+    por proceso, lo que daba cutters distintos para el mismo autor)."""
+    return zlib.crc32(text.encode("utf-8"))
+
 def cutter_from_person_name(full_name: str) -> Optional[str]:
     """
     Cutter simple: inicial + dos dígitos pseudoestables. Placeholder de Cutter-Sanborn.
@@ -293,7 +419,7 @@ def cutter_from_person_name(full_name: str) -> Optional[str]:
         return None
     # Toma la primera letra del apellido principal si viene "Apellido, Nombre"
     letter = full_name.split(",")[0].strip()[:1].upper() or full_name[:1].upper()
-    num = (abs(hash(full_name)) % 90) + 10  # 10..99
+    num = _stable_hash(full_name) % 90 + 10  # 10..99
     return f"{letter}{num}"
 
 def first_author_cutter(record) -> Optional[str]:
@@ -318,7 +444,7 @@ def second_cutter_from_title(record) -> Optional[str]:
         w = re.sub(r"[^\wÁÉÍÓÚÑáéíóúñ]", "", w, flags=re.UNICODE)
         if len(w) >= 3:
             letter = w[0].upper()
-            num = (abs(hash(w)) % 90) + 10
+            num = _stable_hash(w) % 90 + 10
             return f"{letter}{num}"
     return None
 
@@ -354,25 +480,24 @@ def infer_class(record) -> Optional[str]:
     text = " ".join(bits)
     text = normalize_text(text)
 
-    # Intenta coincidencia directa y luego por tokens usando el mapa normalizado
-    for kw_norm, clazz in NORMALIZED_KEYWORDS.items():
-        if kw_norm and kw_norm in text:
-            return clazz
-
-    text_tokens = set(w for w in text.split() if w and w not in _STOPWORDS)
-    if text_tokens:
-        for kw_norm, clazz in NORMALIZED_KEYWORDS.items():
-            kw_tokens = set(w for w in kw_norm.split() if w and w not in _STOPWORDS)
-            if not kw_tokens:
-                continue
-            inter = kw_tokens.intersection(text_tokens)
-            needed = max(1, len(kw_tokens) - 1)
-            if len(inter) >= needed:
-                return clazz
-    return None
+    # Intenta coincidencia directa y luego por tokens usando el matcher compilado
+    return _match_keyword_class(text)
 
 # ------------------ API principal ------------------
 def generate_lcc(record, subjects_text: Optional[str] = None) -> Tuple[Optional[str], str]:
+    return _compose_lcc(record, subjects_text, first_author_cutter(record))
+
+def _compose_lcc(
+    record,
+    subjects_text: Optional[str],
+    cutter1: Optional[str],
+    publisher_name: Optional[str] = None,
+) -> Tuple[Optional[str], str]:
+    """Arma la LCC heurística con el cutter de autor ya resuelto.
+
+    `publisher_name` permite pasar la editorial precargada (modo bulk); si es
+    None se consulta `record.publisher` como antes.
+    """
     letters = _class_letters_from_subjects(subjects_text)
 
     if not letters or letters.strip() == "":
@@ -387,10 +512,11 @@ def generate_lcc(record, subjects_text: Optional[str] = None) -> Tuple[Optional[
 
     number = _class_number_from_title(getattr(record, "title", None))
 
-    cutter1 = first_author_cutter(record)
-    if not cutter1 and getattr(record, "publisher", None):
-        pub_name = getattr(record.publisher, "name", None) or str(record.publisher)
-        cutter1 = cutter_from_person_name(pub_name)
+    if not cutter1:
+        if publisher_name is None and getattr(record, "publisher", None):
+            publisher_name = getattr(record.publisher, "name", None) or str(record.publisher)
+        if publisher_name:
+            cutter1 = cutter_from_person_name(publisher_name)
     if not cutter1:
         cutter1 = _author_cutter(getattr(record, "title", None))
 
@@ -404,6 +530,85 @@ def generate_lcc(record, subjects_text: Optional[str] = None) -> Tuple[Optional[
         parts.append(str(year))
     return " ".join(parts), "heurística"
 
+def generate_lcc_preloaded(
+    record,
+    subjects_text: Optional[str],
+    first_author: Optional[str] = None,
+    publisher_name: Optional[str] = None,
+) -> Tuple[Optional[str], str]:
+    """`generate_lcc` sin consultas: autor y editorial se pasan por nombre.
+
+    Pensado para registros aún no guardados (importación masiva).
+    """
+    cutter1 = cutter_from_person_name(first_author) if first_author else None
+    return _compose_lcc(record, subjects_text, cutter1, publisher_name or "")
+
+# Máximo de parámetros por cláusula IN (SQLite antiguos limitan a 999)
+_IN_CHUNK = 900
+
+def _chunked(seq: List, size: int = _IN_CHUNK):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+def generate_lcc_bulk(records) -> List[Tuple[Optional[str], str]]:
+    """
+    Versión por lotes de `generate_lcc` para reclasificar muchos registros.
+
+    Carga el primer autor, las materias y (si hace falta) la editorial de todo
+    el lote en un número constante de consultas (una por cada 900 registros y
+    relación) en vez de 2–3 consultas por registro. Devuelve una lista de
+    tuplas (código, origen) en el mismo orden que `records`.
+    """
+    from ..models import BibliographicRecord, Publisher, RecordContributor
+
+    records = list(records)
+    ids = [r.pk for r in records if r.pk]
+
+    # Primer autor por registro: mismo criterio que `.first()` (menor pk)
+    first_author: Dict[int, str] = {}
+    subjects: Dict[int, List[str]] = {}
+    through = BibliographicRecord.subjects.through
+    for chunk in _chunked(ids):
+        rows = (
+            RecordContributor.objects
+            .filter(record_id__in=chunk, role="author")
+            .order_by("record_id", "id")
+            .values_list("record_id", "person__full_name")
+        )
+        for rec_id, full_name in rows:
+            first_author.setdefault(rec_id, full_name)
+        rows = (
+            through.objects
+            .filter(bibliographicrecord_id__in=chunk)
+            .order_by("id")
+            .values_list("bibliographicrecord_id", "subject__term")
+        )
+        for rec_id, term in rows:
+            subjects.setdefault(rec_id, []).append(term)
+
+    cutters: List[Optional[str]] = [
+        cutter_from_person_name(first_author[r.pk]) if r.pk in first_author else None
+        for r in records
+    ]
+
+    # Editoriales sólo para los registros que no tienen autor
+    pub_ids = list({
+        r.publisher_id for r, c in zip(records, cutters)
+        if not c and getattr(r, "publisher_id", None)
+    })
+    publishers: Dict[int, str] = {}
+    for chunk in _chunked(pub_ids):
+        publishers.update(Publisher.objects.filter(pk__in=chunk).values_list("pk", "name"))
+
+    results = []
+    for rec, cutter1 in zip(records, cutters):
+        subjects_text = getattr(rec, "_subjects_text", None)
+        if subjects_text is None:
+            subjects_text = " ".join(subjects.get(rec.pk, []))
+        pub_name = publishers.get(getattr(rec, "publisher_id", None)) or ""
+        results.append(_compose_lcc(rec, subjects_text, cutter1, publisher_name=pub_name))
+    return results
+
 def split_lcc(code: str):
     """
     Devuelve dict con lcc_class, lcc_number, cutter, cutter2, year (str o None).
@@ -445,6 +650,12 @@ def build_call_number(parts: dict) -> str:
         segs.append(str(year))
     return " ".join([s for s in segs if s])
 
+# Relleno de la clave de estantería: menor que "0" y que "A", para que lo
+# ausente vaya antes ("Q" antes que "QA", "QA76.73" antes que "QA76.73 .A12")
+_SORT_PAD = " "
+CUTTER_DIGITS = 6
+
+
 def build_sort_key(
     lcc_class: str,
     lcc_number: str,
@@ -454,37 +665,73 @@ def build_sort_key(
 ) -> Tuple[str, str]:
     """
     Devuelve (sort_key, number_sort) para ordenar correctamente por estantería:
-    - sort_key: CLASE(3) | INT(4) | DEC(6) | C1(L+4) | C2(L+4) | AÑO(4)
+    - sort_key: CLASE(3) | INT(4) | DEC(6) | C1(L+6) | C2(L+6) | AÑO(4)
     - number_sort: INT.DEC (útil para depurar)
+
+    Los cutters se comparan como decimales (".P12" < ".P9"): letra y dígitos
+    alineados a la izquierda y rellenos con espacios, no con ceros. Si cambia
+    el formato, recalcular con `manage.py backfill_shelf_key`.
     """
     # separa entero y decimal del número
     m = re.match(r"^(\d{1,4})(?:\.(\d+))?$", (lcc_number or "").strip())
     if m:
         n_int = m.group(1).zfill(4)
-        n_dec = (m.group(2) or "").ljust(6, "0")
+        n_dec = (m.group(2) or "").ljust(6, "0")[:6]
     else:
         n_int, n_dec = "0000", "000000"
 
     def _pack(c: str) -> str:
-        if not c:
-            return "_0000"
-        m2 = re.match(r"^([A-Z])(\d+)$", c.upper())
+        m2 = re.match(r"^([A-Z])(\d+)$", (c or "").upper())
         if not m2:
-            return "_0000"
-        return f"{m2.group(1)}{m2.group(2).zfill(4)}"
+            return _SORT_PAD * (1 + CUTTER_DIGITS)
+        return f"{m2.group(1)}{m2.group(2)[:CUTTER_DIGITS].ljust(CUTTER_DIGITS, _SORT_PAD)}"
 
-    c1 = _pack(cutter or "")
-    c2 = _pack(cutter2 or "")
+    c1 = _pack(cutter)
+    c2 = _pack(cutter2)
     y = (year or "").zfill(4) if year else "0000"
 
-    sort_key = f"{(lcc_class or '').ljust(3,'_')}|{n_int}|{n_dec}|{c1}|{c2}|{y}"
+    sort_key = f"{(lcc_class or '')[:3].ljust(3, _SORT_PAD)}|{n_int}|{n_dec}|{c1}|{c2}|{y}"
     number_sort = f"{n_int}.{n_dec}"
     return sort_key, number_sort
 
+CUTTER_DOT_RE = re.compile(r"\s*\.(?=[A-Z])")  # ".P98" / "76.73.P98" → " P98"
+LCC_CLASS_ONLY_RE = re.compile(r"^([A-Z]{1,3})\b")
+
+def sort_key_for_call_number(call_number: Optional[str]) -> str:
+    """
+    Clave de estantería para una signatura escrita por el usuario.
+    Acepta el formato de `build_call_number` ("QA76.73 .P98 2023") o parcial
+    ("QA76.73", "QA"), para ubicar la posición en el estante.
+    """
+    code = normalize_lcc(call_number or "") or ""
+    code = CUTTER_DOT_RE.sub(" ", code).strip()
+    parts = split_lcc(code)
+    if not parts["lcc_class"]:
+        m = LCC_CLASS_ONLY_RE.match(code)
+        parts["lcc_class"] = m.group(1) if m else ""
+    sort_key, _ = build_sort_key(
+        parts["lcc_class"], parts["lcc_number"], parts["cutter"], parts["cutter2"], parts["year"],
+    )
+    return sort_key
+
+
+def lcc_from_marc(*parts: Optional[str]) -> Optional[str]:
+    """LCC normalizada a partir de un 050 MARC ($a, $b); None si no se reconoce.
+
+    "QA76.73.P98" + ".D45 2021" → "QA 76.73 P98 D45 2021" (los cutters sin
+    punto, que es la forma que entiende `split_lcc`).
+    """
+    raw = " ".join(p.strip() for p in parts if p and p.strip())
+    code = normalize_lcc(CUTTER_DOT_RE.sub(" ", raw.upper()))
+    if not code or not split_lcc(code)["lcc_class"]:
+        return None
+    return code
+
 # (Opcional) Exporta nombres públicos del módulo
 __all__ = [
     "KEYWORDS_TO_CLASS",
-    "normalize", "normalize_lcc", "normalize_text",
-    "generate_lcc", "split_lcc", "build_call_number", "build_sort_key",
+    "normalize", "normalize_lcc", "normalize_text", "normalize_isbn", "identifier_key",
+    "generate_lcc", "generate_lcc_bulk", "generate_lcc_preloaded", "split_lcc", "build_call_number", "build_sort_key",
+    "sort_key_for_call_number", "lcc_from_marc",
     "infer_class", "LCC_REGEX",
 ]
@@ -0,0 +1,226 @@
+"""
+Lectura en streaming de MARC21 (ISO 2709) y MARCXML para la importación.
+
+Ambos lectores producen un registro a la vez, así que la memoria no depende
+del tamaño del archivo:
+
+- `iter_marc21` lee cada registro por su longitud (5 primeros bytes del
+  líder) y descompone el directorio.
+- `iter_marcxml` usa `ElementTree.iterparse` y libera cada `<record>` al
+  terminar de procesarlo.
+
+`marc_to_row` traduce un registro a `ImportRow` para reutilizar el mismo
+camino de inserción por lotes que el CSV (`services/importer.py`).
+"""
+import re
+import xml.etree.ElementTree as ET
+from typing import BinaryIO, Dict, Iterator, List, Tuple
+
+from .importer import ImportRow, RowError
+from .lcc import lcc_from_marc, normalize_isbn
+
+FIELD_TERMINATOR = b"\x1e"
+SUBFIELD_DELIMITER = "\x1f"
+
+Subfields = List[Tuple[str, str]]
+
+
+class MarcRecord:
+    """Registro MARC mínimo: campos de control y campos de datos con subcampos."""
+
+    __slots__ = ("leader", "control", "data")
+
+    def __init__(self, leader: str = ""):
+        self.leader = leader
+        self.control: Dict[str, str] = {}
+        # tag -> [(indicadores, [(código, valor), ...]), ...]
+        self.data: Dict[str, List[Tuple[str, Subfields]]] = {}
+
+    def add_data(self, tag: str, indicators: str, subfields: Subfields) -> None:
+        self.data.setdefault(tag, []).append((indicators, subfields))
+
+    def fields(self, tag: str) -> List[Tuple[str, Subfields]]:
+        return self.data.get(tag, [])
+
+    def first(self, tag: str, code: str) -> str:
+        """Primer subcampo `code` del primer campo `tag` que lo tenga ("" si no hay)."""
+        for _, subfields in self.fields(tag):
+            for c, value in subfields:
+                if c == code:
+                    return value
+        return ""
+
+
+class MarcError(ValueError):
+    """Registro MARC21 corrupto (longitud o directorio inválidos)."""
+
+
+# ---------- MARC21 binario ----------
+def _decode(raw: bytes, utf8: bool) -> str:
+    if utf8:
+        return raw.decode("utf-8", errors="replace")
+    # MARC-8 no tiene códec en la biblioteca estándar: la mayoría de los
+    # registros que recibimos son ASCII o UTF-8 aunque el líder diga otra cosa.
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw.decode("latin-1")
+
+
+def parse_marc21(raw: bytes) -> MarcRecord:
+    """Descompone un registro ISO 2709 completo (incluido el terminador)."""
+    if len(raw) < 25:
+        raise MarcError("registro demasiado corto")
+    leader = raw[:24].decode("ascii", errors="replace")
+    utf8 = leader[9] == "a"
+    try:
+        base = int(leader[12:17])
+    except ValueError:
+        raise MarcError("dirección base inválida en el líder")
+    directory = raw[24:base - 1]
+    if len(directory) % 12:
+        raise MarcError("directorio con longitud inválida")
+
+    rec = MarcRecord(leader)
+    for i in range(0, len(directory), 12):
+        entry = directory[i:i + 12]
+        tag = entry[:3].decode("ascii", errors="replace")
+        try:
+            length, start = int(entry[3:7]), int(entry[7:12])
+        except ValueError:
+            raise MarcError(f"entrada de directorio inválida para {tag}")
+        value = raw[base + start:base + start + length].rstrip(FIELD_TERMINATOR)
+        if tag < "010":
+            rec.control[tag] = _decode(value, utf8)
+            continue
+        text = _decode(value, utf8)
+        indicators, _, rest = text.partition(SUBFIELD_DELIMITER)
+        subfields = [(chunk[:1], chunk[1:]) for chunk in rest.split(SUBFIELD_DELIMITER) if chunk]
+        rec.add_data(tag, indicators[:2], subfields)
+    return rec
+
+
+def iter_marc21(fp: BinaryIO) -> Iterator[MarcRecord]:
+    """Registros de un archivo MARC21, uno a la vez.
+
+    Un registro corrupto se entrega como `MarcError` (en lugar de un
+    `MarcRecord`) para que el llamador lo reporte y siga con el siguiente.
+    """
+    while True:
+        head = fp.read(5)
+        if not head or head.strip(b"\x00\r\n\x1a ") == b"":
+            return
+        try:
+            length = int(head)
+        except ValueError:
+            raise MarcError(f"longitud de registro inválida: {head!r}")
+        body = fp.read(length - 5)
+        if len(body) < length - 5:
+            raise MarcError("archivo truncado")
+        try:
+            yield parse_marc21(head + body)
+        except MarcError as exc:
+            yield exc
+
+
+# ---------- MARCXML ----------
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def iter_marcxml(fp: BinaryIO) -> Iterator[MarcRecord]:
+    """Registros de un archivo MARCXML (con o sin espacio de nombres)."""
+    context = ET.iterparse(fp, events=("start", "end"))
+    root = None
+    for event, elem in context:
+        if root is None and event == "start":
+            root = elem
+        if event != "end" or _local(elem.tag) != "record":
+            continue
+        rec = MarcRecord()
+        for child in elem:
+            name = _local(child.tag)
+            if name == "leader":
+                rec.leader = child.text or ""
+            elif name == "controlfield":
+                rec.control[child.get("tag", "")] = child.text or ""
+            elif name == "datafield":
+                indicators = (child.get("ind1") or " ") + (child.get("ind2") or " ")
+                subfields = [(sf.get("code", ""), sf.text or "") for sf in child if _local(sf.tag) == "subfield"]
+                rec.add_data(child.get("tag", ""), indicators, subfields)
+        yield rec
+        # Liberar el registro ya procesado (y su referencia desde la raíz)
+        elem.clear()
+        if root is not None:
+            root.clear()
+
+
+# ---------- Mapeo a ImportRow ----------
+TRAILING_PUNCT_RE = re.compile(r"[\s/:;,.=]+$")
+YEAR_RE = re.compile(r"(\d{4})")
+
+
+def _clean(value: str) -> str:
+    """Quita la puntuación ISBD final ("Título /", "Lima :", "Autor,")."""
+    return TRAILING_PUNCT_RE.sub("", (value or "").strip())
+
+
+def _publication(rec: MarcRecord) -> Tuple[str, str, str]:
+    """(lugar, editorial, fecha) de 264 (segundo indicador 1) o, si no hay, de 260."""
+    candidates = [sf for ind, sf in rec.fields("264") if ind[1:2] == "1"] + [sf for _, sf in rec.fields("260")]
+    for subfields in candidates:
+        values = {}
+        for code, value in subfields:
+            values.setdefault(code, value)
+        if values:
+            return _clean(values.get("a", "")), _clean(values.get("b", "")), values.get("c", "")
+    return "", "", ""
+
+
+def marc_to_row(rec: MarcRecord) -> ImportRow:
+    """Mapea 020/022/050/100/245/260/264/650 a `ImportRow`; lanza `RowError`."""
+    title = _clean(rec.first("245", "a"))
+    if not title:
+        raise RowError("sin título (245 $a)")
+
+    # 020 $a puede traer calificadores: "9786071234567 (rústica)"
+    isbn = rec.first("020", "a").split(" ")[0].strip() or None
+    if isbn and not normalize_isbn(isbn):
+        raise RowError(f"ISBN inválido: {isbn}")
+    issn = rec.first("022", "a").strip() or None
+    place, publisher, date = _publication(rec)
+    year_match = YEAR_RE.search(date)
+
+    fields = {
+        "subtitle": _clean(rec.first("245", "b")),
+        "isbn": isbn,
+        "issn": issn,
+        "publish_place": place,
+        "publish_year": int(year_match.group(1)) if year_match else None,
+        "resource_type": "book",
+        "lcc_code": None,
+    }
+    # 050: la signatura de la LC se usa tal cual (normalize_lcc/split_lcc), sin heurística
+    for _, subfields in rec.fields("050"):
+        a = next((v for c, v in subfields if c == "a"), "")
+        b = next((v for c, v in subfields if c == "b"), "")
+        code = lcc_from_marc(a, b)
+        if code:
+            fields["lcc_code"] = code
+            fields["lcc_source"] = "MARC 050"
+            break
+
+    authors = [_clean(rec.first("100", "a"))] if rec.first("100", "a") else []
+    subjects = []
+    for _, subfields in rec.fields("650"):
+        parts = [_clean(v) for c, v in subfields if c in "axyz" and v.strip()]
+        term = " -- ".join(parts)
+        if term and term not in subjects:
+            subjects.append(term)
+
+    return ImportRow(title=title, fields=fields, authors=authors, subjects=subjects, publisher=publisher)
+
+
+def detect_format(head: bytes) -> str:
+    """"marcxml" si el contenido empieza con '<', si no "marc21"."""
+    return "marcxml" if head.lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"<") else "marc21"
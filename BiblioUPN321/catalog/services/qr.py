@@ -0,0 +1,97 @@
+"""
+Renderizado de códigos QR bajo demanda.
+
+El contenido del QR (`get_qr_payload()`) es determinista, así que no hace
+falta guardar un PNG por registro/ejemplar: la vista `qr_code` lo genera al
+pedirlo, responde con ETag fuerte y `Cache-Control` largo, y este módulo
+guarda en memoria del proceso los últimos bytes generados (LRU acotado por
+`CATALOG_QR_CACHE_SIZE`).
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from typing import List, Sequence, Tuple
+
+from django.conf import settings
+
+# formato -> content type de la respuesta
+FORMATS = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+
+# Parámetros de dibujo (los mismos que usaba `Item.generate_qr`). Forman
+# parte del ETag: si cambian, cambia la versión.
+BOX_SIZE = 6
+BORDER = 2
+RENDER_VERSION = "1"
+
+_lock = threading.Lock()
+_cache: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+
+
+def qr_etag(payload: str, fmt: str) -> str:
+    """ETag fuerte (entre comillas) para el QR de `payload` en `fmt`."""
+    raw = f"{RENDER_VERSION}|{fmt}|{payload}".encode("utf-8")
+    return '"%s"' % hashlib.sha1(raw).hexdigest()
+
+
+def qr_version(payload: str, fmt: str) -> str:
+    """Versión corta del contenido para el parámetro `?v=` de las URLs del QR."""
+    return qr_etag(payload, fmt).strip('"')[:12]
+
+
+def render_qr_bytes(payload: str, fmt: str = "png") -> bytes:
+    """Genera el QR sin pasar por el LRU (uso por lotes)."""
+    import qrcode
+
+    qr = qrcode.QRCode(box_size=BOX_SIZE, border=BORDER)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    buf = io.BytesIO()
+    if fmt == "svg":
+        from qrcode.image.svg import SvgPathImage
+
+        qr.make_image(image_factory=SvgPathImage).save(buf)
+    else:
+        qr.make_image(fill_color="black", back_color="white").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def render_qr(payload: str, fmt: str = "png") -> bytes:
+    """Bytes del QR de `payload`; se reutilizan desde el LRU si ya se generó."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato de QR no soportado: {fmt}")
+    key = (fmt, payload)
+    with _lock:
+        data = _cache.get(key)
+        if data is not None:
+            _cache.move_to_end(key)
+            return data
+
+    # La generación queda fuera del lock: dos peticiones simultáneas del
+    # mismo código generan dos veces, pero ninguna espera por la otra.
+    data = render_qr_bytes(payload, fmt)
+
+    size = getattr(settings, "CATALOG_QR_CACHE_SIZE", 512)
+    with _lock:
+        _cache[key] = data
+        _cache.move_to_end(key)
+        while len(_cache) > size:
+            _cache.popitem(last=False)
+    return data
+
+
+def render_many(jobs: Sequence[Tuple[int, str]], fmt: str = "png") -> List[Tuple[int, bytes]]:
+    """Renderiza [(pk, payload), ...] y devuelve [(pk, bytes), ...].
+
+    Es una función de módulo sin acceso a la BD ni a settings para poder
+    ejecutarse en un `ProcessPoolExecutor` (ver `manage.py generate_qr`).
+    """
+    return [(pk, render_qr_bytes(payload, fmt)) for pk, payload in jobs]
+
+
+def clear_cache() -> None:
+    with _lock:
+        _cache.clear()
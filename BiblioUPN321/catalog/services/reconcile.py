@@ -0,0 +1,186 @@
+"""
+Conciliación de inventario por ubicación: esperado vs. leído.
+
+Para una `InventorySession` con ubicación L:
+
+- Esperado: ejemplares de L disponibles (los prestados, en reparación o
+  perdidos no deberían estar en el estante).
+- Un ejemplar cuenta como leído si en la sesión hay un evento con ese
+  ejemplar, o un evento del QR de su registro (sin ejemplar).
+- Faltante (missing): esperado y no leído.
+- Fuera de lugar (misplaced): ejemplar leído que pertenece a otra ubicación
+  (o que no está disponible), o QR de registro leído sin ningún ejemplar
+  disponible en L.
+
+Todo se calcula con anti-joins (`Exists`/`~Exists`) en SQL y se materializa
+en `InventoryFinding` con INSERT ... SELECT, sin recorrer filas en Python.
+
+Re-ejecuciones incrementales: la sesión guarda en `reconciled_through` el
+último `InventoryEvent.id` procesado. Una nueva pasada sólo mira los eventos
+posteriores: borra los faltantes que esos eventos cubren y agrega los
+fuera de lugar nuevos. Cambios en los ejemplares de la ubicación (altas,
+traslados) requieren una pasada completa (`full=True`).
+
+Los ids no se hacen visibles en orden: con varios lectores enviando a la vez
+(PostgreSQL), un lote con ids menores puede confirmarse después de que otra
+pasada leyó un id mayor. Por eso cada pasada incremental vuelve a procesar
+también los eventos recibidos desde `CATALOG_RECONCILE_LAG` segundos antes de
+la pasada anterior. Ambos pasos son idempotentes (borrar faltantes cubiertos,
+insertar fuera de lugar que no estén ya), así que repetir eventos no cambia
+el resultado.
+"""
+import csv
+import datetime
+import io
+from typing import Dict, Iterator
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, F, IntegerField, Max, Min, OuterRef, Q, Value
+from django.utils import timezone
+
+
+class ReconcileError(Exception):
+    """La sesión no se puede conciliar (p. ej. no tiene ubicación)."""
+
+
+def _insert_select(model, columns, qs) -> int:
+    """INSERT INTO model (columns) SELECT ... de un `values_list` con el mismo orden."""
+    sql, params = qs.query.sql_with_params()
+    table = connection.ops.quote_name(model._meta.db_table)
+    cols = ", ".join(connection.ops.quote_name(c) for c in columns)
+    with connection.cursor() as cur:
+        cur.execute(f"INSERT INTO {table} ({cols}) {sql}", params)
+        return cur.rowcount
+
+
+def _finding_rows(qs, session, kind: str, record: str, item, distinct: bool = False):
+    """Proyecta `qs` a las columnas de `InventoryFinding` (todas como anotaciones, en orden)."""
+    rows = qs.annotate(
+        f_session=Value(session.pk, output_field=IntegerField()),
+        f_kind=Value(kind),
+        f_record=F(record),
+        f_item=item,
+    ).values_list("f_session", "f_kind", "f_record", "f_item")
+    # Sin order_by(): con DISTINCT el orden por defecto agregaría columnas al SELECT
+    return rows.order_by().distinct() if distinct else rows.order_by()
+
+
+FINDING_COLUMNS = ("session_id", "kind", "record_id", "item_id")
+
+
+def _covered(events, item_ref: str, record_ref: str) -> Q:
+    """El ejemplar `item_ref` (o su registro `record_ref`) fue leído por alguno de `events`.
+
+    Son dos `Exists` separados y no uno con OR: así cada subconsulta usa su
+    índice (`item_id` y `session, record, scanned_at`) en lugar de recorrer
+    los eventos por cada ejemplar.
+    """
+    return Q(Exists(events.filter(item_id=OuterRef(item_ref)))) | Q(
+        Exists(events.filter(item__isnull=True, record_id=OuterRef(record_ref)))
+    )
+
+
+def reconcile(session, full: bool = False) -> Dict[str, int]:
+    """Actualiza los hallazgos de `session`; devuelve conteos y eventos procesados."""
+    from ..models import InventoryEvent, InventoryFinding, Item
+
+    if session.location_id is None:
+        raise ReconcileError("La sesión no tiene ubicación asignada.")
+    loc = session.location_id
+    Kind = InventoryFinding.Kind
+
+    with transaction.atomic():
+        events = InventoryEvent.objects.filter(session=session)
+        # Tope fijo: los eventos que lleguen durante la pasada quedan para la siguiente
+        started = timezone.now()
+        upto = events.aggregate(m=Max("id"))["m"] or 0
+        since = 0 if full or not session.reconciled_through else session.reconciled_through
+        if since and session.reconciled_at:
+            # Eventos confirmados tarde con ids por debajo de la marca de agua
+            lag = datetime.timedelta(seconds=getattr(settings, "CATALOG_RECONCILE_LAG", 300))
+            floor = events.filter(received_at__gte=session.reconciled_at - lag).aggregate(m=Min("id"))["m"]
+            if floor is not None:
+                since = min(since, floor - 1)
+        window = events.filter(id__gt=since, id__lte=upto)
+        findings = InventoryFinding.objects.filter(session=session)
+
+        if since == 0:
+            findings.delete()
+            expected = Item.objects.filter(location_id=loc, status=Item.Status.AVAILABLE)
+            _insert_select(InventoryFinding, FINDING_COLUMNS, _finding_rows(
+                expected.exclude(_covered(window, "pk", "record_id")), session, Kind.MISSING, "record_id", F("pk"),
+            ))
+        else:
+            # Faltantes que los eventos nuevos cubren
+            findings.filter(kind=Kind.MISSING).filter(_covered(window, "item_id", "record_id")).delete()
+
+        # Fuera de lugar, a nivel ejemplar: de otra ubicación o no disponible
+        known = findings.filter(kind=Kind.MISPLACED)
+        item_events = (
+            window.filter(item__isnull=False)
+            .filter(~Q(item__location_id=loc) | ~Q(item__status=Item.Status.AVAILABLE))
+            .filter(~Exists(known.filter(item_id=OuterRef("item_id"))))
+        )
+        _insert_select(InventoryFinding, FINDING_COLUMNS, _finding_rows(
+            item_events, session, Kind.MISPLACED, "record_id", F("item_id"), distinct=True,
+        ))
+        # ... y a nivel registro (QR del registro) sin ejemplar disponible en L
+        here = Item.objects.filter(record_id=OuterRef("record_id"), location_id=loc, status=Item.Status.AVAILABLE)
+        record_events = (
+            window.filter(item__isnull=True)
+            .filter(~Exists(here))
+            .filter(~Exists(known.filter(item__isnull=True, record_id=OuterRef("record_id"))))
+        )
+        _insert_select(InventoryFinding, FINDING_COLUMNS, _finding_rows(
+            record_events, session, Kind.MISPLACED, "record_id", Value(None, output_field=IntegerField()),
+            distinct=True,
+        ))
+
+        processed = window.count()
+        session.reconciled_through = upto
+        session.reconciled_at = started
+        session.save(update_fields=["reconciled_through", "reconciled_at"])
+
+    counts = summary(session)
+    counts["events"] = processed
+    return counts
+
+
+def summary(session) -> Dict[str, int]:
+    from ..models import InventoryFinding, Item
+
+    findings = InventoryFinding.objects.filter(session=session)
+    return {
+        "expected": Item.objects.filter(location_id=session.location_id, status=Item.Status.AVAILABLE).count(),
+        "missing": findings.filter(kind=InventoryFinding.Kind.MISSING).count(),
+        "misplaced": findings.filter(kind=InventoryFinding.Kind.MISPLACED).count(),
+    }
+
+
+REPORT_COLUMNS = ("tipo", "codigo_barras", "ubicacion_actual", "estado", "inventario", "signatura", "titulo")
+
+
+def iter_report(session, chunk_size: int = 2000) -> Iterator[str]:
+    """Líneas CSV de los hallazgos, agrupados por tipo y en orden de estante."""
+    from ..models import InventoryFinding
+
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(REPORT_COLUMNS)
+    rows = (
+        InventoryFinding.objects.filter(session=session)
+        .order_by("kind", "record__shelf_key", "item__barcode")
+        .values_list(
+            "kind", "item__barcode", "item__location__code", "item__status",
+            "record__inventory_code", "record__call_number", "record__title",
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+    for n, row in enumerate(rows, start=1):
+        writer.writerow(["" if v is None else v for v in row])
+        if n % 500 == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
@@ -0,0 +1,323 @@
+"""
+Backends de búsqueda de texto completo para el catálogo.
+
+`record_list` delega la búsqueda libre (`q`) en el backend activo:
+
+- "sqlite_fts": tabla virtual FTS5 `catalog_record_fts` (rowid = id del registro).
+- "postgres": columna `search_vector` (tsvector) con índice GIN.
+- "basic": prefijos sobre las columnas normalizadas (`title_norm`,
+  `Person.full_name_norm`, `Subject.term_norm`), sin índice auxiliar.
+
+Con `CATALOG_SEARCH_BACKEND = "auto"` (por defecto) se elige según el motor
+de la base de datos. Los índices se mantienen al día mediante señales
+(ver `catalog/signals.py`) y se reconstruyen con `manage.py rebuild_search_index`.
+
+Los documentos se indexan ya normalizados con `normalize_text` (sin tildes,
+minúsculas), igual que las consultas, para que "educacion" encuentre
+"Educación" en cualquier backend.
+"""
+import re
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .lcc import normalize_text
+
+RECORD_TABLE = "catalog_bibliographicrecord"
+FTS_TABLE = "catalog_record_fts"
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Columnas del documento indexado, de mayor a menor peso
+DOCUMENT_FIELDS = ("title", "authors", "subjects", "subtitle", "identifiers")
+
+
+def query_tokens(query: str) -> List[str]:
+    """Tokens normalizados de la consulta del usuario (sin operadores)."""
+    return TOKEN_RE.findall(normalize_text(query).replace(".", " "))
+
+
+# Cota superior para convertir un prefijo en un rango [p, p + MAX_CHAR)
+_MAX_CHAR = "\U0010ffff"
+
+
+def prefix_q(field: str, value: str) -> Q:
+    """`field` empieza con `value` como rango, que sí usa un índice B-tree.
+
+    `startswith` en SQLite se traduce a `LIKE ... ESCAPE`, que no aprovecha
+    índices con la collation por defecto; las columnas `*_norm` ya están en
+    minúsculas y sin tildes, así que un rango binario es equivalente.
+    """
+    return Q(**{f"{field}__gte": value, f"{field}__lt": value + _MAX_CHAR})
+
+
+def subject_prefix_q(value: str) -> Q:
+    """Registros con alguna materia cuyo término normalizado empieza con `value`."""
+    from ..models import BibliographicRecord
+
+    through = BibliographicRecord.subjects.through
+    ids = through.objects.filter(prefix_q("subject__term_norm", value)).values("bibliographicrecord_id")
+    return Q(pk__in=ids)
+
+
+def author_prefix_q(value: str) -> Q:
+    """Registros con algún contribuidor cuyo nombre normalizado empieza con `value`."""
+    from ..models import RecordContributor
+
+    ids = RecordContributor.objects.filter(prefix_q("person__full_name_norm", value)).values("record_id")
+    return Q(pk__in=ids)
+
+
+def build_documents(record_ids: Iterable[int]) -> Dict[int, Dict[str, str]]:
+    """Arma el texto a indexar de cada registro en 3 consultas por lote."""
+    from ..models import BibliographicRecord, RecordContributor
+
+    ids = list(record_ids)
+    docs: Dict[int, Dict[str, List[str]]] = {}
+    rows = BibliographicRecord.objects.filter(pk__in=ids).values_list(
+        "id", "title", "subtitle", "isbn", "issn", "iccn", "call_number",
+    )
+    for pk, title, subtitle, isbn, issn, iccn, call_number in rows:
+        idents = [x for x in (isbn, issn, iccn, call_number) if x]
+        # Variante sólo dígitos para que "9786071234567" encuentre "978-607-12-3456-7"
+        idents += [re.sub(r"\D", "", x) for x in (isbn, issn) if x]
+        docs[pk] = {
+            "title": [title or ""],
+            "subtitle": [subtitle or ""],
+            "identifiers": idents,
+            "authors": [],
+            "subjects": [],
+        }
+
+    through = BibliographicRecord.subjects.through
+    for rec_id, term in through.objects.filter(bibliographicrecord_id__in=ids).values_list(
+        "bibliographicrecord_id", "subject__term"
+    ):
+        if rec_id in docs:
+            docs[rec_id]["subjects"].append(term)
+    for rec_id, name in RecordContributor.objects.filter(record_id__in=ids).values_list(
+        "record_id", "person__full_name"
+    ):
+        if rec_id in docs:
+            docs[rec_id]["authors"].append(name)
+
+    return {
+        pk: {k: normalize_text(" ".join(v)) for k, v in parts.items()}
+        for pk, parts in docs.items()
+    }
+
+
+class BasicSearchBackend:
+    """Búsqueda por prefijo sobre las columnas normalizadas e indexadas.
+
+    Las relaciones se filtran con subconsultas `IN`, sin joins, por lo que no
+    hace falta `distinct()`.
+    """
+
+    name = "basic"
+    ranked = False
+
+    def search(self, qs, query: str):
+        norm = normalize_text(query)
+        if not norm:
+            return qs
+        return qs.filter(
+            prefix_q("title_norm", norm) |
+            Q(isbn__startswith=query.strip()) |
+            Q(issn__startswith=query.strip()) |
+            subject_prefix_q(norm) |
+            author_prefix_q(norm)
+        )
+
+    def install(self, schema_editor):
+        pass
+
+    def uninstall(self, schema_editor):
+        pass
+
+    def index_records(self, record_ids: Iterable[int]) -> None:
+        pass
+
+    def remove_records(self, record_ids: Iterable[int]) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+class SQLiteFTSBackend(BasicSearchBackend):
+    """Tabla virtual FTS5 con ranking bm25."""
+
+    name = "sqlite_fts"
+    ranked = True
+    # Pesos bm25 en el orden de DOCUMENT_FIELDS
+    WEIGHTS = (10.0, 6.0, 5.0, 3.0, 2.0)
+
+    def install(self, schema_editor):
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"{', '.join(DOCUMENT_FIELDS)}, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+    def uninstall(self, schema_editor):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+    def _match(self, query: str) -> Optional[str]:
+        tokens = query_tokens(query)
+        # Cada token entre comillas (sin operadores FTS) y como prefijo
+        return " ".join(f'"{t}"*' for t in tokens) or None
+
+    def search(self, qs, query: str):
+        match = self._match(query)
+        if match is None:
+            return qs
+        weights = ", ".join(str(w) for w in self.WEIGHTS)
+        rank = RawSQL(
+            f"SELECT bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = {RECORD_TABLE}.id",
+            [match], output_field=FloatField(),
+        )
+        ids = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        return qs.filter(pk__in=ids).annotate(search_rank=rank).order_by("search_rank", "id")
+
+    def index_records(self, record_ids: Iterable[int]) -> None:
+        ids = list(record_ids)
+        if not ids:
+            return
+        docs = build_documents(ids)
+        # Una sola transacción: en autocommit cada INSERT haría su propio commit
+        with transaction.atomic(), connection.cursor() as cur:
+            self._delete(cur, ids)
+            cur.executemany(
+                f"INSERT INTO {FTS_TABLE}(rowid, {', '.join(DOCUMENT_FIELDS)}) "
+                f"VALUES (%s, {', '.join(['%s'] * len(DOCUMENT_FIELDS))})",
+                [[pk] + [doc[f] for f in DOCUMENT_FIELDS] for pk, doc in docs.items()],
+            )
+
+    def _delete(self, cur, ids: List[int]) -> None:
+        for i in range(0, len(ids), 900):
+            chunk = ids[i:i + 900]
+            cur.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(chunk))})", chunk
+            )
+
+    def remove_records(self, record_ids: Iterable[int]) -> None:
+        ids = list(record_ids)
+        if ids:
+            with connection.cursor() as cur:
+                self._delete(cur, ids)
+
+    def clear(self) -> None:
+        with connection.cursor() as cur:
+            cur.execute(f"DELETE FROM {FTS_TABLE}")
+
+
+class PostgresSearchBackend(BasicSearchBackend):
+    """Columna tsvector con pesos A–D e índice GIN; ranking con ts_rank."""
+
+    name = "postgres"
+    ranked = True
+    WEIGHTS = dict(zip(DOCUMENT_FIELDS, ("A", "B", "B", "C", "D")))
+
+    @property
+    def config(self) -> str:
+        return getattr(settings, "CATALOG_SEARCH_CONFIG", "simple")
+
+    def install(self, schema_editor):
+        schema_editor.execute(f"ALTER TABLE {RECORD_TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector")
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS catalog_rec_search_gin ON {RECORD_TABLE} USING GIN (search_vector)"
+        )
+
+    def uninstall(self, schema_editor):
+        schema_editor.execute("DROP INDEX IF EXISTS catalog_rec_search_gin")
+        schema_editor.execute(f"ALTER TABLE {RECORD_TABLE} DROP COLUMN IF EXISTS search_vector")
+
+    def search(self, qs, query: str):
+        tokens = query_tokens(query)
+        if not tokens:
+            return qs
+        tsquery = " & ".join(f"{t}:*" for t in tokens)
+        column = f'"{RECORD_TABLE}"."search_vector"'
+        # Negativo para que el mejor resultado quede primero en orden ascendente
+        rank = RawSQL(f"-ts_rank({column}, to_tsquery(%s::regconfig, %s))", [self.config, tsquery],
+                      output_field=FloatField())
+        return (
+            qs.extra(where=[f"{column} @@ to_tsquery(%s::regconfig, %s)"], params=[self.config, tsquery])
+            .annotate(search_rank=rank)
+            .order_by("search_rank", "id")
+        )
+
+    def index_records(self, record_ids: Iterable[int]) -> None:
+        ids = list(record_ids)
+        if not ids:
+            return
+        docs = build_documents(ids)
+        vector = " || ".join(
+            f"setweight(to_tsvector(%s::regconfig, %s), '{self.WEIGHTS[f]}')" for f in DOCUMENT_FIELDS
+        )
+        params = []
+        for pk, doc in docs.items():
+            row = []
+            for f in DOCUMENT_FIELDS:
+                row += [self.config, doc[f]]
+            params.append(row + [pk])
+        with connection.cursor() as cur:
+            cur.executemany(f"UPDATE {RECORD_TABLE} SET search_vector = {vector} WHERE id = %s", params)
+
+    def remove_records(self, record_ids: Iterable[int]) -> None:
+        # La columna vive en la fila del registro: se borra junto con él.
+        pass
+
+    def clear(self) -> None:
+        with connection.cursor() as cur:
+            cur.execute(f"UPDATE {RECORD_TABLE} SET search_vector = NULL")
+
+
+BACKENDS = {
+    BasicSearchBackend.name: BasicSearchBackend,
+    SQLiteFTSBackend.name: SQLiteFTSBackend,
+    PostgresSearchBackend.name: PostgresSearchBackend,
+}
+
+
+def backend_for_vendor(vendor: str, name: Optional[str] = None):
+    """Instancia el backend `name` (o el automático para `vendor`)."""
+    name = name or getattr(settings, "CATALOG_SEARCH_BACKEND", "auto")
+    if name == "auto":
+        name = {"sqlite": SQLiteFTSBackend.name, "postgresql": PostgresSearchBackend.name}.get(
+            vendor, BasicSearchBackend.name
+        )
+    return BACKENDS[name]()
+
+
+def get_search_backend():
+    """Backend activo para la conexión por defecto."""
+    return backend_for_vendor(connection.vendor)
+
+
+# ------------------ Sincronización diferida ------------------
+# Las señales encolan ids y se indexan al confirmar la transacción, de modo
+# que guardar un registro con sus autores y materias reindexa una sola vez.
+_pending = threading.local()
+
+
+def _flush_pending() -> None:
+    ids = getattr(_pending, "ids", None)
+    if ids:
+        _pending.ids = set()
+        get_search_backend().index_records(sorted(ids))
+
+
+def queue_reindex(record_ids: Iterable[int]) -> None:
+    """Programa la reindexación de `record_ids` al hacer commit."""
+    ids = {pk for pk in record_ids if pk}
+    if not ids:
+        return
+    if getattr(_pending, "ids", None) is None:
+        _pending.ids = set()
+    _pending.ids.update(ids)
+    transaction.on_commit(_flush_pending)
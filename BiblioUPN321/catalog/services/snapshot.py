@@ -0,0 +1,222 @@
+"""
+Instantáneas completas del catálogo para montar copias (staging, pruebas).
+
+Formato (versión `SNAPSHOT_VERSION`), un directorio con:
+
+- `manifest.json`: versión, fecha y, por modelo, archivo, columnas y filas.
+- `<app>.<modelo>.jsonl.gz`: una lista JSON por fila con los valores de
+  las columnas (`attname`, p. ej. `publisher_id`) en el orden del manifiesto.
+
+Los modelos se escriben en orden de dependencias (FK) y se restauran en ese
+mismo orden con `bulk_create`. A diferencia de `loaddata`, no se llama a
+`save()` ni se disparan señales: los campos derivados (LCC, signatura,
+clave de estantería, columnas normalizadas) y las rutas de QR ya vienen
+calculados en la instantánea, y `created_at`/`updated_at` se conservan.
+Los archivos de `media/` (portadas, QR) no se incluyen.
+"""
+import datetime
+import decimal
+import gzip
+import json
+import os
+from contextlib import contextmanager
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional
+
+from django.core.management.color import no_style
+from django.db import connection, models, transaction
+
+from .search import get_search_backend
+
+SNAPSHOT_VERSION = 1
+MANIFEST = "manifest.json"
+
+
+def snapshot_models() -> List:
+    """Modelos incluidos, en orden de dependencias (padres antes que hijos).
+
+    `QRJob` (cola transitoria) y las sesiones de inventario no se copian
+    (ver `operational_models()`).
+    """
+    from ..models import (
+        BibliographicRecord, Book, Item, Location, Person, Publisher, RecordContributor, Subject,
+    )
+
+    return [
+        Publisher, Subject, Location, Person, BibliographicRecord,
+        BibliographicRecord.subjects.through, RecordContributor, Item, Book,
+    ]
+
+
+def _label(model) -> str:
+    return model._meta.label_lower
+
+
+def _columns(model) -> List[str]:
+    return [f.attname for f in model._meta.concrete_fields]
+
+
+def _encode(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+# ---------- Volcado ----------
+def dump(directory: str, chunk_size: int = 5000, progress: Optional[Callable[[str, int], None]] = None) -> Dict:
+    """Escribe la instantánea en `directory` y devuelve el manifiesto.
+
+    Lee cada tabla con `values_list(...).iterator()` (sin instanciar
+    modelos) dentro de una transacción para obtener una vista consistente.
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "vendor": connection.vendor,
+        "models": [],
+    }
+    with transaction.atomic():
+        for model in snapshot_models():
+            columns = _columns(model)
+            filename = f"{_label(model)}.jsonl.gz"
+            count = 0
+            # compresslevel bajo: el cuello de botella es la CPU, no el disco
+            with gzip.open(os.path.join(directory, filename), "wt", encoding="utf-8", compresslevel=3) as fh:
+                rows = model._base_manager.order_by("pk").values_list(*columns).iterator(chunk_size=chunk_size)
+                for row in rows:
+                    fh.write(json.dumps([_encode(v) for v in row], ensure_ascii=False, separators=(",", ":")))
+                    fh.write("\n")
+                    count += 1
+            manifest["models"].append({"model": _label(model), "file": filename, "columns": columns, "rows": count})
+            if progress:
+                progress(_label(model), count)
+
+    with open(os.path.join(directory, MANIFEST), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2)
+    return manifest
+
+
+# ---------- Restauración ----------
+class SnapshotError(Exception):
+    """Instantánea ilegible o incompatible con el esquema actual."""
+
+
+def read_manifest(directory: str) -> Dict:
+    try:
+        with open(os.path.join(directory, MANIFEST), encoding="utf-8") as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError) as exc:
+        raise SnapshotError(f"No se pudo leer {MANIFEST}: {exc}")
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Versión de instantánea no soportada: {manifest.get('version')}")
+
+    by_label = {_label(m): m for m in snapshot_models()}
+    for entry in manifest["models"]:
+        model = by_label.get(entry["model"])
+        if model is None:
+            raise SnapshotError(f"Modelo desconocido en la instantánea: {entry['model']}")
+        missing = set(entry["columns"]) - set(_columns(model))
+        if missing:
+            raise SnapshotError(f"{entry['model']}: columnas inexistentes {sorted(missing)} (¿migraciones pendientes?)")
+    return manifest
+
+
+@contextmanager
+def _keep_timestamps(model):
+    """Desactiva `auto_now`/`auto_now_add` para que `bulk_create` no pise las fechas."""
+    saved = []
+    for f in model._meta.concrete_fields:
+        if isinstance(f, models.DateField) and (f.auto_now or f.auto_now_add):
+            saved.append((f, f.auto_now, f.auto_now_add))
+            f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def _iter_rows(path: str) -> Iterator[list]:
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        for line in fh:
+            yield json.loads(line)
+
+
+def _decoders(model, columns: List[str]):
+    """Conversores de JSON al tipo Python de cada columna (fechas, decimales)."""
+    fields = {f.attname: f for f in model._meta.concrete_fields}
+    out = []
+    for name in columns:
+        f = fields[name]
+        if isinstance(f, (models.DateField, models.TimeField, models.DecimalField)):
+            out.append(f.to_python)
+        else:
+            out.append(None)
+    return out
+
+
+def operational_models() -> List:
+    """Tablas que no se copian pero dependen del catálogo; se vacían al restaurar."""
+    from ..models import InventoryEvent, InventoryFinding, InventorySession, QRJob
+
+    return [InventoryFinding, InventoryEvent, InventorySession, QRJob]
+
+
+def flush() -> None:
+    """Vacía las tablas en orden inverso de dependencias, sin señales ni cascadas en Python.
+
+    También vacía el índice de búsqueda: los ids restaurados se reutilizan y
+    la tabla FTS (indexada por rowid) devolvería el texto anterior.
+    """
+    with connection.cursor() as cur:
+        for model in operational_models() + list(reversed(snapshot_models())):
+            cur.execute(f"DELETE FROM {connection.ops.quote_name(model._meta.db_table)}")
+    get_search_backend().clear()
+
+
+def restore(directory: str, batch_size: int = 2000, replace: bool = False,
+            progress: Optional[Callable[[str, int], None]] = None) -> Dict:
+    """Carga la instantánea con `bulk_create` en una sola transacción.
+
+    Las tablas deben estar vacías, o se vacían antes con `replace=True`
+    (dentro de la misma transacción: si algo falla no se pierde nada). Al
+    final se reajustan las secuencias de pk (PostgreSQL) para que las altas
+    posteriores no choquen.
+    """
+    manifest = read_manifest(directory)
+    by_label = {_label(m): m for m in snapshot_models()}
+    restored = []
+    with transaction.atomic():
+        if replace:
+            flush()
+        for entry in manifest["models"]:
+            model = by_label[entry["model"]]
+            columns = entry["columns"]
+            decoders = _decoders(model, columns)
+            rows = _iter_rows(os.path.join(directory, entry["file"]))
+            count = 0
+            with _keep_timestamps(model):
+                while True:
+                    chunk = list(islice(rows, batch_size))
+                    if not chunk:
+                        break
+                    objs = []
+                    for row in chunk:
+                        values = {
+                            name: (dec(v) if dec is not None and v is not None else v)
+                            for name, dec, v in zip(columns, decoders, row)
+                        }
+                        objs.append(model(**values))
+                    model._base_manager.bulk_create(objs, batch_size=batch_size)
+                    count += len(objs)
+            restored.append(model)
+            if progress:
+                progress(entry["model"], count)
+
+        with connection.cursor() as cur:
+            for sql in connection.ops.sequence_reset_sql(no_style(), restored):
+                cur.execute(sql)
+    return manifest
@@ -1,7 +1,10 @@
 # catalog/signals.py
-from django.db.models.signals import pre_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from .models import Book
+from .models import BibliographicRecord, Book, Item, Person, Publisher, RecordContributor, Subject
+from .services import codes
+from .services.facets import invalidate_facets
+from .services.search import get_search_backend, queue_reindex
 from .utils.classmarks import generate_call_lcc, normalize_word
 
 def _next_collision_suffix(existing_codes: set[str], base: str) -> str:
@@ -49,3 +52,82 @@ def autogenerate_classmarks(sender, instance: "Book", **kwargs):
     instance.cutter1 = instance.cutter1 or c1
     instance.cutter2 = instance.cutter2 or c2
     instance.call_lcc = instance.call_lcc or call
+
+
+# ---- Índice de búsqueda (ver services/search.py) ----
+@receiver(post_save, sender=BibliographicRecord)
+def reindex_record(sender, instance, update_fields=None, **kwargs):
+    # Guardar sólo el QR no cambia el texto indexado
+    if update_fields and set(update_fields) <= {"qr_image"}:
+        return
+    queue_reindex([instance.pk])
+
+@receiver(post_delete, sender=BibliographicRecord)
+def unindex_record(sender, instance, **kwargs):
+    get_search_backend().remove_records([instance.pk])
+
+@receiver(post_save, sender=RecordContributor)
+@receiver(post_delete, sender=RecordContributor)
+def reindex_contributor_record(sender, instance, **kwargs):
+    queue_reindex([instance.record_id])
+
+@receiver(m2m_changed, sender=BibliographicRecord.subjects.through)
+def reindex_subject_links(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == "pre_clear":
+        # subject.bibliographicrecord_set.clear() no informa pk_set: lo capturamos antes
+        instance._cleared_record_ids = list(instance.bibliographicrecord_set.values_list("id", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        queue_reindex([instance.pk])
+    elif action == "post_clear":
+        queue_reindex(getattr(instance, "_cleared_record_ids", []))
+    elif pk_set:
+        queue_reindex(pk_set)
+
+@receiver(post_save, sender=Person)
+def reindex_person_records(sender, instance, created, **kwargs):
+    if not created:
+        queue_reindex(instance.recordcontributor_set.values_list("record_id", flat=True))
+
+@receiver(post_save, sender=Subject)
+def reindex_subject_records(sender, instance, created, **kwargs):
+    if not created:
+        queue_reindex(instance.bibliographicrecord_set.values_list("id", flat=True))
+
+@receiver(pre_delete, sender=Subject)
+def remember_subject_records(sender, instance, **kwargs):
+    instance._cleared_record_ids = list(instance.bibliographicrecord_set.values_list("id", flat=True))
+
+@receiver(post_delete, sender=Subject)
+def reindex_deleted_subject_records(sender, instance, **kwargs):
+    queue_reindex(getattr(instance, "_cleared_record_ids", []))
+
+
+# ---- Caché de facetas sin filtros (ver services/facets.py) ----
+@receiver(post_save, sender=BibliographicRecord)
+@receiver(post_delete, sender=BibliographicRecord)
+@receiver(post_save, sender=Publisher)
+@receiver(post_delete, sender=Publisher)
+def invalidate_catalog_facets(sender, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {"qr_image"}:
+        return
+    invalidate_facets()
+
+
+# ---- Caché de códigos leídos (ver services/codes.py) ----
+@receiver(post_save, sender=BibliographicRecord)
+@receiver(post_delete, sender=BibliographicRecord)
+def invalidate_record_codes(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {"qr_image"}:
+        return
+    codes.invalidate_record(instance.pk)
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def invalidate_item_codes(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {"qr_image"}:
+        return
+    codes.invalidate_item(instance.pk)
@@ -0,0 +1,40 @@
+"""
+Respuestas en streaming que funcionan igual bajo WSGI y ASGI.
+
+Las descargas grandes (exportación, reporte de conciliación) se generan con
+iteradores síncronos que recorren el ORM por tramos. Bajo ASGI, Django 5.x
+consume un iterador síncrono con `sync_to_async(list)`: arma la respuesta
+entera en memoria antes de enviar el primer byte. `streaming_response()`
+entrega en ese caso un iterador asíncrono que pide cada tramo al iterador
+síncrono en el hilo de la petición, así que la memoria queda acotada en los
+dos caminos.
+"""
+from typing import AsyncIterator, Iterable, Iterator
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+_DONE = object()
+
+
+async def aiter_chunks(chunks: Iterable) -> AsyncIterator:
+    """Recorre `chunks` de a un elemento con `sync_to_async`.
+
+    `thread_sensitive=True` mantiene todas las llamadas en el mismo hilo, y
+    con él la misma conexión a la BD que usa el cursor de `.iterator()`.
+    """
+    iterator: Iterator = iter(chunks)
+    step = sync_to_async(next, thread_sensitive=True)
+    while True:
+        chunk = await step(iterator, _DONE)
+        if chunk is _DONE:
+            return
+        yield chunk
+
+
+def streaming_response(request, chunks: Iterable, content_type: str) -> StreamingHttpResponse:
+    """`StreamingHttpResponse` con `chunks` como iterador síncrono o asíncrono según el servidor."""
+    if isinstance(request, ASGIRequest):
+        chunks = aiter_chunks(chunks)
+    return StreamingHttpResponse(chunks, content_type=content_type)
@@ -1,3 +1,458 @@
-from django.test import TestCase
+import random
+import warnings
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.db import DatabaseError
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from .models import (
+    BibliographicRecord, InventoryEvent, InventoryFinding, InventorySession, Item, Location, Person, Publisher,
+    RecordContributor, Subject,
+)
+from .pagination import decode_cursor, encode_cursor
+from .services import codes
+from .services.importer import BulkImporter, RowError, parse_csv_row
+from .services.inventory import record_scans
+from .services import lcc
+from .services.lcc import build_sort_key, normalize_isbn, sort_key_for_call_number
+from .services.marc import MarcRecord, marc_to_row
+from .services.reconcile import reconcile
+from .services.search import get_search_backend
+from .services.snapshot import flush
+from .streaming import aiter_chunks
+
+
+def _csv_rows(n, publisher="Editorial Nueva XYZ"):
+    return [
+        parse_csv_row({
+            "title": f"Libro de prueba {i}", "publish_year": "2020", "publisher": publisher,
+            "authors": f"Autor {i}; Autor común", "subjects": "Educación; Matemáticas",
+        })
+        for i in range(n)
+    ]
+
+
+class BulkImporterRetryTests(TestCase):
+    """Un lote que falla en la BD se reintenta fila por fila sin ids huérfanos en las cachés."""
+
+    def _fail_once(self):
+        original = RecordContributor.objects.bulk_create
+        calls = {"n": 0}
+
+        def flaky(*args, **kwargs):
+            calls["n"] += 1
+            if calls["n"] == 1:
+                raise DatabaseError("fallo transitorio")
+            return original(*args, **kwargs)
+
+        return mock.patch.object(RecordContributor.objects, "bulk_create", side_effect=flaky)
+
+    def test_retry_after_failed_batch(self):
+        importer = BulkImporter(batch_size=100)
+        rejects = []
+        importer.on_reject = lambda row, reason: rejects.append(reason)
+        with self._fail_once():
+            ids = importer.write_batch(_csv_rows(3))
+
+        self.assertEqual(rejects, [])
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(BibliographicRecord.objects.count(), 3)
+        publisher = Publisher.objects.get(name="Editorial Nueva XYZ")
+        self.assertEqual(importer.publishers["Editorial Nueva XYZ"], publisher.pk)
+        self.assertEqual(set(BibliographicRecord.objects.values_list("publisher_id", flat=True)), {publisher.pk})
+        self.assertEqual(RecordContributor.objects.count(), 6)
+        for name, pk in importer.persons.items():
+            self.assertTrue(Person.objects.filter(pk=pk, full_name=name).exists())
+        for term, pk in importer.subjects.items():
+            self.assertTrue(Subject.objects.filter(pk=pk, term=term).exists())
+
+    def test_later_batch_after_rejected_batch(self):
+        importer = BulkImporter(batch_size=100)
+        with mock.patch.object(RecordContributor.objects, "bulk_create", side_effect=DatabaseError("fallo")):
+            self.assertEqual(importer.write_batch(_csv_rows(3)), [])
+        self.assertEqual(importer.stats["errors"], 3)
+        self.assertEqual(importer.publishers, {})
+        self.assertFalse(Publisher.objects.exists())
+
+        # Mismas entidades en el lote siguiente: se crean de nuevo, no se reusan ids revertidos
+        ids = importer.write_batch(_csv_rows(3))
+        self.assertEqual(len(ids), 3)
+        publisher = Publisher.objects.get(name="Editorial Nueva XYZ")
+        self.assertEqual(set(BibliographicRecord.objects.values_list("publisher_id", flat=True)), {publisher.pk})
+
+
+class IsbnTests(TestCase):
+    """Una X fuera del dígito de control se rechaza, no rompe el lote."""
+
+    BAD = ("X123456789", "84-X06-1234-5", "978X123456789")
+
+    def test_normalize_isbn(self):
+        self.assertEqual(normalize_isbn("84-206-1234-X"), "9788420612348")
+        self.assertEqual(normalize_isbn("978-84-206-1234-8"), "9788420612348")
+        for isbn in self.BAD:
+            self.assertEqual(normalize_isbn(isbn), "", isbn)
+
+    def test_parsers_reject(self):
+        for isbn in self.BAD:
+            with self.assertRaisesMessage(RowError, "ISBN inválido"):
+                parse_csv_row({"title": "Libro", "isbn": isbn})
+            rec = MarcRecord()
+            rec.add_data("245", "10", [("a", "Libro")])
+            rec.add_data("020", "  ", [("a", isbn)])
+            with self.assertRaisesMessage(RowError, "ISBN inválido"):
+                marc_to_row(rec)
+
+    def test_save_with_bad_isbn(self):
+        record = BibliographicRecord.objects.create(title="Libro", isbn="X123456789")
+        self.assertEqual(record.ident_key, "")
+
+
+class RecordScansTests(TestCase):
+    """Reenviar un lote (respuesta perdida) nunca agrega eventos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user("lector")
+        cls.session = InventorySession.objects.create(name="Estante 1", started_by=user)
+        record = BibliographicRecord.objects.create(title="Registro de prueba")
+        location = Location.objects.create(code="E1", name="Estante 1")
+        Item.objects.bulk_create([Item(record=record, barcode=f"B{i}", location=location) for i in range(2)])
+
+    def setUp(self):
+        codes.clear_cache()
+
+    def test_resend_with_repeated_code(self):
+        t1, t2 = 1_700_000_000_000, 1_700_000_001_000
+        batch = [("B0", t1, "k-1"), ("B0", t2, "k-2"), ("B1", t2, "k-3")]
+        first = record_scans(self.session, batch)
+        self.assertEqual(first["accepted"], 3)
+        self.assertEqual(InventoryEvent.objects.count(), 3)
+
+        again = record_scans(self.session, batch)
+        self.assertEqual((again["accepted"], again["duplicates"]), (0, 3))
+        self.assertEqual(InventoryEvent.objects.count(), 3)
+
+    def test_same_key_in_batch_and_unkeyed_repeats(self):
+        now = timezone.now().isoformat()
+        result = record_scans(self.session, [
+            ("B0", now, "k-1"), ("B0", now, "k-1"), ("B1", now, None), ("B1", now, None), ("nada", now, None),
+        ])
+        self.assertEqual((result["accepted"], result["duplicates"]), (2, 1))
+        self.assertEqual(result["unknown"], ["nada"])
+        self.assertEqual(InventoryEvent.objects.filter(client_key__isnull=True).count(), 1)
+
+
+class ReconcileTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("inventario")
+        location = Location.objects.create(code="E3", name="Estante 3")
+        cls.session = InventorySession.objects.create(name="Estante 3", location=location, started_by=cls.user)
+        record = BibliographicRecord.objects.create(title="Por conciliar")
+        cls.items = Item.objects.bulk_create([Item(record=record, barcode=f"C{i}", location=location) for i in range(2)])
+
+    def _scan(self, item):
+        return InventoryEvent.objects.create(
+            session=self.session, record_id=item.record_id, item=item, scanned_at=timezone.now(),
+        )
+
+    def _missing(self):
+        return set(InventoryFinding.objects.filter(session=self.session, kind=InventoryFinding.Kind.MISSING)
+                   .values_list("item_id", flat=True))
+
+    def test_late_commit_below_watermark_is_picked_up(self):
+        late = self._scan(self.items[0])
+        reconcile(self.session, full=True)
+        self.assertEqual(self._missing(), {self.items[1].pk})
+
+        # Otro lote con id mayor se confirmó antes: la marca de agua ya pasó `late`
+        InventoryFinding.objects.create(
+            session=self.session, kind=InventoryFinding.Kind.MISSING, record_id=late.record_id, item=late.item,
+        )
+        self.session.refresh_from_db()
+        self.session.reconciled_through = late.pk + 10
+        self.session.save(update_fields=["reconciled_through"])
+
+        counts = reconcile(self.session)
+        self.assertEqual(self._missing(), {self.items[1].pk})
+        self.assertEqual(counts["missing"], 1)
+
+    def test_get_is_read_only(self):
+        self.user.user_permissions.add(Permission.objects.get(codename="add_inventoryevent"))
+        self.client.force_login(self.user)
+        url = f"/catalog/inventory/{self.session.pk}/reconcile/"
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Inventory-Missing"], "0")
+        self.session.refresh_from_db()
+        self.assertIsNone(self.session.reconciled_at)
+
+        self._scan(self.items[0])
+        response = self.client.post(url, {"full": "1"})
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.session.refresh_from_db()
+        self.assertIsNotNone(self.session.reconciled_at)
+        self.assertEqual(self.client.get(url)["X-Inventory-Missing"], "1")
+
+
+class KeywordMatcherTests(SimpleTestCase):
+    """El autómata da la misma clase que recorrer las keywords en orden."""
+
+    @staticmethod
+    def naive(text):
+        for kw, cls in lcc.NORMALIZED_KEYWORDS.items():
+            if kw in text:
+                return cls
+        words = set(text.split())
+        for kw, cls in lcc.NORMALIZED_KEYWORDS.items():
+            tokens = {w for w in kw.split() if w not in lcc._STOPWORDS}
+            if tokens and len(tokens & words) >= max(1, len(tokens) - 1):
+                return cls
+        return None
+
+    def test_matches_naive_scan(self):
+        vocab = sorted({w for kw in lcc.NORMALIZED_KEYWORDS for w in kw.split()}) + ["libro", "nacional", "xyz"]
+        rnd = random.Random(321)
+        texts = ["", "sin coincidencias", "metodologia de la investigacion", "investigacion metodologia"]
+        texts += [" ".join(rnd.choice(vocab) for _ in range(rnd.randint(1, 6))) for _ in range(500)]
+        texts += ["".join(rnd.sample(kw, len(kw))) for kw in list(lcc.NORMALIZED_KEYWORDS)[:50]]
+        for text in texts:
+            self.assertEqual(lcc._match_keyword_class(text), self.naive(text), text)
+
+    def test_subjects_fallback(self):
+        self.assertEqual(lcc._class_letters_from_subjects("Pedagogía; Didáctica"), "LB")
+        self.assertEqual(lcc._class_letters_from_subjects(None), "Z")
+
+
+class CodeResolveTests(TestCase):
+    """`parse_code` / `resolve_many` y la caché de códigos leídos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.record = BibliographicRecord.objects.create(title="Registro con QR")
+        cls.location = Location.objects.create(code="E4", name="Estante 4")
+        cls.item = Item.objects.create(record=cls.record, barcode="X1", location=cls.location)
+
+    def setUp(self):
+        codes.clear_cache()
+
+    def test_parse_code(self):
+        self.assertEqual(codes.parse_code(" /catalog/record/7/?inv=UPN-AB12 "), (codes.RECORD, "UPN-AB12"))
+        self.assertEqual(codes.parse_code("barcode:X1|record:7|title:T"), (codes.ITEM, "X1"))
+        self.assertEqual(codes.parse_code(" X1 "), (codes.ANY, "X1"))
+        self.assertEqual(codes.parse_code(None), (codes.ANY, ""))
+
+    def test_resolve_many_and_cache(self):
+        rec, item = self.record, self.item
+        scanned = [rec.get_qr_payload(), item.get_qr_payload(), "X1", rec.inventory_code, "nada"]
+        expected = {
+            rec.get_qr_payload(): (rec.pk, None, rec.title),
+            item.get_qr_payload(): (rec.pk, item.pk, rec.title),
+            "X1": (rec.pk, item.pk, rec.title),
+            rec.inventory_code: (rec.pk, None, rec.title),
+        }
+        self.assertEqual(codes.resolve_many(scanned), expected)
+        with self.assertNumQueries(0):
+            self.assertEqual(codes.resolve_many(scanned[:4]), expected)
+        self.assertIsNone(codes.resolve("nada"))
+
+    def test_record_wins_plain_collision(self):
+        other = BibliographicRecord.objects.create(title="Otro", inventory_code="X1")
+        self.assertEqual(codes.resolve("X1"), (other.pk, None, "Otro"))
+
+    def test_invalidation_on_save_and_delete(self):
+        self.assertIsNotNone(codes.resolve("X1"))
+        self.item.barcode = "X2"
+        self.item.save()
+        self.assertIsNone(codes.resolve("X1"))
+        self.assertEqual(codes.resolve("X2")[1], self.item.pk)
+
+        self.record.title = "Título nuevo"
+        self.record.save()
+        self.assertEqual(codes.resolve("X2")[2], "Título nuevo")
+
+        self.item.delete()
+        self.assertIsNone(codes.resolve("X2"))
+
+
+class SnapshotFlushTests(TestCase):
+    def test_flush_clears_search_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            old = BibliographicRecord.objects.create(title="Texto anterior")
+        backend = get_search_backend()
+        self.assertEqual(list(backend.search(BibliographicRecord.objects.all(), "anterior")), [old])
+
+        flush()
+        # Mismo id que la instantánea restaurada, sin reindexar (--no-index)
+        BibliographicRecord.objects.bulk_create([BibliographicRecord(pk=old.pk, title="Texto nuevo")])
+        self.assertFalse(backend.search(BibliographicRecord.objects.all(), "anterior").exists())
+
+
+class ShelfKeyTests(SimpleTestCase):
+    """Orden de estantería de `build_sort_key` / `sort_key_for_call_number`."""
+
+    def assertShelfOrder(self, call_numbers):
+        shuffled = list(reversed(call_numbers))
+        self.assertEqual(sorted(shuffled, key=sort_key_for_call_number), call_numbers)
+
+    def test_class_prefix_sorts_first(self):
+        self.assertShelfOrder(["Q180", "QA1", "QA76.73", "QB5", "R1"])
+
+    def test_number_integer_and_decimal(self):
+        self.assertShelfOrder(["QA9", "QA76", "QA76.5", "QA76.73", "QA761"])
+
+    def test_missing_cutter_sorts_before_cutters(self):
+        self.assertShelfOrder(["QA76.73", "QA76.73 .A12", "QA76.73 .P98", "QA76.73 .P98 2023"])
+
+    def test_cutters_compare_as_decimals(self):
+        self.assertShelfOrder(["QA76.73 .P12", "QA76.73 .P9", "QA76.73 .P98", "QA76.73 .P98 .D45"])
+
+    def test_partial_call_number_precedes_full(self):
+        partial = sort_key_for_call_number("QA76.73")
+        full, _ = build_sort_key("QA", "76.73", "A12", "", "2020")
+        self.assertLess(partial, full)
+        self.assertLess(sort_key_for_call_number("QA"), sort_key_for_call_number("QA1"))
+
+
+class CursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        token = encode_cursor(["QA |0076|730000", 42])
+        self.assertEqual(decode_cursor(token, (str, int)), ["QA |0076|730000", 42])
+        self.assertEqual(decode_cursor(encode_cursor([-3.5, 7]), (float, int)), [-3.5, 7])
+
+    def test_invalid_tokens(self):
+        for token in ("", None, "%%%", "bm90IGpzb24", encode_cursor({"a": 1}), encode_cursor(["x"])):
+            self.assertIsNone(decode_cursor(token, (str, int)), token)
+
+    def test_wrong_types(self):
+        for values in (["x", "abc"], [1, 2], ["x", 1.5], ["x", True], ["x", None]):
+            self.assertIsNone(decode_cursor(encode_cursor(values), (str, int)), values)
+
+
+class ShelfBrowseTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for code in ("QA 76.73 A12", "QA 76.73 P98", "QA 76.5", "QA 77"):
+            BibliographicRecord.objects.create(title=f"Libro {code}", lcc_code=code)
+
+    def test_partial_call_number_opens_before_target(self):
+        response = self.client.get("/catalog/api/shelf/", {"call": "QA76.73", "n": 2})
+        data = response.json()
+        self.assertEqual([r["call_number"] for r in data["before"]], ["QA76.5"])
+        self.assertEqual([r["call_number"] for r in data["after"]], ["QA76.73 .A12", "QA76.73 .P98"])
+
+    def test_tampered_cursor_is_ignored(self):
+        bad = encode_cursor(["x", "abc"])
+        self.assertEqual(self.client.get("/catalog/api/shelf/", {"at": bad}).status_code, 200)
+        self.assertEqual(self.client.get("/catalog/", {"after": bad}).status_code, 200)
+        self.assertEqual(self.client.get("/catalog/", {"before": bad}).status_code, 200)
+
+
+class StreamingTests(TestCase):
+    """Bajo ASGI las descargas se envían por tramos, sin armarlas en memoria."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = get_user_model().objects.create_user("staff", is_staff=True)
+        for i in range(3):
+            BibliographicRecord.objects.create(title=f"Exportable {i}")
+
+    async def test_aiter_chunks_is_lazy(self):
+        pulled = []
+
+        def chunks():
+            for i in range(3):
+                pulled.append(i)
+                yield i
+
+        iterator = aiter_chunks(chunks())
+        self.assertEqual(await anext(iterator), 0)
+        self.assertEqual(pulled, [0])
+        self.assertEqual([i async for i in iterator], [1, 2])
+
+    async def test_export_under_asgi_streams(self):
+        await self.async_client.aforce_login(self.staff)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            response = await self.async_client.get("/catalog/export/", {"format": "jsonl"})
+            self.assertTrue(response.is_async)
+            body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertFalse([w for w in caught if "synchronous iterators" in str(w.message)])
+        self.assertEqual(len(body.splitlines()), 3)
+
+
+class LccFacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for code in ("Q 180", "Q 181", "QA 76", "QB 5"):
+            BibliographicRecord.objects.create(title=f"Libro {code}", lcc_code=code)
+
+    def test_facet_link_matches_count(self):
+        response = self.client.get("/catalog/")
+        counts = {value: n for value, _, n in response.context["facets"]["lcc_class"]}
+        self.assertEqual(counts, {"Q": 2, "QA": 1, "QB": 1})
+        for value, n in counts.items():
+            page = self.client.get("/catalog/", {"lcc_class": value})
+            self.assertEqual(len(page.context["records"]), n, value)
+
+    def test_lcc_box_is_prefix(self):
+        self.assertEqual(len(self.client.get("/catalog/", {"lcc": "q"}).context["records"]), 4)
+
+    @override_settings(CATALOG_LIST_PAGINATION="pages")
+    def test_page_links_keep_facets(self):
+        for i in range(25):
+            BibliographicRecord.objects.create(title=f"Más Q {i}", lcc_code=f"Q {200 + i}")
+        page = self.client.get("/catalog/", {"lcc_class": "Q", "page": 1})
+        self.assertContains(page, 'href="?lcc_class=Q&amp;page=2"')
+        second = self.client.get("/catalog/", {"lcc_class": "Q", "page": 2})
+        self.assertEqual(len(second.context["records"]), 7)
+
+    def test_publisher_delete_clears_facets(self):
+        publisher = Publisher.objects.create(name="Editorial efímera")
+        BibliographicRecord.objects.filter(lcc_class="Q").update(publisher=publisher)
+        cache.clear()
+        names = lambda: [label for _, label, _ in self.client.get("/catalog/").context["facets"]["publisher"]]
+        self.assertEqual(names(), ["Editorial efímera"])
+        publisher.delete()
+        self.assertEqual(names(), [])
+
+
+class QrUrlTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.record = BibliographicRecord.objects.create(title="Con ejemplares raros")
+        location = Location.objects.create(code="E2", name="Estante 2")
+        cls.odd = Item.objects.create(record=cls.record, barcode="UPN/2024?#1", location=location)
+        cls.empty = Item(record=cls.record, barcode="", location=location)
+
+    def test_code_with_slash_and_reserved_chars(self):
+        url = self.odd.get_qr_url("svg")
+        self.assertTrue(url.split("?")[0].endswith(".svg"))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"<svg", response.content)
+
+    def test_item_url_versioned_by_title(self):
+        url = self.odd.get_qr_url()
+        self.assertIn("max-age=2592000", self.client.get(url)["Cache-Control"])
+        self.assertIn("max-age=300", self.client.get(url.split("?")[0])["Cache-Control"])
+
+        self.record.title = "Título corregido"
+        self.record.save()
+        item = Item.objects.select_related("record").get(pk=self.odd.pk)
+        self.assertNotEqual(item.get_qr_url(), url)
+        # La URL vieja ya no se cachea por un mes
+        self.assertIn("max-age=300", self.client.get(url)["Cache-Control"])
+
+    def test_empty_code_has_no_url(self):
+        self.assertEqual(self.empty.get_qr_url(), "")
+
+    def test_record_detail_renders(self):
+        response = self.client.get(self.record.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.odd.get_qr_url())
@@ -1,5 +1,5 @@
-from django.urls import path
-from . import views
+from django.urls import path, re_path
+from . import views, views_inventory
 
 # Espacio de nombres para las URLs de la app `catalog`.
 app_name = "catalog"
@@ -8,9 +8,25 @@ app_name = "catalog"
 # - list: lista y filtros
 # - detail: detalle de registro
 # - new/edit: creación y edición (restringidas en vistas por permisos)
+# - shelf: navegación por estante alrededor de una signatura (HTML y JSON)
+# - suggest: autocompletado por prefijo de título, autor o materia (asíncrona)
+# - qr: imagen QR generada bajo demanda (record/<inventory_code> o item/<barcode>;
+#   el código puede contener '/')
+# - export: descarga del catálogo en CSV/JSONL/MARCXML (sólo staff)
+# - inventory: lector de QR para inventario, API de lecturas por lotes y conciliación
+#   (las APIs de lecturas y de consulta de códigos son vistas asíncronas)
 urlpatterns = [
     path("", views.record_list, name="record_list"),
     path("<int:pk>/", views.record_detail, name="record_detail"),
     path("new/", views.record_create, name="record_create"),
     path("<int:pk>/edit/", views.record_update, name="record_update"),
-]
\ No newline at end of file
+    path("shelf/", views.shelf_browse, name="shelf_browse"),
+    path("api/shelf/", views.shelf_browse_api, name="shelf_browse_api"),
+    path("api/suggest/", views.suggest, name="suggest"),
+    re_path(r"^qr/(?P<kind>record|item)/(?P<code>.+)\.(?P<fmt>png|svg)$", views.qr_code, name="qr_code"),
+    path("export/", views.export_records, name="export_records"),
+    path("inventory/scan/", views_inventory.scan_page, name="inventory_scan"),
+    path("api/inventory/scans/", views_inventory.scan_batch, name="inventory_scan_batch"),
+    path("api/codes/", views_inventory.code_lookup, name="code_lookup"),
+    path("inventory/<int:pk>/reconcile/", views_inventory.reconcile_report, name="inventory_reconcile"),
+]
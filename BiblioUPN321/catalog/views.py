@@ -1,52 +1,130 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse
+from django.urls import reverse
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_safe
 from django.contrib.auth.decorators import login_required, permission_required
-from .models import BibliographicRecord, Item
+from .models import BibliographicRecord, Item, Person, Subject
 from .forms import BibliographicRecordForm
 from .permissions import cataloger_required
+from .pagination import cached_count, decode_cursor, keyset_page, row_cursor, seek_filter
+from .services.lcc import sort_key_for_call_number
+from .services.lcc import normalize_text
+from .services.export import FORMATS as EXPORT_FORMATS, export_stream
+from .services.facets import compute_facets
+from .services.qr import FORMATS as QR_FORMATS, qr_etag, qr_version, render_qr
+from .services.search import author_prefix_q, get_search_backend, prefix_q, subject_prefix_q
+from .streaming import streaming_response
+
+# Orden de estantería: coincide con el índice (shelf_key, id) del modelo
+SHELF_KEYS = ("shelf_key", "id")
+SHELF_TYPES = (str, int)
 
 
 def record_list(request):
     """Lista de registros bibliográficos con filtros básicos.
 
     Parámetros GET soportados:
-    - q: término de búsqueda libre (título, subtítulo, ISBN, ISSN, sujeto, autor)
-    - lcc: filtro por clase LCC (ej. 'QA')
+    - q: término de búsqueda libre (título, subtítulo, ISBN, ISSN, sujeto, autor);
+      ver `services/search.py`
+    - lcc: filtro por prefijo de clase LCC (ej. 'Q' incluye QA, QB...)
+    - lcc_class: clase LCC exacta (la que usan los enlaces de la faceta)
     - type: tipo de recurso (book, thesis, article, ...)
+    - author / subject: prefijo del autor o la materia, sin distinguir tildes
+      (usa las columnas normalizadas indexadas)
+    - decade / lang / publisher: refinamientos desde las facetas
+      (ver `services/facets.py`)
 
-    Devuelve una página con hasta 20 resultados paginados.
+    Devuelve una página con hasta 20 resultados. Con
+    `CATALOG_LIST_PAGINATION = "cursor"` (por defecto) se pagina por keyset
+    con tokens `after`/`before` sobre (relevancia o estante, id) y el total
+    se muestra cacheado; con "pages" se usa `Paginator` (OFFSET + COUNT).
     """
     q = request.GET.get("q", "").strip()
     lcc = request.GET.get("lcc", "").strip()
+    lcc_class = request.GET.get("lcc_class", "").strip()
     resource_type = request.GET.get("type", "").strip()
+    author = request.GET.get("author", "").strip()
+    subject = request.GET.get("subject", "").strip()
+    decade = request.GET.get("decade", "").strip()
+    lang = request.GET.get("lang", "").strip()
+    publisher = request.GET.get("publisher", "").strip()
 
     qs = BibliographicRecord.objects.all()
 
     if q:
-        # Búsqueda simple por campos relevantes; usar `distinct()` por joins M2M
-        qs = qs.filter(
-            Q(title__icontains=q) |
-            Q(subtitle__icontains=q) |
-            Q(isbn__icontains=q) |
-            Q(issn__icontains=q) |
-            Q(subjects__term__icontains=q) |
-            Q(contributors__person__full_name__icontains=q)
-        ).distinct()
+        # Búsqueda de texto completo con el backend activo (FTS5/tsvector),
+        # ordenada por relevancia cuando el backend la calcula.
+        qs = get_search_backend().search(qs, q)
 
     if lcc:
         # Filtrar por la clase LCC (comienza con), mayúsculas para normalizar
         qs = qs.filter(lcc_class__istartswith=lcc.upper())
 
+    if lcc_class:
+        qs = qs.filter(lcc_class=lcc_class.upper())
+
     if resource_type:
         qs = qs.filter(resource_type=resource_type)
 
-    # Seleccionamos la editorial en la misma consulta para evitar consultas extra
-    paginator = Paginator(qs.select_related("publisher"), 20)
-    page = request.GET.get("page")
-    records = paginator.get_page(page)
-    return render(request, "catalog/record_list.html", {"records": records, "q": q, "lcc": lcc, "type": resource_type})
+    if normalize_text(author):
+        qs = qs.filter(author_prefix_q(normalize_text(author)))
+
+    if normalize_text(subject):
+        qs = qs.filter(subject_prefix_q(normalize_text(subject)))
+
+    if decade.isdigit():
+        qs = qs.filter(publish_year__gte=int(decade), publish_year__lt=int(decade) + 10)
+
+    if lang:
+        qs = qs.filter(language=lang)
+
+    if publisher.isdigit():
+        qs = qs.filter(publisher_id=int(publisher))
+
+    filters = {
+        "q": q, "lcc": lcc, "lcc_class": lcc_class, "type": resource_type, "author": author,
+        "subject": subject, "decade": decade, "lang": lang, "publisher": publisher,
+    }
+    # Conteos por faceta sobre el resultado filtrado (cacheados si no hay filtros)
+    facets = compute_facets(qs, filtered=any(filters.values()))
+
+    # Editorial en la misma consulta y autores precargados (ver `for_listing`)
+    qs = qs.for_listing()
+
+    if getattr(settings, "CATALOG_LIST_PAGINATION", "cursor") == "pages":
+        paginator = Paginator(qs, 20)
+        page = request.GET.get("page")
+        records = paginator.get_page(page)
+        total = paginator.count
+        cursor_mode = False
+    else:
+        # Con búsqueda rankeada se pagina por relevancia; si no, por estante
+        if "search_rank" in qs.query.annotations:
+            keys, types = ("search_rank", "id"), (float, int)
+        else:
+            keys, types = SHELF_KEYS, SHELF_TYPES
+        records = keyset_page(
+            qs, keys, 20,
+            after=request.GET.get("after"), before=request.GET.get("before"), types=types,
+        )
+        total = cached_count(qs, {**filters, "backend": get_search_backend().name})
+        cursor_mode = True
+
+    # Disponibilidad de la página en una consulta agrupada (no una por fila)
+    availability = Item.objects.availability_by_record(r.pk for r in records)
+    for r in records:
+        r.availability = availability.get(r.pk)
+
+    return render(request, "catalog/record_list.html", {
+        "records": records, "total": total, "cursor_mode": cursor_mode, "facets": facets, **filters,
+    })
 
 
 def record_detail(request, pk):
@@ -57,21 +135,17 @@ def record_detail(request, pk):
     """
     record = get_object_or_404(BibliographicRecord.objects.select_related("publisher"), pk=pk)
 
-    # Calcular resúmenes de existencias para mostrar en la plantilla.
-    items_qs = record.items.all()
-    total_items = items_qs.count()
-    available_count = items_qs.filter(status=Item.Status.AVAILABLE).count()
-    loaned_count = items_qs.filter(status=Item.Status.LOANED).count()
-    repair_count = items_qs.filter(status=Item.Status.REPAIR).count()
-    lost_count = items_qs.filter(status=Item.Status.LOST).count()
+    # Resumen de existencias por estado en una sola consulta (aggregate condicional)
+    summary = record.items.status_summary()
 
     context = {
         "record": record,
-        "total_items": total_items,
-        "available_count": available_count,
-        "loaned_count": loaned_count,
-        "repair_count": repair_count,
-        "lost_count": lost_count,
+        "items": record.items.select_related("location"),
+        "total_items": summary["total"],
+        "available_count": summary["available"],
+        "loaned_count": summary["loaned"],
+        "repair_count": summary["repair"],
+        "lost_count": summary["lost"],
     }
     return render(request, "catalog/record_detail.html", context)
 
@@ -111,4 +185,164 @@ def record_update(request, pk):
     else:
         form = BibliographicRecordForm(instance=rec)
     return render(request, "catalog/record_form.html", {"form": form, "mode": "edit", "record": rec})
-    
\ No newline at end of file
+
+
+def _shelf_window(request):
+    """Registros alrededor de una posición del estante (keyset, sin OFFSET).
+
+    La posición viene de `at` (cursor opaco devuelto por una respuesta
+    anterior) o de `call` (signatura, p. ej. 'QA76.73 .P98'). Devuelve hasta
+    `n` registros antes y `n` desde la posición, más los cursores para
+    desplazar la ventana `n` lugares hacia atrás o adelante.
+    """
+    call = request.GET.get("call", "").strip()
+    try:
+        n = min(max(int(request.GET.get("n", 10)), 1), 50)
+    except ValueError:
+        n = 10
+
+    at = decode_cursor(request.GET.get("at"), SHELF_TYPES)
+    if at is None:
+        at = [sort_key_for_call_number(call) if call else "", 0]
+
+    qs = BibliographicRecord.objects.select_related("publisher")
+    before = list(
+        qs.filter(seek_filter(SHELF_KEYS, at, "lt"))
+        .order_by(*[f"-{k}" for k in SHELF_KEYS])[:n + 1]
+    )
+    after = list(qs.filter(seek_filter(SHELF_KEYS, at, "gte")).order_by(*SHELF_KEYS)[:n + 1])
+
+    return {
+        "call": call,
+        "n": n,
+        "before": before[:n][::-1],
+        "after": after[:n],
+        "prev_at": row_cursor(before[n - 1], SHELF_KEYS) if len(before) > n else None,
+        "next_at": row_cursor(after[n], SHELF_KEYS) if len(after) > n else None,
+    }
+
+
+def shelf_browse(request):
+    """Vista de estante: qué hay antes y después de una signatura dada."""
+    return render(request, "catalog/shelf_browse.html", _shelf_window(request))
+
+
+def shelf_browse_api(request):
+    """Versión JSON de `shelf_browse` (mismos parámetros: call, at, n)."""
+    window = _shelf_window(request)
+
+    def _row(rec):
+        return {
+            "id": rec.pk,
+            "title": rec.title,
+            "call_number": rec.call_number,
+            "publisher": rec.publisher.name if rec.publisher else None,
+            "publish_year": rec.publish_year,
+            "url": reverse("catalog:record_detail", args=[rec.pk]),
+        }
+
+    return JsonResponse({
+        "call": window["call"],
+        "before": [_row(r) for r in window["before"]],
+        "after": [_row(r) for r in window["after"]],
+        "prev_at": window["prev_at"],
+        "next_at": window["next_at"],
+    })
+
+
+# Autocompletado: campo -> (consulta, columna normalizada, columnas devueltas)
+SUGGEST_FIELDS = {
+    "title": (BibliographicRecord.objects, "title_norm", ("pk", "title")),
+    "author": (Person.objects, "full_name_norm", ("pk", "full_name")),
+    "subject": (Subject.objects, "term_norm", ("pk", "term")),
+}
+SUGGEST_LIMIT = 10
+
+
+@require_safe
+async def suggest(request):
+    """Autocompletado JSON por prefijo: `?q=...&field=title|author|subject`.
+
+    Vista asíncrona (ORM asíncrono): son consultas mínimas por tecla que, bajo
+    ASGI, no ocupan un hilo cada una. El rango sobre la columna normalizada
+    usa su índice (ver `prefix_q`).
+    """
+    field = request.GET.get("field", "title")
+    if field not in SUGGEST_FIELDS:
+        return JsonResponse({"ok": False, "msg": "Campo no soportado"}, status=400)
+    prefix = normalize_text(request.GET.get("q", "")).strip()
+    results = []
+    if len(prefix) >= 2:
+        manager, column, values = SUGGEST_FIELDS[field]
+        rows = manager.filter(prefix_q(column, prefix)).order_by(column).values_list(*values)[:SUGGEST_LIMIT]
+        async for pk, label in rows:
+            entry = {"id": pk, "label": label}
+            if field == "title":
+                entry["url"] = reverse("catalog:record_detail", args=[pk])
+            results.append(entry)
+    response = JsonResponse({"ok": True, "q": prefix, "field": field, "results": results})
+    patch_cache_control(response, public=True, max_age=60)
+    return response
+
+
+
+@require_safe
+def qr_code(request, kind, code, fmt):
+    """QR de un registro (`inventory_code`) o ejemplar (`barcode`) generado al vuelo.
+
+    Sólo se consulta lo necesario para armar el payload; con `If-None-Match`
+    coincidente se responde 304 sin generar la imagen. Los bytes generados se
+    reutilizan desde el LRU en memoria de `services/qr.py`.
+
+    El payload del ejemplar incluye el título, que puede cambiar con la misma
+    URL: sólo con `?v=` vigente (ver `Item.get_qr_url`) se cachea por
+    `CATALOG_QR_MAX_AGE`; sin él, por `CATALOG_QR_UNVERSIONED_MAX_AGE`.
+    """
+    if fmt not in QR_FORMATS:
+        raise Http404("Formato no soportado")
+    if kind == "record":
+        qs = BibliographicRecord.objects.only("pk", "inventory_code")
+        obj = qs.filter(inventory_code=code).first()
+    else:
+        qs = Item.objects.select_related("record").only("pk", "barcode", "record__title")
+        obj = qs.filter(barcode=code).first()
+    if obj is None:
+        raise Http404("Código no encontrado")
+
+    payload = obj.get_qr_payload()
+    etag = qr_etag(payload, fmt)
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(render_qr(payload, fmt), content_type=QR_FORMATS[fmt])
+    response["ETag"] = etag
+    if kind == "record" or request.GET.get("v") == qr_version(payload, fmt):
+        max_age = getattr(settings, "CATALOG_QR_MAX_AGE", 2592000)
+    else:
+        max_age = getattr(settings, "CATALOG_QR_UNVERSIONED_MAX_AGE", 300)
+    patch_cache_control(response, public=True, max_age=max_age)
+    return response
+
+
+@staff_member_required
+@require_safe
+def export_records(request):
+    """Descarga del catálogo completo (`?format=csv|jsonl|marcxml&gzip=1`).
+
+    La respuesta se genera en streaming (`services/export.py`): la memoria
+    no depende del tamaño del catálogo, tampoco bajo ASGI (ver `streaming.py`).
+    """
+    fmt = request.GET.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        raise Http404("Formato no soportado")
+    compress = request.GET.get("gzip") in ("1", "true", "on")
+    content_type, ext = EXPORT_FORMATS[fmt]
+    filename = f"catalogo-{timezone.localdate():%Y%m%d}.{ext}"
+    if compress:
+        content_type, filename = "application/gzip", filename + ".gz"
+
+    response = streaming_response(
+        request, export_stream(BibliographicRecord.objects.all(), fmt, compress=compress), content_type,
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
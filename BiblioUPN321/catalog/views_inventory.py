@@ -1,19 +1,130 @@
 # catalog/views_inventory.py
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
-from django.views.decorators.csrf import csrf_exempt
 import json
-from .models import BibliographicRecord
 
+from django.contrib.auth.decorators import login_required, permission_required
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.views.decorators.http import require_http_methods, require_POST, require_safe
+
+from .models import InventorySession, Location
+from .services.codes import aresolve_many
+from .services.inventory import MAX_BATCH, arecord_scans
+from .services.reconcile import ReconcileError, iter_report, reconcile, summary
+from .streaming import streaming_response
+
+
+@login_required
+@permission_required("catalog.add_inventoryevent", raise_exception=True)
+@require_http_methods(["GET", "POST"])
+def scan_page(request):
+    """Lector de QR para inventario. Con POST abre una sesión nueva."""
+    if request.method == "POST":
+        name = request.POST.get("name", "").strip()
+        if name:
+            location = Location.objects.filter(pk=request.POST.get("location") or None).first()
+            session = InventorySession.objects.create(name=name, location=location, started_by=request.user)
+            return redirect(f"{reverse('catalog:inventory_scan')}?session={session.pk}")
+
+    session = None
+    if request.GET.get("session", "").isdigit():
+        session = get_object_or_404(InventorySession, pk=request.GET["session"])
+    return render(request, "catalog/scan.html", {
+        "session": session,
+        "open_sessions": InventorySession.objects.filter(closed_at__isnull=True).select_related("location")[:50],
+        "locations": Location.objects.order_by("code"),
+        "max_batch": MAX_BATCH,
+    })
+
+
+@permission_required("catalog.add_inventoryevent", raise_exception=True)
 @require_POST
-def mark_seen(request):
-    payload = json.loads(request.body)
-    code = payload.get("code","")
-    # code puede ser la URL o el inventory_code; parsea según tu get_qr_payload()
-    inv = code.split("inv=")[-1] if "inv=" in code else code
-    obj = BibliographicRecord.objects.filter(inventory_code=inv).first()
-    if not obj:
-        return JsonResponse({"ok": False, "msg": "No encontrado"}, status=404)
-    # registra “visto”
-    InventoryEvent.objects.create(record=obj, event="SEEN")
-    return JsonResponse({"ok": True, "title": obj.title})
+async def scan_batch(request):
+    """Recibe un lote de lecturas y las registra en bloque.
+
+    Cuerpo JSON: `{"session": id, "device": "...", "scans": [{"code": "...",
+    "at": epoch_ms, "key": "uuid"}, ...]}`; también se aceptan cadenas
+    sueltas en `scans`. Reenviar un lote con las mismas claves no duplica
+    eventos, de modo que el cliente puede reintentar sin riesgo.
+
+    Es asíncrona (ver `arecord_scans`): en días de inventario llegan muchos
+    lotes pequeños a la vez y bajo ASGI esperan a la BD sin ocupar un hilo.
+    """
+    try:
+        payload = json.loads(request.body)
+        scans = payload["scans"]
+        session_id = int(payload["session"])
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"ok": False, "msg": "Cuerpo inválido"}, status=400)
+    if not isinstance(scans, list) or len(scans) > MAX_BATCH:
+        return JsonResponse({"ok": False, "msg": f"Se esperan hasta {MAX_BATCH} lecturas"}, status=400)
+
+    session = await InventorySession.objects.filter(pk=session_id).afirst()
+    if session is None:
+        return JsonResponse({"ok": False, "msg": "Sesión no encontrada"}, status=404)
+    if not session.is_open:
+        return JsonResponse({"ok": False, "msg": "La sesión está cerrada"}, status=409)
+
+    pairs = []
+    for scan in scans:
+        if isinstance(scan, dict):
+            key = str(scan.get("key") or "")[:64] or None
+            pairs.append((str(scan.get("code", "")), scan.get("at"), key))
+        else:
+            pairs.append((str(scan), None, None))
+    result = await arecord_scans(session, pairs, device=str(payload.get("device", "")))
+    return JsonResponse({"ok": True, **result})
+
+
+@permission_required("catalog.add_inventoryevent", raise_exception=True)
+@require_safe
+async def code_lookup(request):
+    """Resuelve códigos leídos sin registrar eventos: `?code=...&code=...`.
+
+    Devuelve `{"found": {código: {record, item, title, url}}, "unknown": [...]}`.
+    Usa la caché de `services/codes.py`, así que un código ya visto no
+    consulta la BD.
+    """
+    codes = [c for c in request.GET.getlist("code") if c.strip()]
+    if not codes or len(codes) > MAX_BATCH:
+        return JsonResponse({"ok": False, "msg": f"Se esperan entre 1 y {MAX_BATCH} códigos"}, status=400)
+    resolved = await aresolve_many(codes)
+    return JsonResponse({
+        "ok": True,
+        "found": {
+            code: {
+                "record": record_pk,
+                "item": item_pk,
+                "title": title,
+                "url": reverse("catalog:record_detail", args=[record_pk]),
+            }
+            for code, (record_pk, item_pk, title) in resolved.items()
+        },
+        "unknown": [code for code in codes if code not in resolved],
+    })
+
+
+@login_required
+@permission_required("catalog.add_inventoryevent", raise_exception=True)
+@require_http_methods(["GET", "POST"])
+def reconcile_report(request, pk):
+    """Con GET descarga el CSV de los hallazgos actuales, sin modificarlos.
+
+    POST concilia la sesión (incremental; `full=1` recalcula todo) y redirige
+    al GET. Los conteos van también en cabeceras `X-Inventory-*`.
+    """
+    session = get_object_or_404(InventorySession, pk=pk)
+    if session.location_id is None:
+        raise Http404("La sesión no tiene ubicación asignada.")
+    if request.method == "POST":
+        try:
+            reconcile(session, full=request.POST.get("full") == "1")
+        except ReconcileError as exc:
+            raise Http404(str(exc))
+        return redirect("catalog:inventory_reconcile", pk=session.pk)
+
+    response = streaming_response(request, iter_report(session), "text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="conciliacion-{session.pk}.csv"'
+    for key, value in summary(session).items():
+        response[f"X-Inventory-{key.capitalize()}"] = str(value)
+    return response